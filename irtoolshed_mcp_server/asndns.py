@@ -0,0 +1,144 @@
+# asndns.py
+import asyncio
+import collections
+import concurrent.futures
+import os
+import dns.resolver
+from irtoolshed_mcp_server.resolver import create_nameserver_pool, get_async_resolver, resolve_async
+
+# Constants for Team Cymru's DNS interface
+CYMRU_ORIGIN_ZONE = "origin.asn.cymru.com"
+CYMRU_ORIGIN6_ZONE = "origin6.asn.cymru.com"
+CYMRU_ASN_ZONE = "asn.cymru.com"
+ASN_DNS_CONCURRENCY_ENV = "ASN_DNS_CONCURRENCY"
+ASN_DNS_CONCURRENCY_DEFAULT = 50
+ASN_DNS_TIMEOUT = 5.0
+
+# Same attributes the asnlookup code reads from cymruwhois records
+CymruRecord = collections.namedtuple("CymruRecord", ["asn", "prefix", "cc", "owner"])
+UNROUTED = CymruRecord("NA", "NA", "", "NA")
+
+def origin_query_name(ip_obj):
+    """
+    Return the Team Cymru origin query name for an address.
+
+    Args:
+        ip_obj: ipaddress address object
+
+    Returns:
+        str: e.g. "8.8.8.8.origin.asn.cymru.com" or a nibble-reversed name in origin6.asn.cymru.com
+    """
+    if ip_obj.version == 4:
+        return ".".join(reversed(str(ip_obj).split("."))) + "." + CYMRU_ORIGIN_ZONE
+    return ".".join(reversed(ip_obj.exploded.replace(":", ""))) + "." + CYMRU_ORIGIN6_ZONE
+
+def _txt_fields(rdata):
+    """Split a Cymru TXT record ("a | b | c") into stripped fields."""
+    return [field.strip() for field in b"".join(rdata.strings).decode("utf-8", "replace").split("|")]
+
+async def _resolve_txt(pool, name, semaphore):
+    async with semaphore:
+        return await resolve_async(name, "TXT", lifetime=ASN_DNS_TIMEOUT, pool=pool)
+
+async def _lookup_origin(pool, ip_obj, semaphore):
+    """Return a CymruRecord (without owner) for the most specific prefix announcing ip_obj."""
+    try:
+        answer = await _resolve_txt(pool, origin_query_name(ip_obj), semaphore)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return UNROUTED
+    best = None
+    for rdata in answer:
+        # "15169 | 8.8.8.0/24 | US | arin | 2023-12-28"; multi-origin prefixes list several ASNs
+        fields = _txt_fields(rdata)
+        if len(fields) < 3 or not fields[0]:
+            continue
+        prefixlen = int(fields[1].rsplit("/", 1)[1]) if "/" in fields[1] else -1
+        if best is None or prefixlen > best[0]:
+            best = (prefixlen, CymruRecord(fields[0].split()[0], fields[1], fields[2], None))
+    return best[1] if best else UNROUTED
+
+async def _lookup_as_name(pool, asn, semaphore):
+    """Return the AS name from asn.cymru.com, or "Unknown"."""
+    try:
+        answer = await _resolve_txt(pool, f"AS{asn}.{CYMRU_ASN_ZONE}", semaphore)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return "Unknown"
+    for rdata in answer:
+        # "15169 | US | arin | 2000-03-30 | GOOGLE - Google LLC, US"
+        fields = _txt_fields(rdata)
+        if len(fields) >= 5 and fields[4]:
+            return fields[4]
+    return "Unknown"
+
+async def lookup_many_async(ip_objs, concurrency=None, pool=None):
+    """
+    Look up the origin AS of many addresses through Team Cymru's DNS zones.
+
+    Origin queries run concurrently, bounded by a semaphore; each distinct
+    AS is then named with one asn.cymru.com query. Queries go through the
+    nameserver pool and answer cache, like every other DNS lookup.
+
+    Args:
+        ip_objs: List of public ipaddress address objects
+        concurrency: Maximum queries in flight (default ASN_DNS_CONCURRENCY, or 50)
+        pool: NameserverPool to use (default: the shared pool)
+
+    Returns:
+        dict: address object -> CymruRecord (asn "NA" when unrouted), or the exception raised for it
+    """
+    semaphore = asyncio.Semaphore(concurrency or int(os.getenv(ASN_DNS_CONCURRENCY_ENV) or ASN_DNS_CONCURRENCY_DEFAULT))
+    origins = await asyncio.gather(
+        *(_lookup_origin(pool, ip_obj, semaphore) for ip_obj in ip_objs), return_exceptions=True)
+    asns = sorted({record.asn for record in origins
+                   if isinstance(record, CymruRecord) and record is not UNROUTED})
+    names = await asyncio.gather(
+        *(_lookup_as_name(pool, asn, semaphore) for asn in asns), return_exceptions=True)
+    owners = {asn: name if isinstance(name, str) else "Unknown" for asn, name in zip(asns, names)}
+    results = {}
+    for ip_obj, record in zip(ip_objs, origins):
+        if isinstance(record, CymruRecord) and record is not UNROUTED:
+            record = record._replace(owner=owners[record.asn])
+        results[ip_obj] = record
+    return results
+
+def run_sync(coro):
+    """Run a coroutine to completion from synchronous code, even inside a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+async def lookup_async(ip_obj, pool=None):
+    """
+    Look up a single address through Team Cymru's DNS zones.
+
+    Args:
+        ip_obj: ipaddress address object
+        pool: NameserverPool to use (default: the shared pool)
+
+    Returns:
+        CymruRecord: asn "NA" when the address is unrouted
+    """
+    record = (await lookup_many_async([ip_obj], pool=pool))[ip_obj]
+    if isinstance(record, Exception):
+        raise record
+    return record
+
+async def _with_own_pool(lookup, *args):
+    """Run a lookup over a nameserver pool of its own; stream connections belong to one event loop."""
+    pool = create_nameserver_pool(get_async_resolver())
+    try:
+        return await lookup(*args, pool=pool)
+    finally:
+        if pool.transport is not None:
+            pool.transport.close()
+
+def lookup_many(ip_objs, concurrency=None):
+    """Synchronous wrapper around lookup_many_async(), for callers without an event loop."""
+    return run_sync(_with_own_pool(lookup_many_async, ip_objs, concurrency))
+
+def lookup(ip_obj):
+    """Synchronous wrapper around lookup_async(), for callers without an event loop."""
+    return run_sync(_with_own_pool(lookup_async, ip_obj))
@@ -1,6 +1,41 @@
 # asnlookup.py
-import cymruwhois
+import asyncio
 import ipaddress
+import os
+import threading
+from irtoolshed_mcp_server import asndns
+from irtoolshed_mcp_server.asnoffline import get_offline_index
+from irtoolshed_mcp_server.cymrupool import CymruClientPool
+from irtoolshed_mcp_server.prefixcache import PrefixCache
+
+# Constants for choosing between the offline dataset and Team Cymru
+ASN_LOOKUP_MODE_ENV = "ASN_LOOKUP_MODE"
+ASN_LOOKUP_MODES = ["online", "offline", "offline-first"]
+
+# Constants for choosing how Team Cymru is queried: port-43 whois or its DNS zones
+ASN_TRANSPORT_ENV = "ASN_TRANSPORT"
+ASN_TRANSPORTS = ["whois", "dns"]
+
+# Constants for Team Cymru's whois service
+CYMRU_WHOIS_HOST = "whois.cymru.com"
+CYMRU_WHOIS_PORT = 43
+CYMRU_POOL_SIZE_ENV = "CYMRU_POOL_SIZE"
+CYMRU_POOL_SIZE_DEFAULT = 4
+CYMRU_POOL_IDLE_TIMEOUT_ENV = "CYMRU_POOL_IDLE_TIMEOUT"
+CYMRU_POOL_IDLE_TIMEOUT_DEFAULT = 60.0
+
+# Constants for the announced-prefix cache of Team Cymru answers
+ASN_CACHE_SIZE_ENV = "ASN_CACHE_SIZE"
+ASN_CACHE_SIZE_DEFAULT = 65536
+ASN_CACHE_TTL_ENV = "ASN_CACHE_TTL"
+ASN_CACHE_TTL_DEFAULT = 14400  # 4 hours
+ASN_NEGATIVE_CACHE_TTL_ENV = "ASN_NEGATIVE_CACHE_TTL"
+ASN_NEGATIVE_CACHE_TTL_DEFAULT = 600
+ASN_NEGATIVE_PREFIXLEN = {4: 24, 6: 48}  # longest prefixes that are globally routed
+
+# Constants for bulk lookups
+ASN_BULK_MAX_IPS = 100000
+ASN_BULK_CHUNK_SIZE = 1000  # addresses sent per lookupmany() call on the shared session
 
 def is_private_ip(ip):
     """Check if an IP address is private"""
@@ -10,12 +45,151 @@ def is_private_ip(ip):
     except ValueError:
         return False
 
-def asnlookup(ip):
+_cymru_pool = None
+_cymru_pool_lock = threading.Lock()
+
+def get_cymru_pool():
+    """
+    Return the process-wide pool of Team Cymru whois sessions, creating it on first use.
+
+    Returns:
+        CymruClientPool: Pool sized by CYMRU_POOL_SIZE and CYMRU_POOL_IDLE_TIMEOUT
+    """
+    global _cymru_pool
+    with _cymru_pool_lock:
+        if _cymru_pool is None:
+            _cymru_pool = CymruClientPool(
+                CYMRU_WHOIS_HOST,
+                CYMRU_WHOIS_PORT,
+                maxsize=int(os.getenv(CYMRU_POOL_SIZE_ENV) or CYMRU_POOL_SIZE_DEFAULT),
+                idle_timeout=float(os.getenv(CYMRU_POOL_IDLE_TIMEOUT_ENV) or CYMRU_POOL_IDLE_TIMEOUT_DEFAULT)
+            )
+        return _cymru_pool
+
+def get_pool_stats():
+    """Return the Team Cymru connection pool counters."""
+    return get_cymru_pool().stats()
+
+# Team Cymru answers keyed by announcing prefix; values are (as_number, as_name), or None for unrouted space
+_asn_cache = PrefixCache(int(os.getenv(ASN_CACHE_SIZE_ENV) or ASN_CACHE_SIZE_DEFAULT))
+_NOT_CACHED = object()
+
+def get_cache_stats():
+    """Return the announced-prefix cache counters."""
+    return _asn_cache.stats()
+
+def _cache_cymru_response(ip_obj, response):
+    """
+    Cache a Team Cymru answer and return it as (as_number, as_name), or None if unrouted.
+
+    Routed answers are stored under the BGP prefix Cymru reports, so any
+    address inside it is answered locally until ASN_CACHE_TTL expires.
+    Unrouted answers are stored for the surrounding /24 (IPv4) or /48
+    (IPv6) with the shorter ASN_NEGATIVE_CACHE_TTL.
+    """
+    if response and response.asn != "NA":
+        record = (str(response.asn), response.owner)
+        ttl = float(os.getenv(ASN_CACHE_TTL_ENV) or ASN_CACHE_TTL_DEFAULT)
+        try:
+            network = ipaddress.ip_network(response.prefix, strict=False)
+        except ValueError:
+            network = None
+        if ttl > 0 and network is not None and ip_obj in network:
+            _asn_cache.put(network, record, ttl)
+        return record
+    ttl = float(os.getenv(ASN_NEGATIVE_CACHE_TTL_ENV) or ASN_NEGATIVE_CACHE_TTL_DEFAULT)
+    if ttl > 0 and response is not None:
+        _asn_cache.put(f"{ip_obj}/{ASN_NEGATIVE_PREFIXLEN[ip_obj.version]}", None, ttl)
+    return None
+
+def get_lookup_mode(mode=None):
+    """Return the ASN lookup mode from the argument or ASN_LOOKUP_MODE, defaulting to online."""
+    return (mode or os.getenv(ASN_LOOKUP_MODE_ENV) or "online").strip().lower()
+
+def get_transport(transport=None):
+    """Return the Team Cymru transport from the argument or ASN_TRANSPORT, defaulting to whois."""
+    return (transport or os.getenv(ASN_TRANSPORT_ENV) or "whois").strip().lower()
+
+def _asn_result(ip, as_number, as_name):
+    """Build a successful lookup result in asnlookup()'s format."""
+    return {
+        "status": "success",
+        "ip_addr": ip,
+        "as_number": as_number,
+        "as_name": as_name
+    }
+
+def _asn_error(ip, error):
+    """Build an error result in asnlookup()'s format."""
+    return {
+        "status": "error",
+        "error": error,
+        "query": ip
+    }
+
+def _record_result(ip, record):
+    """Turn (as_number, as_name), None (unrouted) or an exception into asnlookup()'s format."""
+    if isinstance(record, Exception):
+        return _asn_error(ip, str(record) or type(record).__name__)
+    if record:
+        return _asn_result(ip, record[0], record[1])
+    return _asn_error(ip, "No ASN information found")
+
+def _lookup_locally(ip, mode, transport):
+    """
+    Validate a single lookup and answer it without Team Cymru where possible.
+
+    Args:
+        ip: Sanitized IP address string
+        mode: Lookup mode from get_lookup_mode()
+        transport: Team Cymru transport from get_transport()
+
+    Returns:
+        tuple: (address object, result in asnlookup()'s format, or None if Team Cymru must be asked)
+
+    Raises:
+        ValueError: If ip is not an IP address
+    """
+    # Validate IP address format
+    ip_obj = ipaddress.ip_address(ip)
+
+    # Check if it's a private IP
+    if ip_obj.is_private:
+        return ip_obj, _asn_error(ip, "No ASN information found")
+
+    if mode not in ASN_LOOKUP_MODES:
+        return ip_obj, _asn_error(ip, f"Invalid ASN lookup mode. Must be one of: {', '.join(ASN_LOOKUP_MODES)}")
+    if transport not in ASN_TRANSPORTS:
+        return ip_obj, _asn_error(ip, f"Invalid ASN transport. Must be one of: {', '.join(ASN_TRANSPORTS)}")
+
+    # Answer from the local dataset when configured
+    if mode != "online":
+        index = get_offline_index()
+        record = index.lookup(ip_obj) if index else None
+        if record:
+            return ip_obj, _asn_result(ip, record[0], record[1])
+        if mode == "offline":
+            return ip_obj, _asn_error(
+                ip, "No ASN information found" if index else "Offline ASN database not found")
+
+    # Answer from a cached prefix
+    record = _asn_cache.get(ip_obj, _NOT_CACHED)
+    if record is not _NOT_CACHED:
+        return ip_obj, _record_result(ip, record)
+    return ip_obj, None
+
+def asnlookup(ip, mode=None, transport=None):
     """
     Look up ASN information for a given IP address and return formatted results.
 
     Args:
         ip: The IP address to look up
+        mode: "online" (Team Cymru only), "offline" (local dataset only) or
+              "offline-first" (local dataset, falling back to Team Cymru).
+              Defaults to the ASN_LOOKUP_MODE environment variable, or "online".
+        transport: "whois" (Team Cymru's port-43 service) or "dns" (its
+                   origin.asn.cymru.com zones). Defaults to the ASN_TRANSPORT
+                   environment variable, or "whois".
 
     Returns:
         dict: A dictionary with ip, as number, and as name, or error information
@@ -23,47 +197,287 @@ def asnlookup(ip):
     try:
         # Sanitize input
         ip = ip.strip() if ip else ""
-        
-        # Validate IP address format
-        ip_obj = ipaddress.ip_address(ip)
-        
-        # Check if it's a private IP
-        if ip_obj.is_private:
-            return {
-                "status": "error",
-                "error": "No ASN information found",
-                "query": ip
-            }
-            
-        # Use the cymruwhois library to get ASN information
-        client = cymruwhois.Client()
-        response = client.lookup(ip)
-
-        if response:
-            return {
-                "status": "success",
-                "ip_addr": ip,
-                "as_number": str(response.asn),
-                "as_name": response.owner
-            }
+        transport = get_transport(transport)
+        ip_obj, result = _lookup_locally(ip, get_lookup_mode(mode), transport)
+        if result:
+            return result
+
+        # Query Team Cymru over DNS or a pooled whois session
+        if transport == "dns":
+            response = asndns.lookup(ip_obj)
         else:
-            return {
-                "status": "error",
-                "error": "No ASN information found",
-                "query": ip
-            }
-            
+            response = get_cymru_pool().lookup(str(ip_obj))
+        return _record_result(ip, _cache_cymru_response(ip_obj, response))
+
+    except ValueError:
+        return _asn_error(ip, "Invalid IP address format")
+    except Exception as e:
+        return _asn_error(ip, str(e))
+
+async def asnlookup_async(ip, mode=None, transport=None):
+    """
+    Asyncio version of asnlookup().
+
+    DNS lookups run on the event loop through the shared nameserver pool;
+    whois lookups, which block on a socket, run in a worker thread.
+    """
+    try:
+        transport = get_transport(transport)
+        if transport != "dns":
+            return await asyncio.to_thread(asnlookup, ip, mode, transport)
+        ip = ip.strip() if ip else ""
+        ip_obj, result = _lookup_locally(ip, get_lookup_mode(mode), transport)
+        if result:
+            return result
+        response = await asndns.lookup_async(ip_obj)
+        return _record_result(ip, _cache_cymru_response(ip_obj, response))
+
     except ValueError:
+        return _asn_error(ip, "Invalid IP address format")
+    except Exception as e:
+        return _asn_error(ip, str(e))
+
+def _by_address(responses):
+    """Re-key Team Cymru whois records by address object, so any spelling of an address finds its record."""
+    keyed = {}
+    for key, response in responses.items():
+        try:
+            keyed[ipaddress.ip_address(key)] = response
+        except ValueError:
+            continue
+    return keyed
+
+def _chunks(ips):
+    """
+    Split addresses into chunks of ASN_BULK_CHUNK_SIZE, answering each from the prefix cache first.
+
+    Chunks are produced lazily, so prefixes learned from earlier chunks
+    answer later ones locally.
+
+    Yields:
+        tuple: (list of (IP address, cached record) pairs, list of uncached IP addresses)
+    """
+    for start in range(0, len(ips), ASN_BULK_CHUNK_SIZE):
+        cached, chunk = [], []
+        for ip in ips[start:start + ASN_BULK_CHUNK_SIZE]:
+            record = _asn_cache.get(ip, _NOT_CACHED)
+            if record is _NOT_CACHED:
+                chunk.append(ip)
+            else:
+                cached.append((ip, record))
+        yield cached, chunk
+
+def _cache_responses(chunk, ip_objs, responses):
+    """Cache a chunk's Team Cymru answers, yielding (IP address, record or exception, True) for each."""
+    for ip, ip_obj in zip(chunk, ip_objs):
+        response = responses.get(ip_obj)
+        if isinstance(response, Exception):
+            yield ip, response, True
+        else:
+            yield ip, _cache_cymru_response(ip_obj, response), True
+
+def _cymru_lookupmany(ips, transport="whois"):
+    """
+    Resolve many addresses through the prefix cache and Team Cymru.
+
+    Addresses are sent in chunks of ASN_BULK_CHUNK_SIZE so very large batches
+    never build one huge request. Over whois every chunk reuses the same
+    pooled bulk session; over DNS each chunk's queries run concurrently.
+    Each chunk is checked against the cache first, so prefixes learned from
+    earlier chunks answer later ones locally.
+
+    Args:
+        ips: List of unique, public IP address strings
+        transport: "whois" or "dns"
+
+    Yields:
+        tuple: (IP address, (as_number, as_name) or None if unrouted, or the
+               exception raised for it; whether Team Cymru was queried)
+    """
+    pool = get_cymru_pool() if transport == "whois" else None
+    for cached, chunk in _chunks(ips):
+        for ip, record in cached:
+            yield ip, record, False
+        if not chunk:
+            continue
+        ip_objs = [ipaddress.ip_address(ip) for ip in chunk]
+        if transport == "dns":
+            responses = asndns.lookup_many(ip_objs)
+        else:
+            # Query and match in canonical form; Cymru echoes the address it parsed, not what was typed
+            queries = list(dict.fromkeys(str(ip_obj) for ip_obj in ip_objs))
+            responses = _by_address(pool.call(lambda client: client.lookupmany_dict(queries)))
+        yield from _cache_responses(chunk, ip_objs, responses)
+
+async def _cymru_lookupmany_dns_async(ips):
+    """Asyncio version of _cymru_lookupmany() over DNS, returning its tuples as a list."""
+    outcomes = []
+    for cached, chunk in _chunks(ips):
+        outcomes.extend((ip, record, False) for ip, record in cached)
+        if chunk:
+            ip_objs = [ipaddress.ip_address(ip) for ip in chunk]
+            responses = await asndns.lookup_many_async(ip_objs)
+            outcomes.extend(_cache_responses(chunk, ip_objs, responses))
+    return outcomes
+
+def _prepare_bulk(ips, mode, transport):
+    """
+    Validate a bulk request and answer what needs no Team Cymru query.
+
+    Args:
+        ips: List of sanitized IP address strings
+        mode: Lookup mode from get_lookup_mode()
+        transport: Team Cymru transport from get_transport()
+
+    Returns:
+        tuple: (error result for the whole request or None, unique addresses in
+               first-seen order, outcomes so far by address, addresses left for Team Cymru)
+    """
+    if not ips:
+        return {
+            "status": "error",
+            "error": "No IP addresses provided",
+            "query": {"count": 0}
+        }, [], {}, []
+    if len(ips) > ASN_BULK_MAX_IPS:
+        error = f"Too many IP addresses. Maximum is {ASN_BULK_MAX_IPS}"
+    elif mode not in ASN_LOOKUP_MODES:
+        error = f"Invalid ASN lookup mode. Must be one of: {', '.join(ASN_LOOKUP_MODES)}"
+    elif transport not in ASN_TRANSPORTS:
+        error = f"Invalid ASN transport. Must be one of: {', '.join(ASN_TRANSPORTS)}"
+    else:
+        error = None
+    if error:
+        return {
+            "status": "error",
+            "error": error,
+            "query": {"count": len(ips)}
+        }, [], {}, []
+
+    # Deduplicate, keeping first-seen order
+    unique_ips = list(dict.fromkeys(ips))
+    outcomes = {}
+    pending = []
+    index = get_offline_index() if mode != "online" else None
+    for ip in unique_ips:
+        try:
+            ip_obj = ipaddress.ip_address(ip)
+        except ValueError:
+            outcomes[ip] = _asn_error(ip, "Invalid IP address format")
+            continue
+        if ip_obj.is_private:
+            outcomes[ip] = _asn_error(ip, "No ASN information found")
+            continue
+        record = index.lookup(ip_obj) if index else None
+        if record:
+            outcomes[ip] = _asn_result(ip, record[0], record[1])
+        elif mode == "offline":
+            outcomes[ip] = _asn_error(
+                ip, "No ASN information found" if index else "Offline ASN database not found")
+        else:
+            pending.append(ip)
+    return None, unique_ips, outcomes, pending
+
+def _bulk_result(ips, unique_ips, outcomes, queried):
+    """Build asnlookup_bulk()'s response from the per-address outcomes."""
+    results = [outcomes[ip] for ip in unique_ips]
+    return {
+        "status": "success",
+        "results": results,
+        "summary": {
+            "total": len(ips),
+            "unique": len(unique_ips),
+            "resolved": sum(1 for r in results if r["status"] == "success"),
+            "invalid": sum(1 for r in results if r.get("error") == "Invalid IP address format"),
+            "not_found": sum(1 for r in results if r.get("error") == "No ASN information found"),
+            "queried_online": queried
+        }
+    }
+
+def _split_ips(ips):
+    """Accept a list or a comma/whitespace separated string and return the non-empty, stripped addresses."""
+    if isinstance(ips, str):
+        ips = ips.replace(",", " ").split()
+    return [ip.strip() for ip in (ips or []) if ip and ip.strip()]
+
+def asnlookup_bulk(ips, mode=None, transport=None):
+    """
+    Look up ASN information for many IP addresses in one call.
+
+    Duplicate addresses are looked up once, private addresses are skipped,
+    and every address that needs Team Cymru goes over one bulk whois
+    session (or concurrent DNS queries) instead of a connection per address.
+
+    Args:
+        ips: List of IP addresses, or a string of comma/whitespace separated addresses
+        mode: Lookup mode, as for asnlookup()
+        transport: Team Cymru transport, as for asnlookup()
+
+    Returns:
+        dict: Per-IP results in asnlookup()'s format, in input order, plus a summary
+    """
+    try:
+        # Sanitize input
+        ips = _split_ips(ips)
+        transport = get_transport(transport)
+        error, unique_ips, outcomes, pending = _prepare_bulk(ips, get_lookup_mode(mode), transport)
+        if error:
+            return error
+
+        # Resolve everything else from the cache or over one Team Cymru session
+        queried = 0
+        try:
+            for ip, record, queried_online in _cymru_lookupmany(pending, transport):
+                queried += queried_online
+                outcomes[ip] = _record_result(ip, record)
+        except Exception as e:
+            for ip in pending:
+                if ip not in outcomes:
+                    outcomes[ip] = _asn_error(ip, str(e))
+        return _bulk_result(ips, unique_ips, outcomes, queried)
+
+    except Exception as e:
         return {
             "status": "error",
-            "error": "Invalid IP address format",
-            "query": ip
+            "error": str(e),
+            "query": {"count": len(ips) if isinstance(ips, (list, tuple)) else 0}
         }
+
+async def asnlookup_bulk_async(ips, mode=None, transport=None):
+    """
+    Asyncio version of asnlookup_bulk().
+
+    DNS queries run concurrently on the event loop through the shared
+    nameserver pool; the whois bulk session, which blocks on a socket,
+    runs in a worker thread.
+    """
+    try:
+        transport = get_transport(transport)
+        if transport != "dns":
+            return await asyncio.to_thread(asnlookup_bulk, ips, mode, transport)
+        # Sanitize input
+        ips = _split_ips(ips)
+        error, unique_ips, outcomes, pending = _prepare_bulk(ips, get_lookup_mode(mode), transport)
+        if error:
+            return error
+
+        # Resolve everything else from the cache or with concurrent DNS queries
+        queried = 0
+        try:
+            for ip, record, queried_online in await _cymru_lookupmany_dns_async(pending):
+                queried += queried_online
+                outcomes[ip] = _record_result(ip, record)
+        except Exception as e:
+            for ip in pending:
+                if ip not in outcomes:
+                    outcomes[ip] = _asn_error(ip, str(e))
+        return _bulk_result(ips, unique_ips, outcomes, queried)
+
     except Exception as e:
         return {
             "status": "error",
             "error": str(e),
-            "query": ip
+            "query": {"count": len(ips) if isinstance(ips, (list, tuple)) else 0}
         }
 
 if __name__ == "__main__":
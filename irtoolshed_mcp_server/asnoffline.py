@@ -0,0 +1,115 @@
+# asnoffline.py
+import gzip
+import ipaddress
+import os
+import re
+import threading
+import maxminddb
+from irtoolshed_mcp_server.prefixcache import PrefixIndex
+
+# Constants for the offline ASN dataset
+ASN_OFFLINE_DB_ENV = "ASN_OFFLINE_DB"
+ASN_DB_FILENAME = "GeoLite2-ASN.mmdb"
+ASN_DB_PATHS = [
+    ASN_DB_FILENAME,
+    "/usr/share/GeoIP/" + ASN_DB_FILENAME,
+    os.path.expanduser("~/.local/share/GeoIP/" + ASN_DB_FILENAME)
+]
+
+_ASN_FIELD = re.compile(r"\d+")
+
+class OfflineASNIndex:
+    """
+    In-memory longest-prefix ASN index loaded from a local dataset.
+
+    Two formats are supported:
+    - A MaxMind GeoLite2-ASN .mmdb file, loaded fully into memory
+    - A CAIDA pfx2as-style text file (optionally gzipped) with lines of
+      "prefix<TAB>length<TAB>asn", plus an optional fourth column with the
+      AS name. Multi-origin ("13335_4200") and AS-set ("{1,2}") entries
+      use the first AS number.
+
+    Args:
+        path: Path to the dataset
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._reader = None
+        self._index = None
+        if path.endswith(".mmdb"):
+            self._reader = maxminddb.open_database(path, maxminddb.MODE_MEMORY)
+        else:
+            self._index = PrefixIndex()
+            self._load_pfx2as(path)
+
+    def lookup(self, ip_addr):
+        """
+        Look up the origin AS for an address.
+
+        Args:
+            ip_addr: IP address as a string or ipaddress object
+
+        Returns:
+            tuple: (as_number, as_name) as strings, or None if the address is not covered
+        """
+        if self._reader is not None:
+            record = self._reader.get(ip_addr)
+            if not record or not record.get("autonomous_system_number"):
+                return None
+            return (str(record["autonomous_system_number"]),
+                    record.get("autonomous_system_organization") or "Unknown")
+        return self._index.get(ip_addr)
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+
+    def _load_pfx2as(self, path):
+        opener = gzip.open if path.endswith(".gz") else open
+        records = {}  # share one tuple per AS across all of its prefixes
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                parts = line.split(None, 3)
+                if len(parts) < 3:
+                    continue
+                match = _ASN_FIELD.search(parts[2])
+                if not match:
+                    continue
+                try:
+                    network = ipaddress.ip_network(f"{parts[0]}/{parts[1]}", strict=False)
+                except ValueError:
+                    continue
+                name = parts[3].strip() if len(parts) > 3 and parts[3].strip() else "Unknown"
+                record = records.setdefault((match.group(), name), (match.group(), name))
+                self._index.insert(network, record)
+
+def find_offline_database():
+    """Return the offline ASN dataset path from ASN_OFFLINE_DB or the standard locations, or None."""
+    path = os.getenv(ASN_OFFLINE_DB_ENV)
+    if path:
+        return path if os.path.exists(path) else None
+    for path in ASN_DB_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+_offline_index = None
+_offline_index_lock = threading.Lock()
+
+def get_offline_index():
+    """
+    Return the process-wide offline ASN index, loading it on first use.
+
+    Returns:
+        OfflineASNIndex: The loaded index, or None if no dataset is available
+    """
+    global _offline_index
+    with _offline_index_lock:
+        if _offline_index is None:
+            path = find_offline_database()
+            if path:
+                _offline_index = OfflineASNIndex(path)
+        return _offline_index
@@ -0,0 +1,234 @@
+# cymrupool.py
+import select
+import socket
+import threading
+import time
+from collections import deque
+import cymruwhois
+
+class PooledCymruClient(cymruwhois.Client):
+    """cymruwhois client that sends each query line immediately (TCP_NODELAY)."""
+
+    def _connect(self):
+        super()._connect()
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+class CymruClientPool:
+    """
+    Bounded pool of persistent Team Cymru whois sessions.
+
+    Each pooled client holds an open bulk-mode (BEGIN) session, so a lookup
+    on a warm client costs one round trip instead of a TCP connect, BEGIN
+    handshake and teardown. Idle clients are health checked before reuse,
+    closed once they have been idle for idle_timeout seconds, and a lookup
+    that fails on a reused client is retried once on a fresh connection.
+
+    Args:
+        host: Team Cymru whois host
+        port: Team Cymru whois port
+        maxsize: Maximum number of open sessions, idle or in use
+        idle_timeout: Seconds an idle session is kept before it is closed (0 keeps
+                      it until it fails a health check)
+        wait_timeout: Seconds to wait for a free session when the pool is full
+        client_factory: Callable(host, port) returning a new, unconnected client
+    """
+
+    def __init__(self, host="whois.cymru.com", port=43, maxsize=4, idle_timeout=60.0,
+                 wait_timeout=10.0, client_factory=None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self._client_factory = client_factory or (
+            lambda host, port: PooledCymruClient(host, port, memcache_host=None))
+        self._cond = threading.Condition()
+        self._idle = deque()  # (client, last used), least recently used first
+        self._open = 0        # sessions idle or in use
+        self._closed = False
+        self._stop = threading.Event()
+        self._reaper = None
+        self.created = 0
+        self.reused = 0
+        self.retries = 0
+        self.discarded = 0
+        self.reaped = 0
+
+    def call(self, fn):
+        """
+        Run fn(client) on a pooled client and return its result.
+
+        fn must finish its exchange with the server before returning (e.g.
+        consume lookupmany() fully), so the session can be handed to the
+        next caller.
+
+        Args:
+            fn: Callable taking a connected cymruwhois client
+
+        Returns:
+            Whatever fn returns
+        """
+        for attempt in range(2):
+            client, reused = self._checkout()
+            try:
+                result = fn(client)
+            except Exception:
+                self._discard(client)
+                if reused and attempt == 0:
+                    # The server may have dropped a warm session; try a new one
+                    with self._cond:
+                        self.retries += 1
+                    continue
+                raise
+            self._checkin(client)
+            return result
+
+    def lookup(self, ip):
+        """
+        Look up a single address.
+
+        Args:
+            ip: IP address string
+
+        Returns:
+            The cymruwhois record, or None if Team Cymru has no match
+        """
+        # The record is keyed by the address as Cymru echoes it, which need not match ip's spelling
+        return self.call(lambda client: next(iter(client.lookupmany_dict([ip]).values()), None))
+
+    def reap(self):
+        """Close sessions that have been idle longer than idle_timeout."""
+        if self.idle_timeout <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._cond:
+            while self._idle and self._idle[0][1] < cutoff:
+                expired.append(self._idle.popleft()[0])
+            self._open -= len(expired)
+            self.reaped += len(expired)
+            if expired:
+                self._cond.notify(len(expired))
+        for client in expired:
+            self._close_client(client)
+
+    def close(self):
+        """Close every idle session; sessions in use are closed when returned."""
+        self._stop.set()
+        with self._cond:
+            self._closed = True
+            idle = [client for client, _ in self._idle]
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for client in idle:
+            self._close_client(client)
+
+    def stats(self):
+        """Return pool size and reuse counters as a dict."""
+        with self._cond:
+            return {
+                "maxsize": self.maxsize,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "retries": self.retries,
+                "discarded": self.discarded,
+                "reaped": self.reaped
+            }
+
+    def _checkout(self):
+        """Return (client, reused), connecting a new session if no healthy idle one exists."""
+        self.reap()
+        deadline = time.monotonic() + self.wait_timeout
+        unhealthy = []
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Team Cymru connection pool is closed")
+                    while self._idle:
+                        client, _ = self._idle.pop()
+                        if self._is_healthy(client):
+                            self.reused += 1
+                            return client, True
+                        unhealthy.append(client)
+                        self._open -= 1
+                        self.discarded += 1
+                    if self._open < self.maxsize:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a Team Cymru connection")
+                    self._cond.wait(remaining)
+        finally:
+            for client in unhealthy:
+                self._close_client(client)
+
+        try:
+            client = self._client_factory(self.host, self.port)
+            client._begin()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        self._start_reaper()
+        return client, False
+
+    def _checkin(self, client):
+        with self._cond:
+            if not self._closed:
+                self._idle.append((client, time.monotonic()))
+                self._cond.notify()
+                return
+            self._open -= 1
+        self._close_client(client)
+
+    def _discard(self, client):
+        with self._cond:
+            self._open -= 1
+            self.discarded += 1
+            self._cond.notify()
+        self._close_client(client, graceful=False)
+
+    @staticmethod
+    def _is_healthy(client):
+        """An idle session is healthy if its socket is open and has nothing to read (no EOF or stray data)."""
+        sock = getattr(client, "socket", None)
+        if sock is None or sock.fileno() < 0:
+            return False
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    @staticmethod
+    def _close_client(client, graceful=True):
+        try:
+            if graceful:
+                client.disconnect()
+            else:
+                client._disconnect()
+        except Exception:
+            pass
+
+    def _start_reaper(self):
+        with self._cond:
+            if self._reaper is not None or self.idle_timeout <= 0:
+                return
+            self._reaper = threading.Thread(target=self._run_reaper, name="cymru-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def _run_reaper(self):
+        interval = max(self.idle_timeout / 2, 0.5)
+        while not self._stop.wait(interval):
+            self.reap()
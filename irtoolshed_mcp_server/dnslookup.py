@@ -1,83 +1,271 @@
 # dnslookup.py
+import asyncio
+import os
 import dns.resolver
 import dns.exception
+from irtoolshed_mcp_server.resolver import resolve, resolve_async
+from irtoolshed_mcp_server import passivedns
 
-def dnslookup(domain, record_type="A"):
+# Record types the DNS tools accept
+valid_types = ["A", "AAAA", "MX", "NS", "TXT", "CNAME", "SOA", "PTR"]
+
+# Upper bound for caller-supplied timeout and lifetime, in seconds
+DNS_MAX_LIFETIME = 30.0
+
+# Constants for bulk lookups
+DNS_BULK_MAX_DOMAINS = 100000
+DNS_BULK_CONCURRENCY_ENV = "DNS_BULK_CONCURRENCY"
+DNS_BULK_CONCURRENCY_DEFAULT = 100
+DNS_BULK_MAX_CONCURRENCY = 1000
+DNS_BULK_LIFETIME = 5.0
+
+def _check_query(domain, record_type, timeout=None, lifetime=None):
+    """
+    Sanitize and validate a lookup request.
+
+    Returns:
+        tuple: (domain, record_type, error dict or None)
+    """
+    # Sanitize inputs
+    domain = domain.strip() if domain else ""
+    record_type = record_type.strip().upper() if record_type else "A"
+
+    # Validate record type
+    if record_type not in valid_types:
+        return domain, record_type, {
+            "status": "error",
+            "error": f"Invalid record type. Must be one of: {', '.join(valid_types)}",
+            "query": {"domain": domain, "record_type": record_type}
+        }
+
+    # Validate timeouts
+    for name, value in (("timeout", timeout), ("lifetime", lifetime)):
+        if value is not None and not 0 < value <= DNS_MAX_LIFETIME:
+            return domain, record_type, {
+                "status": "error",
+                "error": f"Invalid {name}. Must be greater than 0 and at most {DNS_MAX_LIFETIME:g} seconds",
+                "query": {"domain": domain, "record_type": record_type}
+            }
+    return domain, record_type, None
+
+def _format_answers(domain, record_type, answers):
+    """Build the success result for a dnspython answer."""
+    records = []
+    for rdata in answers:
+        if record_type == "MX":
+            records.append({
+                "preference": rdata.preference,
+                "exchange": str(rdata.exchange)
+            })
+        else:
+            records.append(str(rdata))
+
+    return {
+        "status": "success",
+        "domain": domain,
+        "record_type": record_type,
+        "records": records
+    }
+
+def _format_error(error, domain, record_type):
+    """Build the error result for an exception raised while resolving."""
+    if isinstance(error, dns.resolver.NXDOMAIN):
+        message = f"Domain {domain} does not exist"
+    elif isinstance(error, dns.resolver.NoAnswer):
+        message = f"No {record_type} records found for {domain}"
+    elif isinstance(error, dns.resolver.NoNameservers):
+        message = f"No nameservers available for {domain}"
+    elif isinstance(error, dns.exception.Timeout):
+        message = "DNS query timed out"
+    else:
+        message = str(error)
+    return {
+        "status": "error",
+        "error": message,
+        "query": {"domain": domain, "record_type": record_type}
+    }
+
+def dnslookup(domain, record_type="A", timeout=None, lifetime=None):
     """
     Perform DNS lookups for a domain with specified record type.
 
     Args:
         domain: The domain name to look up
         record_type: The DNS record type (A, AAAA, MX, etc.)
+        timeout: Seconds to wait for each nameserver (optional)
+        lifetime: Seconds to spend on the whole query (optional)
 
     Returns:
         dict: A dictionary with domain, record type, and results or error information
     """
+    domain, record_type, error = _check_query(domain, record_type, timeout, lifetime)
+    if error:
+        return error
     try:
-        # Sanitize inputs
-        domain = domain.strip() if domain else ""
-        record_type = record_type.strip().upper() if record_type else "A"
-        
-        # Validate record type
-        valid_types = ["A", "AAAA", "MX", "NS", "TXT", "CNAME", "SOA", "PTR"]
-        if record_type not in valid_types:
-            return {
-                "status": "error",
-                "error": f"Invalid record type. Must be one of: {', '.join(valid_types)}",
-                "query": {"domain": domain, "record_type": record_type}
-            }
+        # Perform DNS query through the shared, caching resolver
+        answers = resolve(domain, record_type, timeout, lifetime)
+        passivedns.observe(domain, record_type, answers)
+        return _format_answers(domain, record_type, answers)
+    except Exception as e:
+        return _format_error(e, domain, record_type)
+
+async def dnslookup_async(domain, record_type="A", timeout=None, lifetime=None):
+    """
+    Asyncio version of dnslookup(), for use inside an event loop.
+
+    A slow or timing-out query only suspends its own task, so concurrent
+    lookups interleave instead of queueing behind it.
+
+    Args:
+        domain: The domain name to look up
+        record_type: The DNS record type (A, AAAA, MX, etc.)
+        timeout: Seconds to wait for each nameserver (optional)
+        lifetime: Seconds to spend on the whole query (optional)
+
+    Returns:
+        dict: The same result as dnslookup()
+    """
+    domain, record_type, error = _check_query(domain, record_type, timeout, lifetime)
+    if error:
+        return error
+    try:
+        # Perform DNS query through the shared, caching asyncio resolver
+        answers = await resolve_async(domain, record_type, timeout, lifetime)
+        passivedns.observe(domain, record_type, answers)
+        return _format_answers(domain, record_type, answers)
+    except Exception as e:
+        return _format_error(e, domain, record_type)
 
-        # Perform DNS query
-        answers = dns.resolver.resolve(domain, record_type)
-        
-        # Process the results
-        records = []
-        for rdata in answers:
-            if record_type == "MX":
-                records.append({
-                    "preference": rdata.preference,
-                    "exchange": str(rdata.exchange)
-                })
-            else:
-                records.append(str(rdata))
-        
+async def dnslookup_all(domain, record_types=None, timeout=None, lifetime=None):
+    """
+    Look up several record types for a domain concurrently.
+
+    Every type is queried at once, so the call takes about as long as the
+    slowest single query rather than the sum of all of them.
+
+    Args:
+        domain: The domain name to look up
+        record_types: Record types to query (default: all of valid_types)
+        timeout: Seconds to wait for each nameserver (optional)
+        lifetime: Seconds to spend on each query (optional)
+
+    Returns:
+        dict: Per-type results under "results", each with its own status and
+              either "records" or "error"
+    """
+    record_types = record_types or valid_types
+    if isinstance(record_types, str):
+        record_types = record_types.split(",")
+    types = []
+    for record_type in record_types:
+        domain, record_type, error = _check_query(domain, record_type, timeout, lifetime)
+        if error:
+            error["query"] = {"domain": domain, "record_types": list(record_types)}
+            return error
+        if record_type not in types:
+            types.append(record_type)
+
+    answers = await asyncio.gather(*(dnslookup_async(domain, t, timeout, lifetime) for t in types))
+    results = {}
+    for record_type, answer in zip(types, answers):
+        if answer["status"] == "success":
+            results[record_type] = {"status": "success", "records": answer["records"]}
+        else:
+            results[record_type] = {"status": "error", "error": answer["error"]}
+
+    if any(r["status"] == "success" for r in results.values()):
         return {
             "status": "success",
             "domain": domain,
-            "record_type": record_type,
-            "records": records
+            "record_types": types,
+            "results": results
         }
+    errors = {r["error"] for r in results.values()}
+    return {
+        "status": "error",
+        "error": errors.pop() if len(errors) == 1 else f"No records found for {domain}",
+        "query": {"domain": domain, "record_types": types},
+        "results": results
+    }
 
-    except dns.resolver.NXDOMAIN:
-        return {
-            "status": "error",
-            "error": f"Domain {domain} does not exist",
-            "query": {"domain": domain, "record_type": record_type}
-        }
-    except dns.resolver.NoAnswer:
+def _normalize_domain(domain):
+    """Strip whitespace and the trailing dot and lowercase a domain name."""
+    return domain.strip().rstrip(".").lower()
+
+async def dnslookup_bulk(domains, record_type="A", concurrency=None, timeout=None, lifetime=None):
+    """
+    Look up one record type for many domains in one call.
+
+    Domains are normalized (stripped, lowercased, trailing dot removed) and
+    deduplicated, then resolved by a fixed number of concurrent workers so
+    at most `concurrency` queries are in flight.
+
+    Args:
+        domains: List of domain names, or a string of comma/whitespace separated names
+        record_type: The DNS record type (A, AAAA, MX, etc.)
+        concurrency: Maximum queries in flight (default DNS_BULK_CONCURRENCY, or 100)
+        timeout: Seconds to wait for each nameserver (optional)
+        lifetime: Seconds to spend on each query (default 5)
+
+    Returns:
+        dict: Per-domain results in dnslookup()'s format, in input order, plus a summary
+    """
+    # Sanitize input
+    if isinstance(domains, str):
+        domains = domains.replace(",", " ").split()
+    domains = [_normalize_domain(d) for d in (domains or []) if d and _normalize_domain(d)]
+    record_type = record_type.strip().upper() if record_type else "A"
+    if concurrency is None:
+        concurrency = int(os.getenv(DNS_BULK_CONCURRENCY_ENV) or DNS_BULK_CONCURRENCY_DEFAULT)
+    lifetime = DNS_BULK_LIFETIME if lifetime is None else lifetime
+
+    if not domains:
         return {
             "status": "error",
-            "error": f"No {record_type} records found for {domain}",
-            "query": {"domain": domain, "record_type": record_type}
+            "error": "No domains provided",
+            "query": {"count": 0, "record_type": record_type}
         }
-    except dns.resolver.NoNameservers:
+    if len(domains) > DNS_BULK_MAX_DOMAINS:
         return {
             "status": "error",
-            "error": f"No nameservers available for {domain}",
-            "query": {"domain": domain, "record_type": record_type}
+            "error": f"Too many domains. Maximum is {DNS_BULK_MAX_DOMAINS}",
+            "query": {"count": len(domains), "record_type": record_type}
         }
-    except dns.exception.Timeout:
+    if not 1 <= concurrency <= DNS_BULK_MAX_CONCURRENCY:
         return {
             "status": "error",
-            "error": "DNS query timed out",
-            "query": {"domain": domain, "record_type": record_type}
+            "error": f"Invalid concurrency. Must be between 1 and {DNS_BULK_MAX_CONCURRENCY}",
+            "query": {"count": len(domains), "record_type": record_type}
         }
-    except Exception as e:
-        return {
-            "status": "error",
-            "error": str(e),
-            "query": {"domain": domain, "record_type": record_type}
+    _, record_type, error = _check_query("", record_type, timeout, lifetime)
+    if error:
+        error["query"] = {"count": len(domains), "record_type": record_type}
+        return error
+
+    # Deduplicate, keeping first-seen order
+    unique_domains = list(dict.fromkeys(domains))
+    results = [None] * len(unique_domains)
+    pending = iter(enumerate(unique_domains))
+
+    async def worker():
+        for i, domain in pending:
+            results[i] = await dnslookup_async(domain, record_type, timeout, lifetime)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(unique_domains)))))
+
+    return {
+        "status": "success",
+        "record_type": record_type,
+        "results": results,
+        "summary": {
+            "total": len(domains),
+            "unique": len(unique_domains),
+            "resolved": sum(1 for r in results if r["status"] == "success"),
+            "not_found": sum(1 for r in results if r["status"] == "error" and (
+                r["error"].endswith(" does not exist") or r["error"].startswith(f"No {record_type} records found"))),
+            "timed_out": sum(1 for r in results if r.get("error") == "DNS query timed out")
         }
+    }
 
 if __name__ == "__main__":
     print("Running dnslookup as main")
@@ -86,4 +274,4 @@ if __name__ == "__main__":
     print(f"A Record Result: {result}")
     # Test MX record
     result = dnslookup("google.com", "MX")
-    print(f"MX Record Result: {result}") 
\ No newline at end of file
+    print(f"MX Record Result: {result}")
\ No newline at end of file
@@ -0,0 +1,317 @@
+# dnstransport.py
+import asyncio
+import os
+import random
+import ssl
+import struct
+import time
+import dns.exception
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.resolver
+
+# Constants for stream transports
+DNS_TRANSPORT_ENV = "DNS_TRANSPORT"
+DNS_TRANSPORTS = ["udp", "tcp", "tls"]
+DNS_TRANSPORT_DEFAULT = "udp"
+DNS_TLS_PORT = 853
+DNS_TLS_SERVER_NAME_ENV = "DNS_TLS_SERVER_NAME"
+DNS_CONNECTION_IDLE_TIMEOUT_ENV = "DNS_CONNECTION_IDLE_TIMEOUT"
+DNS_CONNECTION_IDLE_TIMEOUT_DEFAULT = 30.0
+
+class DNSConnection:
+    """
+    One persistent, pipelined DNS-over-TCP (RFC 7766) or DNS-over-TLS (RFC 7858) connection.
+
+    Queries are written as soon as they are issued and matched to responses
+    by message ID, so several can be in flight at once. The connection is
+    opened on first use, closed after idle_timeout seconds without
+    outstanding queries, and reopened by the next query. A query that fails
+    because a reused connection was closed by the server is retried once on
+    a new connection.
+
+    Args:
+        host: Nameserver address
+        port: Nameserver port
+        ssl_context: ssl.SSLContext for DNS-over-TLS, or None for plain TCP
+        server_hostname: Name to verify the TLS certificate against (default: host)
+        idle_timeout: Seconds an idle connection is kept open
+    """
+
+    def __init__(self, host, port, ssl_context=None, server_hostname=None, idle_timeout=30.0):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.server_hostname = server_hostname or host
+        self.idle_timeout = idle_timeout
+        self._reader = None
+        self._writer = None
+        self._loop = None
+        self._read_task = None
+        self._idle_handle = None
+        self._connect_lock = None
+        self._pending = {}  # message id -> future
+        self.connects = 0
+        self.queries = 0
+        self.reused = 0
+
+    @property
+    def is_open(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def query(self, request, timeout=None):
+        """
+        Send a query and wait for its response.
+
+        Args:
+            request: dns.message.QueryMessage (its ID may be changed)
+            timeout: Seconds to wait, including connecting (None waits indefinitely)
+
+        Returns:
+            dns.message.Message
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for attempt in range(2):
+            reused = await self._ensure_connected(self._remaining(deadline))
+            try:
+                return await self._exchange(request, self._remaining(deadline))
+            except (ConnectionError, EOFError, ssl.SSLError):
+                if reused and attempt == 0:
+                    continue
+                raise
+
+    def close(self):
+        """Close the connection; outstanding queries fail with ConnectionError."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._read_task is not None and self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+        self._read_task = None
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except RuntimeError:
+                pass  # its event loop is already closed
+            self._writer = None
+        self._reader = None
+        self._fail_pending(ConnectionError("DNS connection closed"))
+
+    def stats(self):
+        return {
+            "address": self.host,
+            "port": self.port,
+            "open": self.is_open,
+            "in_flight": len(self._pending),
+            "connects": self.connects,
+            "queries": self.queries,
+            "reused": self.reused
+        }
+
+    @staticmethod
+    def _remaining(deadline):
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise dns.exception.Timeout()
+        return remaining
+
+    async def _ensure_connected(self, timeout):
+        """Connect if needed; return True if an existing connection is reused."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Streams belong to the loop that opened them
+            self.close()
+            self._loop = loop
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.is_open:
+                self.reused += 1
+                return True
+            self.close()
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, ssl=self.ssl_context,
+                                            server_hostname=self.server_hostname if self.ssl_context else None),
+                    timeout)
+            except asyncio.TimeoutError:
+                raise dns.exception.Timeout()
+            self.connects += 1
+            self._read_task = loop.create_task(self._read_responses(self._reader))
+            return False
+
+    async def _exchange(self, request, timeout):
+        while request.id in self._pending:
+            request.id = random.randint(0, 65535)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request.id] = future
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        self.queries += 1
+        try:
+            wire = request.to_wire()
+            self._writer.write(struct.pack("!H", len(wire)) + wire)
+            await self._writer.drain()
+            response = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise dns.exception.Timeout()
+        finally:
+            self._pending.pop(request.id, None)
+            if not future.done():
+                future.cancel()
+            self._schedule_idle_close()
+        if not request.is_response(response):
+            raise dns.exception.FormError("DNS response does not match the query")
+        return response
+
+    async def _read_responses(self, reader):
+        try:
+            while True:
+                header = await reader.readexactly(2)
+                wire = await reader.readexactly(struct.unpack("!H", header)[0])
+                response = dns.message.from_wire(wire)
+                future = self._pending.get(response.id)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        if reader is self._reader:
+            self.close()
+
+    def _fail_pending(self, error):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _schedule_idle_close(self):
+        if self._pending or not self.is_open or self.idle_timeout <= 0:
+            return
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+        self._idle_handle = self._loop.call_later(self.idle_timeout, self.close)
+
+class DNSTransport:
+    """
+    Resolves queries over persistent TCP or TLS connections, one per nameserver.
+
+    Answers are returned, cached and raised in the same form as from
+    dnspython's resolver, so callers cannot tell the transports apart.
+
+    Args:
+        transport: "tcp" or "tls"
+        port: Nameserver port (default 53 for tcp, 853 for tls)
+        ssl_context: ssl.SSLContext for tls (default: system trust store)
+        server_hostname: Name to verify TLS certificates against (default: the nameserver address)
+        idle_timeout: Seconds an idle connection is kept open
+    """
+
+    def __init__(self, transport="tcp", port=None, ssl_context=None, server_hostname=None, idle_timeout=30.0):
+        if transport not in ("tcp", "tls"):
+            raise ValueError("transport must be tcp or tls")
+        self.transport = transport
+        self.port = port or (DNS_TLS_PORT if transport == "tls" else 53)
+        self.ssl_context = (ssl_context or ssl.create_default_context()) if transport == "tls" else None
+        self.server_hostname = server_hostname
+        self.idle_timeout = idle_timeout
+        self._connections = {}
+
+    def connection(self, address):
+        """Return the persistent connection to a nameserver, creating it on first use."""
+        connection = self._connections.get(address)
+        if connection is None:
+            connection = DNSConnection(address, self.port, self.ssl_context, self.server_hostname,
+                                       self.idle_timeout)
+            self._connections[address] = connection
+        return connection
+
+    async def resolve(self, address, qname, rdtype, cache=None, timeout=None):
+        """
+        Resolve qname with one nameserver over its persistent connection.
+
+        Raises NXDOMAIN, NoAnswer, NoNameservers (server failure or
+        connection error) or dns.exception.Timeout, like Resolver.resolve().
+
+        Args:
+            address: Nameserver address
+            qname: Domain name
+            rdtype: Record type text, e.g. "A"
+            cache: dnspython cache to store the answer in (optional)
+            timeout: Seconds to wait for the answer
+
+        Returns:
+            dns.resolver.Answer
+        """
+        name = dns.name.from_text(qname)
+        rdtype = dns.rdatatype.from_text(rdtype)
+        request = dns.message.make_query(name, rdtype, use_edns=0, payload=65535)
+        try:
+            response = await self.connection(address).query(request, timeout)
+        except (OSError, EOFError, dns.exception.FormError) as e:
+            raise dns.resolver.NoNameservers(request=request, errors=[(address, True, self.port, e, None)])
+        rcode = response.rcode()
+        if rcode == dns.rcode.NXDOMAIN:
+            answer = dns.resolver.Answer(name, dns.rdatatype.ANY, dns.rdataclass.IN, response)
+            if cache is not None:
+                cache.put((name, dns.rdatatype.ANY, dns.rdataclass.IN), answer)
+            raise dns.resolver.NXDOMAIN(qnames=[name], responses={name: response})
+        if rcode != dns.rcode.NOERROR:
+            raise dns.resolver.NoNameservers(
+                request=request, errors=[(address, True, self.port, dns.rcode.to_text(rcode), response)])
+        answer = dns.resolver.Answer(name, rdtype, dns.rdataclass.IN, response, address, self.port)
+        if cache is not None:
+            cache.put((name, rdtype, dns.rdataclass.IN), answer)
+        if answer.rrset is None:
+            raise dns.resolver.NoAnswer(response=response)
+        return answer
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+
+    def stats(self):
+        """Return the transport name and per-connection counters as a dict."""
+        return {
+            "transport": self.transport,
+            "connections": [connection.stats() for connection in self._connections.values()]
+        }
+
+def get_transport(transport=None):
+    """
+    Get the DNS transport to use.
+
+    Args:
+        transport: Explicit transport; falls back to DNS_TRANSPORT, then "udp"
+
+    Returns:
+        str: The transport name (lowercased)
+    """
+    return (transport or os.getenv(DNS_TRANSPORT_ENV) or DNS_TRANSPORT_DEFAULT).strip().lower()
+
+def create_transport(transport=None, tcp_port=None):
+    """
+    Create the configured stream transport.
+
+    Args:
+        transport: Transport name; falls back to DNS_TRANSPORT, then "udp"
+        tcp_port: Nameserver port for tcp (default 53); tls always uses 853
+
+    Returns:
+        DNSTransport, or None for plain UDP (handled by dnspython's resolver)
+    """
+    transport = get_transport(transport)
+    if transport not in DNS_TRANSPORTS:
+        raise ValueError(f"Invalid DNS transport. Must be one of: {', '.join(DNS_TRANSPORTS)}")
+    if transport == "udp":
+        return None
+    return DNSTransport(
+        transport,
+        port=tcp_port if transport == "tcp" else None,
+        server_hostname=os.getenv(DNS_TLS_SERVER_NAME_ENV) or None,
+        idle_timeout=float(os.getenv(DNS_CONNECTION_IDLE_TIMEOUT_ENV) or DNS_CONNECTION_IDLE_TIMEOUT_DEFAULT))
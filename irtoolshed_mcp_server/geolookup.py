@@ -1,11 +1,21 @@
 # geolookup.py
 import geoip2.database
+import hashlib
+import itertools
+import json
+import maxminddb
 import os
 import tarfile
 import requests
 import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 import ipaddress
+from irtoolshed_mcp_server.prefixcache import PrefixCache
 
 # Constants for database management
 MAXMIND_LICENSE_KEY_ENV = "MAXMIND_LICENSE_KEY"
@@ -16,6 +26,35 @@ GEOIP_DB_PATHS = [
     os.path.expanduser("~/.local/share/GeoIP/" + GEOIP_DB_FILENAME)
 ]
 
+# Constants for database downloads
+MAXMIND_DOWNLOAD_URL = "https://download.maxmind.com/app/geoip_download"
+GEOIP_EDITION_ID = "GeoLite2-City"
+GEOIP_DB_DIR = os.path.expanduser("~/.local/share/GeoIP")
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = 60  # seconds to connect or between received bytes, not for the whole download
+
+# Constants for the shared database reader
+GEOIP_READER_MODE_ENV = "GEOIP_READER_MODE"
+GEOIP_READER_MODES = {
+    "auto": maxminddb.MODE_AUTO,      # mmap, using the C extension when it is installed
+    "mmap": maxminddb.MODE_MMAP,      # mmap, pure Python
+    "memory": maxminddb.MODE_MEMORY,  # whole database loaded into memory
+}
+GEOIP_RELOAD_CHECK_INTERVAL = 5.0  # seconds between checks for a changed database file
+
+# Constants for the background database refresher
+GEOIP_REFRESH_INTERVAL_ENV = "GEOIP_REFRESH_INTERVAL"
+GEOIP_REFRESH_INTERVAL_DEFAULT = 6 * 3600  # seconds between age checks; 0 disables the refresher
+GEOIP_MAX_AGE = 3 * 24 * 3600  # GeoLite2 is published twice a week
+GEOIP_RETRY_INTERVAL = 300  # seconds before retrying a failed download
+
+# Constants for the per-network result cache
+GEOIP_CACHE_SIZE_ENV = "GEOIP_CACHE_SIZE"
+GEOIP_CACHE_SIZE_DEFAULT = 65536  # networks
+
+# Constants for bulk lookups
+GEOLOOKUP_BULK_MAX_IPS = 100000
+
 REGISTRATION_INSTRUCTIONS = """
 To use the geolocation service, you need a free MaxMind GeoLite2 license key.
 To obtain one:
@@ -72,65 +111,140 @@ def get_license_key():
     print("\nPlease register for a free license key and try again.")
     return None
 
-def download_database(license_key=None):
+def _read_download_state(state_path):
+    """Load the saved ETag/Last-Modified of the installed database, if any."""
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _database_checked_at(db_path):
+    """
+    Return when the database was last downloaded or confirmed current.
+
+    A 304 Not Modified leaves the file untouched, so the time of the last
+    check is kept in the download state rather than in the file's mtime.
+    """
+    checked = _read_download_state(db_path + ".state.json").get("checked") or 0
+    return max(os.path.getmtime(db_path), checked)
+
+def _write_download_state(state_path, state):
+    """Save the ETag/Last-Modified of the installed database, and when it was last checked, next to it."""
+    tmp_path = state_path + ".part"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+def download_database(license_key=None, db_dir=None, download_url=MAXMIND_DOWNLOAD_URL):
     """
     Download and set up the MaxMind GeoLite2 City database.
-    
+
+    The archive is streamed to a temporary file in chunks, checked against
+    MaxMind's sha256 sidecar, and only the .mmdb member is extracted. The
+    extracted database is opened once to validate it and then atomically
+    renamed into place, so readers never see a partly written file. The
+    ETag/Last-Modified of the installed edition are sent with the next
+    request, and a 304 Not Modified answer skips the download entirely.
+
     Args:
-        license_key: Optional MaxMind license key. If not provided, will look for MAXMIND_LICENSE_KEY env var
-                    or prompt the user.
-    
+        license_key: Optional MaxMind license key. If not provided, will look for MAXMIND_LICENSE_KEY env var.
+        db_dir: Directory to install the database into. Defaults to ~/.local/share/GeoIP
+        download_url: MaxMind download endpoint (overridable for testing)
+
     Returns:
-        str: Path to the database file if successful, None if failed
+        str: Path to the database file if successful or already up to date, None if failed
     """
+    tmp_paths = []
     try:
+        license_key = license_key or os.getenv(MAXMIND_LICENSE_KEY_ENV)
+
         # Create ~/.local/share/GeoIP directory if it doesn't exist
-        db_dir = os.path.expanduser("~/.local/share/GeoIP")
+        db_dir = db_dir or GEOIP_DB_DIR
         os.makedirs(db_dir, exist_ok=True)
         db_path = os.path.join(db_dir, GEOIP_DB_FILENAME)
+        state_path = db_path + ".state.json"
+        params = {"edition_id": GEOIP_EDITION_ID, "license_key": license_key, "suffix": "tar.gz"}
 
-        # Download the database
-        url = f"https://download.maxmind.com/app/geoip_download?edition_id=GeoLite2-City&license_key={license_key}&suffix=tar.gz"
-        print("\nDownloading GeoLite2 City database...")
-        response = requests.get(url)
-        
-        if response.status_code == 401:
-            print("\nError: Invalid MaxMind license key")
-            return None
-            
-        response.raise_for_status()
-
-        # Save and extract the database
-        tar_path = os.path.join(db_dir, "geolite2-city.tar.gz")
-        with open(tar_path, 'wb') as f:
-            shutil.copyfileobj(response.raw, f)
-
-        # Extract the .mmdb file from the tar.gz
-        with tarfile.open(tar_path) as tar:
-            for member in tar.getmembers():
-                if member.name.endswith(GEOIP_DB_FILENAME):
-                    member.name = os.path.basename(member.name)
-                    tar.extract(member, db_dir)
-                    extracted_db = os.path.join(db_dir, member.name)
-                    # Move to final location if needed
-                    if extracted_db != db_path:
-                        shutil.move(extracted_db, db_path)
-                    break
-
-        # Clean up
-        os.remove(tar_path)
-        print(f"Database downloaded and installed to {db_path}")
+        # Only fetch the archive if it changed since the installed edition
+        headers = {}
+        state = _read_download_state(state_path) if os.path.exists(db_path) else {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        print("\nDownloading GeoLite2 City database...", file=sys.stderr)
+        with requests.Session() as session:
+            with session.get(download_url, params=params, headers=headers,
+                             stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code == 304:
+                    _write_download_state(state_path, dict(state, checked=time.time()))
+                    print(f"Database at {db_path} is already up to date", file=sys.stderr)
+                    return db_path
+
+                if response.status_code == 401:
+                    print("\nError: Invalid MaxMind license key", file=sys.stderr)
+                    return None
+
+                response.raise_for_status()
+
+                # Stream the archive to a temporary file, hashing as we go
+                digest = hashlib.sha256()
+                tar_fd, tar_path = tempfile.mkstemp(dir=db_dir, suffix=".tar.gz.part")
+                tmp_paths.append(tar_path)
+                with os.fdopen(tar_fd, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                new_state = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "checked": time.time()
+                }
+
+            # Verify the archive against the published checksum
+            checksum = session.get(download_url, params=dict(params, suffix="tar.gz.sha256"),
+                                   timeout=DOWNLOAD_TIMEOUT)
+            checksum.raise_for_status()
+            expected = checksum.text.split()[0].lower() if checksum.text.strip() else None
+            if digest.hexdigest() != expected:
+                print("\nError downloading database: checksum mismatch", file=sys.stderr)
+                return None
+
+        # Extract only the .mmdb member, next to the final path so the rename is atomic
+        db_fd, tmp_db_path = tempfile.mkstemp(dir=db_dir, suffix=".mmdb.part")
+        tmp_paths.append(tmp_db_path)
+        with os.fdopen(db_fd, "wb") as out, tarfile.open(tar_path, "r:gz") as tar:
+            member = next((m for m in tar if m.isfile() and os.path.basename(m.name) == GEOIP_DB_FILENAME), None)
+            if member is None:
+                print(f"\nError downloading database: {GEOIP_DB_FILENAME} not found in archive", file=sys.stderr)
+                return None
+            shutil.copyfileobj(tar.extractfile(member), out, DOWNLOAD_CHUNK_SIZE)
+            out.flush()
+            os.fsync(out.fileno())
+        os.chmod(tmp_db_path, 0o644)
+
+        # Make sure the new database opens before anyone can see it
+        maxminddb.open_database(tmp_db_path).close()
+        os.replace(tmp_db_path, db_path)
+        _write_download_state(state_path, new_state)
+        print(f"Database downloaded and installed to {db_path}", file=sys.stderr)
         return db_path
 
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 401:
-            print("\nError: Invalid MaxMind license key")
+            print("\nError: Invalid MaxMind license key", file=sys.stderr)
         else:
-            print(f"\nError downloading database: {str(e)}")
+            print(f"\nError downloading database: {str(e)}", file=sys.stderr)
         return None
     except Exception as e:
-        print(f"\nError downloading database: {str(e)}")
+        print(f"\nError downloading database: {str(e)}", file=sys.stderr)
         return None
+    finally:
+        for path in tmp_paths:
+            if os.path.exists(path):
+                os.remove(path)
 
 def has_geoip_database():
     """Check if GeoIP database exists in any of the standard locations."""
@@ -141,26 +255,525 @@ def has_geoip_database():
     ]
     return any(os.path.exists(p) for p in db_paths)
 
-def find_or_download_database(license_key=None):
-    """Find existing database or download if not found."""
-    # Check common locations
-    db_paths = [
-        GEOIP_DB_FILENAME,
-        "/usr/share/GeoIP/GeoLite2-City.mmdb",
-        os.path.expanduser("~/.local/share/GeoIP/GeoLite2-City.mmdb")
-    ]
-    
-    for path in db_paths:
+def find_database():
+    """Return the first existing database in the standard locations, or None."""
+    for path in GEOIP_DB_PATHS:
         if os.path.exists(path):
             return path
-            
-    # If not found, try to download
-    return download_database(license_key)
+    return None
+
+def find_or_download_database(license_key=None):
+    """Find existing database or download if not found."""
+    # Check common locations, and if not found, try to download
+    return find_database() or download_database(license_key)
+
+def _file_signature(path):
+    """Return a tuple that changes whenever the file at path is replaced or rewritten."""
+    st = os.stat(path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+# Process-wide, so a number never identifies two readers, even across managers
+_generation_numbers = itertools.count(1)
+
+class _ReaderGeneration:
+    """One opened database file, its generation number and the number of lookups currently using it."""
+
+    def __init__(self, reader, path, signature):
+        self.reader = reader
+        self.number = next(_generation_numbers)
+        self.path = path
+        self.signature = signature
+        self.in_flight = 0
+        self.retired = False
+
+class GeoIPReaderManager:
+    """
+    Process-wide owner of the open GeoIP2 database reader.
+
+    The database is opened once and shared by every lookup. At most every
+    check_interval seconds the file on disk is stat()ed; if it was replaced,
+    a new reader is opened and swapped in, and the old one is closed as soon
+    as the lookups still using it have finished. If the new file cannot be
+    opened, the current reader stays in use until the next check.
+
+    Args:
+        mode: Reader mode, one of GEOIP_READER_MODES. Defaults to the
+              GEOIP_READER_MODE environment variable, or "auto".
+        check_interval: Seconds between checks for a changed database file
+        opener: Callable (path, mode) -> reader, mainly for testing
+    """
+
+    def __init__(self, mode=None, check_interval=GEOIP_RELOAD_CHECK_INTERVAL, opener=None):
+        mode = (mode or os.getenv(GEOIP_READER_MODE_ENV) or "auto").strip().lower()
+        if mode not in GEOIP_READER_MODES:
+            raise ValueError(f"Invalid GeoIP reader mode. Must be one of: {', '.join(GEOIP_READER_MODES)}")
+        self.mode = mode
+        self.check_interval = check_interval
+        self._opener = opener or (lambda path, mode: geoip2.database.Reader(path, mode=mode))
+        self._lock = threading.Lock()
+        self._current = None
+        self._next_check = 0.0
+        self.reloads = 0
+
+    @property
+    def path(self):
+        """Path of the currently open database, or None if nothing is open yet."""
+        current = self._current
+        return current.path if current else None
+
+    @contextmanager
+    def reader(self, db_path):
+        """
+        Borrow the shared reader for db_path for the duration of a with block.
+
+        Raises:
+            FileNotFoundError: If no reader is open and db_path does not exist
+        """
+        with self.generation(db_path) as generation:
+            yield generation.reader
+
+    @contextmanager
+    def generation(self, db_path):
+        """Like reader(), but yield the reader's generation, whose number changes on every reload."""
+        generation = self._acquire(db_path)
+        try:
+            yield generation
+        finally:
+            self._release(generation)
+
+    def reload(self):
+        """Force the next lookup to re-check the database file on disk."""
+        with self._lock:
+            self._next_check = 0.0
+
+    def close(self):
+        """Drop the current reader; it is closed once in-flight lookups finish."""
+        with self._lock:
+            retired = self._retire(self._current)
+            self._current = None
+        if retired:
+            retired.reader.close()
+
+    def _acquire(self, db_path):
+        now = time.monotonic()
+        with self._lock:
+            current = self._current
+            if current and current.path == db_path and now < self._next_check:
+                current.in_flight += 1
+                return current
+
+        # Time to check the file; stat() and open happen outside the lock so
+        # lookups against the current reader are never held up by a reload
+        try:
+            signature = _file_signature(db_path)
+        except FileNotFoundError:
+            if current is None or current.path != db_path:
+                raise
+            # File is briefly missing (e.g. mid-replace); keep serving what we have
+            signature = current.signature
+
+        with self._lock:
+            current = self._current
+            if current and current.path == db_path and current.signature == signature:
+                self._next_check = now + self.check_interval
+                current.in_flight += 1
+                return current
+
+        try:
+            new = _ReaderGeneration(self._opener(db_path, GEOIP_READER_MODES[self.mode]), db_path, signature)
+        except Exception as e:
+            with self._lock:
+                current = self._current
+                if not (current and current.path == db_path):
+                    raise
+                # The new file is corrupt or half-written; keep serving the
+                # current one and try again after the next check interval
+                self._next_check = now + self.check_interval
+                current.in_flight += 1
+            print(f"Error opening GeoIP database {db_path}, keeping the current one: {str(e)}", file=sys.stderr)
+            return current
+
+        with self._lock:
+            current = self._current
+            if current and current.path == db_path and current.signature == signature:
+                # Another thread swapped in the same file while we were opening it
+                current.in_flight += 1
+                result, retired = current, new
+            else:
+                retired = self._retire(current)
+                self._current = new
+                self.reloads += 1
+                new.in_flight += 1
+                result = new
+            self._next_check = now + self.check_interval
+
+        if retired:
+            retired.reader.close()
+        return result
+
+    def _release(self, generation):
+        with self._lock:
+            generation.in_flight -= 1
+            close = generation.retired and generation.in_flight == 0
+        if close:
+            generation.reader.close()
+
+    def _retire(self, generation):
+        """Mark generation as replaced; return it if it can be closed right away. Call with lock held."""
+        if generation is None:
+            return None
+        generation.retired = True
+        return generation if generation.in_flight == 0 else None
+
+_reader_manager = None
+_reader_manager_lock = threading.Lock()
+
+def get_reader_manager():
+    """Return the process-wide GeoIPReaderManager, creating it on first use."""
+    global _reader_manager
+    with _reader_manager_lock:
+        if _reader_manager is None:
+            _reader_manager = GeoIPReaderManager()
+        return _reader_manager
+
+# Built results keyed by the MaxMind network they came from. Values are
+# (generation number, result) so entries from a replaced database are never
+# served, without keeping the replaced reader (and its buffer) alive.
+_result_cache = PrefixCache(int(os.getenv(GEOIP_CACHE_SIZE_ENV) or GEOIP_CACHE_SIZE_DEFAULT))
+
+def get_cache_stats():
+    """Return hit/miss/eviction counters for the geolookup network cache."""
+    return _result_cache.stats()
+
+class GeoIPDatabaseRefresher:
+    """
+    Keeps the GeoIP database current from a background thread.
+
+    Every interval seconds the database in db_dir is checked; if it is
+    missing or older than max_age, a (conditional) download is made and
+    the new edition is opened through the reader manager before lookups
+    see it, so neither downloads nor reader setup happen on the request
+    path. A database found in another standard location is treated as
+    externally managed and never downloaded over.
+
+    Args:
+        manager: GeoIPReaderManager to hand new editions to
+        license_key: MaxMind license key; defaults to MAXMIND_LICENSE_KEY
+        db_dir: Directory to keep the database in. Defaults to ~/.local/share/GeoIP
+        interval: Seconds between age checks
+        max_age: Age in seconds after which a new edition is requested
+        download: Callable (license_key, db_dir) -> path or None, mainly for testing
+    """
+
+    def __init__(self, manager=None, license_key=None, db_dir=None, interval=GEOIP_REFRESH_INTERVAL_DEFAULT,
+                 max_age=GEOIP_MAX_AGE, download=None):
+        self.manager = manager or get_reader_manager()
+        self.db_dir = db_dir or GEOIP_DB_DIR
+        self.db_path = os.path.join(self.db_dir, GEOIP_DB_FILENAME)
+        self.interval = interval
+        self.max_age = max_age
+        self._license_key = license_key
+        self._download = download or (lambda key, db_dir: download_database(key, db_dir=db_dir))
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.state = "idle"
+        self.last_check = None
+        self.last_success = None
+        self.last_error = None
+
+    @property
+    def license_key(self):
+        return self._license_key or os.getenv(MAXMIND_LICENSE_KEY_ENV)
+
+    def start(self):
+        """Start the background thread; the first check runs immediately."""
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="geoip-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread, waiting up to timeout seconds for it to exit."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def request_refresh(self, license_key=None):
+        """
+        Ask the background thread to check the database now.
+
+        Args:
+            license_key: Optional key to use from now on
+
+        Returns:
+            bool: True if a download can happen, False if no license key is available
+        """
+        if license_key:
+            self._license_key = license_key
+        if not self.license_key:
+            return False
+        self._wake.set()
+        return True
+
+    def status(self):
+        """Return the refresher state and timestamps as a dict."""
+        return {
+            "state": self.state,
+            "database": self.manager.path or find_database(),
+            "last_check": self.last_check,
+            "last_success": self.last_success,
+            "last_error": self.last_error
+        }
+
+    def check(self):
+        """
+        Run one check, downloading a new edition if needed.
+
+        Returns:
+            float: Seconds until the next check should run
+        """
+        self.last_check = time.time()
+        existing = find_database()
+        have_own = os.path.exists(self.db_path)
+        if existing and not have_own:
+            # Managed by something else (e.g. geoipupdate); just use it
+            self.state = "ready"
+            return self.interval
+        if have_own and self.last_check - _database_checked_at(self.db_path) < self.max_age:
+            self.state = "ready"
+            return self.interval
+
+        license_key = self.license_key
+        if not license_key:
+            self.state = "ready" if have_own else "no_license"
+            self.last_error = "No MaxMind license key configured"
+            return self.interval
+
+        self.state = "refreshing" if have_own else "downloading"
+        db_path = self._download(license_key, self.db_dir)
+        if not db_path:
+            self.state = "ready" if have_own else "error"
+            self.last_error = "Database download failed"
+            return GEOIP_RETRY_INTERVAL
+
+        # Open the new edition here rather than in the next lookup
+        self.manager.reload()
+        with self.manager.reader(db_path):
+            pass
+        self.state = "ready"
+        self.last_success = time.time()
+        self.last_error = None
+        return self.interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delay = self.check()
+            except Exception as e:
+                self.state = "error"
+                self.last_error = str(e)
+                delay = GEOIP_RETRY_INTERVAL
+            self._wake.wait(delay)
+            self._wake.clear()
+
+_refresher = None
+
+def start_refresher(**kwargs):
+    """
+    Start the process-wide background database refresher.
+
+    The interval comes from GEOIP_REFRESH_INTERVAL unless given; an
+    interval of 0 leaves the refresher off.
+
+    Returns:
+        GeoIPDatabaseRefresher: The running refresher, or None if disabled
+    """
+    global _refresher
+    if "interval" not in kwargs:
+        kwargs["interval"] = float(os.getenv(GEOIP_REFRESH_INTERVAL_ENV) or GEOIP_REFRESH_INTERVAL_DEFAULT)
+    if kwargs["interval"] <= 0:
+        return None
+    if _refresher is None:
+        _refresher = GeoIPDatabaseRefresher(**kwargs)
+    _refresher.start()
+    return _refresher
+
+def get_database_status():
+    """Return the background refresher status, or a minimal status if it is not running."""
+    if _refresher is not None:
+        return _refresher.status()
+    return {"state": "disabled", "database": get_reader_manager().path or find_database()}
+
+def _locate_database(license_key):
+    """
+    Find the database lookups should use.
+
+    With the background refresher running this never blocks: if no database
+    is available yet, the refresher is nudged and a "warming" response is
+    returned. Without it, the database is downloaded synchronously.
+
+    Returns:
+        tuple: (db_path, None) on success, or (None, error dict without query)
+    """
+    db_path = get_reader_manager().path or find_database()
+    if db_path:
+        return db_path, None
+
+    refresher = _refresher
+    if refresher is not None and refresher.is_running():
+        if refresher.request_refresh(license_key):
+            return None, {
+                "status": "warming",
+                "error": "GeoIP2 database is being downloaded in the background. Please try again shortly."
+            }
+        return None, {"status": "error", "error": _missing_database_error(license_key)}
+
+    db_path = download_database(license_key)
+    if not db_path:
+        return None, {"status": "error", "error": _missing_database_error(license_key)}
+    return db_path, None
+
+def _missing_database_error(license_key):
+    """Return the error message for a database that could not be found or downloaded."""
+    if license_key:
+        return "Invalid license key"
+    return "GeoIP2 database not found and could not be downloaded. Please provide a valid MaxMind license key."
+
+def _is_private_or_reserved(ip_obj):
+    """Check if an IP address is outside public address space and so never in the database."""
+    return (ip_obj.is_private or ip_obj.is_reserved or ip_obj.is_loopback or ip_obj.is_link_local
+            or ip_obj.is_multicast or ip_obj.is_unspecified)
+
+def _build_result(ip_addr, response):
+    """Build the geolookup result dict (including raw_output) from a GeoIP2 City response."""
+    # Store raw output
+    raw_output = {
+        "continent": {
+            "code": response.continent.code,
+            "name": response.continent.name
+        },
+        "country": {
+            "iso_code": response.country.iso_code,
+            "name": response.country.name
+        },
+        "city": {
+            "name": response.city.name,
+            "confidence": response.city.confidence
+        },
+        "location": {
+            "latitude": response.location.latitude,
+            "longitude": response.location.longitude,
+            "accuracy_radius": response.location.accuracy_radius,
+            "time_zone": response.location.time_zone
+        },
+        "postal": {
+            "code": response.postal.code,
+            "confidence": response.postal.confidence
+        },
+        "subdivisions": [{
+            "iso_code": s.iso_code,
+            "name": s.name,
+            "confidence": s.confidence
+        } for s in response.subdivisions],
+        "traits": {
+            "autonomous_system_number": response.traits.autonomous_system_number,
+            "autonomous_system_organization": response.traits.autonomous_system_organization,
+            "ip_address": response.traits.ip_address,
+            "network": str(response.traits.network) if response.traits.network else None
+        }
+    }
+
+    # Process the results with default "Unknown" for unmappable fields
+    result = {
+        "status": "success",
+        "ip_addr": ip_addr,
+        "country": "Unknown",
+        "city": "Unknown",
+        "region": "Unknown",
+        "postal_code": "Unknown",
+        "timezone": "Unknown",
+        "latitude": None,
+        "longitude": None,
+        "asn": None,
+        "as_org": "Unknown",
+        "raw_output": raw_output
+    }
+
+    # Try to map known fields
+    if response.country.name:
+        result["country"] = response.country.name
+
+    if response.city.name:
+        result["city"] = response.city.name
+
+    if response.subdivisions and response.subdivisions.most_specific.name:
+        result["region"] = response.subdivisions.most_specific.name
+
+    if response.postal.code:
+        result["postal_code"] = response.postal.code
+
+    if response.location.time_zone:
+        result["timezone"] = response.location.time_zone
+
+    if response.location.latitude is not None:
+        result["latitude"] = float(response.location.latitude)
+
+    if response.location.longitude is not None:
+        result["longitude"] = float(response.location.longitude)
+
+    if response.traits.autonomous_system_number:
+        result["asn"] = response.traits.autonomous_system_number
+
+    if response.traits.autonomous_system_organization:
+        result["as_org"] = response.traits.autonomous_system_organization
+
+    # Remove None values but keep "Unknown" strings
+    result = {k: v for k, v in result.items() if v is not None}
+    return result
+
+def _lookup_template(generation, ip_addr, ip_obj):
+    """
+    Return the geolookup result for ip_addr's network, answering from the
+    network cache when possible. The result is shared with the cache; use
+    _personalize_result before handing it out.
+
+    Returns:
+        dict: The cached or freshly built result, or None if the address
+              is not in the database
+    """
+    cached = _result_cache.get(ip_obj)
+    if cached is not None and cached[0] == generation.number:
+        return cached[1]
+
+    try:
+        response = generation.reader.city(ip_addr)
+    except geoip2.errors.AddressNotFoundError as e:
+        if e.network:
+            _result_cache.put(e.network, (generation.number, None))
+        return None
+
+    result = _build_result(ip_addr, response)
+    if response.traits.network:
+        _result_cache.put(response.traits.network, (generation.number, result))
+    return result
+
+def _personalize_result(template, ip_addr):
+    """Copy a cached result, filling in the address that was actually queried."""
+    raw_output = dict(template["raw_output"])
+    raw_output["traits"] = dict(raw_output["traits"], ip_address=ip_addr)
+    return dict(template, ip_addr=ip_addr, raw_output=raw_output)
 
 def geolookup(ip_addr, license_key=None):
     """
     Look up geolocation information for an IP address using MaxMind's GeoIP2 database.
-    Will attempt to download the database if not found.
+    Will attempt to download the database if not found; when the background
+    refresher is running, returns a "warming" status instead of waiting.
 
     Args:
         ip_addr: The IP address to look up
@@ -193,110 +806,21 @@ def geolookup(ip_addr, license_key=None):
                 "query": {"ip": ip_addr}
             }
 
-        # Find or download the database
-        db_path = find_or_download_database(license_key)
-        if not db_path:
-            if license_key:
-                return {
-                    "status": "error",
-                    "error": "Invalid license key",
-                    "query": {"ip": ip_addr}
-                }
-            else:
-                return {
-                    "status": "error",
-                    "error": "GeoIP2 database not found and could not be downloaded. Please provide a valid MaxMind license key.",
-                    "query": {"ip": ip_addr}
-                }
-
-        # Perform geolocation lookup
-        with geoip2.database.Reader(db_path) as reader:
-            response = reader.city(ip_addr)
-            
-            # Store raw output
-            raw_output = {
-                "continent": {
-                    "code": response.continent.code,
-                    "name": response.continent.name
-                },
-                "country": {
-                    "iso_code": response.country.iso_code,
-                    "name": response.country.name
-                },
-                "city": {
-                    "name": response.city.name,
-                    "confidence": response.city.confidence
-                },
-                "location": {
-                    "latitude": response.location.latitude,
-                    "longitude": response.location.longitude,
-                    "accuracy_radius": response.location.accuracy_radius,
-                    "time_zone": response.location.time_zone
-                },
-                "postal": {
-                    "code": response.postal.code,
-                    "confidence": response.postal.confidence
-                },
-                "subdivisions": [{
-                    "iso_code": s.iso_code,
-                    "name": s.name,
-                    "confidence": s.confidence
-                } for s in response.subdivisions],
-                "traits": {
-                    "autonomous_system_number": response.traits.autonomous_system_number,
-                    "autonomous_system_organization": response.traits.autonomous_system_organization,
-                    "ip_address": response.traits.ip_address,
-                    "network": str(response.traits.network) if response.traits.network else None
-                }
-            }
+        # Reuse the open database if there is one, otherwise find or fetch it
+        db_path, error = _locate_database(license_key)
+        if error:
+            return dict(error, query={"ip": ip_addr})
 
-            # Process the results with default "Unknown" for unmappable fields
-            result = {
-                "status": "success",
-                "ip_addr": ip_addr,
-                "country": "Unknown",
-                "city": "Unknown",
-                "region": "Unknown",
-                "postal_code": "Unknown",
-                "timezone": "Unknown",
-                "latitude": None,
-                "longitude": None,
-                "asn": None,
-                "as_org": "Unknown",
-                "raw_output": raw_output
+        # Perform geolocation lookup against the shared reader
+        with get_reader_manager().generation(db_path) as generation:
+            template = _lookup_template(generation, ip_addr, ip_obj)
+        if template is None:
+            return {
+                "status": "error",
+                "error": "IP address not found in the database",
+                "query": {"ip": ip_addr}
             }
-
-            # Try to map known fields
-            if response.country.name:
-                result["country"] = response.country.name
-                
-            if response.city.name:
-                result["city"] = response.city.name
-                
-            if response.subdivisions and response.subdivisions.most_specific.name:
-                result["region"] = response.subdivisions.most_specific.name
-                
-            if response.postal.code:
-                result["postal_code"] = response.postal.code
-                
-            if response.location.time_zone:
-                result["timezone"] = response.location.time_zone
-                
-            if response.location.latitude is not None:
-                result["latitude"] = float(response.location.latitude)
-                
-            if response.location.longitude is not None:
-                result["longitude"] = float(response.location.longitude)
-                
-            if response.traits.autonomous_system_number:
-                result["asn"] = response.traits.autonomous_system_number
-                
-            if response.traits.autonomous_system_organization:
-                result["as_org"] = response.traits.autonomous_system_organization
-
-            # Remove None values but keep "Unknown" strings
-            result = {k: v for k, v in result.items() if v is not None}
-            return result
+        return _personalize_result(template, ip_addr)
 
     except geoip2.errors.AddressNotFoundError:
         return {
@@ -323,6 +847,148 @@ def geolookup(ip_addr, license_key=None):
             "query": {"ip": ip_addr}
         }
 
+def _build_compact_result(result):
+    """Build the compact per-IP record used by geolookup_bulk from a full geolookup result."""
+    raw_output = result["raw_output"]
+    compact = {
+        "status": "success",
+        "country": raw_output["country"]["iso_code"],
+        "city": raw_output["city"]["name"],
+        "region": raw_output["subdivisions"][-1]["name"] if raw_output["subdivisions"] else None,
+        "latitude": raw_output["location"]["latitude"],
+        "longitude": raw_output["location"]["longitude"],
+        "asn": raw_output["traits"]["autonomous_system_number"],
+        "as_org": raw_output["traits"]["autonomous_system_organization"],
+        "network": raw_output["traits"]["network"]
+    }
+    return {k: v for k, v in compact.items() if v is not None}
+
+def geolookup_bulk(ip_addrs, license_key=None):
+    """
+    Look up geolocation information for many IP addresses in one call.
+
+    Addresses are validated and deduplicated up front, private and reserved
+    addresses are skipped without touching the database, and the rest are
+    resolved against the shared reader. Results are compact (no raw_output),
+    and addresses in the same network share a single result record, so
+    memory grows with the number of distinct networks rather than addresses.
+
+    Args:
+        ip_addrs: List of IP addresses (or a comma/whitespace separated string),
+                  at most GEOLOOKUP_BULK_MAX_IPS entries
+        license_key: Optional MaxMind license key
+
+    Returns:
+        dict: A results map of IP address -> compact result, plus a summary
+              with counts, or error details.
+    """
+    try:
+        # Sanitize inputs
+        if isinstance(ip_addrs, str):
+            ip_addrs = ip_addrs.replace(",", " ").split()
+        ip_addrs = ip_addrs or []
+        license_key = license_key.strip() if license_key else None
+
+        if len(ip_addrs) > GEOLOOKUP_BULK_MAX_IPS:
+            return {
+                "status": "error",
+                "error": f"Too many IP addresses. At most {GEOLOOKUP_BULK_MAX_IPS} per call",
+                "query": {"count": len(ip_addrs)}
+            }
+
+        # One shared record per outcome keeps large batches compact
+        invalid = {"status": "error", "error": "Invalid IP address format"}
+        skipped = {"status": "skipped", "error": "Private or reserved IP address"}
+        not_found = {"status": "error", "error": "IP address not found in the database"}
+        summary = {
+            "total": len(ip_addrs),
+            "unique": 0,
+            "resolved": 0,
+            "not_found": 0,
+            "skipped": 0,
+            "invalid": 0,
+            "networks": 0,
+            "countries": {}
+        }
+
+        # Validate and dedupe before touching the database; different spellings
+        # of one address (e.g. upper-case or uncompressed IPv6) share its result
+        results = {}
+        to_resolve = []
+        first_spelling = {}  # canonical address -> first spelling seen
+        aliases = []         # (spelling, first spelling) pairs filled in at the end
+        for ip_addr in ip_addrs:
+            ip_addr = ip_addr.strip() if ip_addr else ""
+            if ip_addr in results:
+                continue
+            try:
+                ip_obj = ipaddress.ip_address(ip_addr)
+            except ValueError:
+                results[ip_addr] = invalid
+                summary["invalid"] += 1
+                continue
+            first = first_spelling.setdefault(str(ip_obj), ip_addr)
+            if first != ip_addr:
+                results[ip_addr] = None
+                aliases.append((ip_addr, first))
+                continue
+            if _is_private_or_reserved(ip_obj):
+                results[ip_addr] = skipped
+                summary["skipped"] += 1
+                continue
+            results[ip_addr] = None
+            to_resolve.append((ip_addr, ip_obj))
+        summary["unique"] = len(results) - len(aliases)
+
+        if to_resolve:
+            db_path, error = _locate_database(license_key)
+            if error:
+                return dict(error, query={"count": len(ip_addrs)})
+
+            # Resolve everything against one borrowed reader
+            networks = {}
+            countries = summary["countries"]
+            with get_reader_manager().generation(db_path) as generation:
+                for ip_addr, ip_obj in to_resolve:
+                    template = _lookup_template(generation, ip_addr, ip_obj)
+                    if template is None:
+                        results[ip_addr] = not_found
+                        summary["not_found"] += 1
+                        continue
+                    network = template["raw_output"]["traits"]["network"]
+                    record = networks.get(network) if network else None
+                    if record is None:
+                        record = _build_compact_result(template)
+                        if network:
+                            networks[network] = record
+                    results[ip_addr] = record
+                    summary["resolved"] += 1
+                    country = record.get("country", "Unknown")
+                    countries[country] = countries.get(country, 0) + 1
+            summary["networks"] = len(networks)
+
+        for ip_addr, first in aliases:
+            results[ip_addr] = results[first]
+
+        return {
+            "status": "success",
+            "results": results,
+            "summary": summary
+        }
+
+    except FileNotFoundError:
+        return {
+            "status": "error",
+            "error": "GeoIP2 database not found",
+            "query": {"count": len(ip_addrs)}
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": str(e),
+            "query": {"count": len(ip_addrs) if isinstance(ip_addrs, (list, tuple)) else 0}
+        }
+
 if __name__ == "__main__":
     print("Running geolookup as main")
     # Example usage
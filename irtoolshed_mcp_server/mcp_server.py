@@ -18,6 +18,12 @@ asnlookup("1.1.1.1")
 
 # Look up Google's IPv6 DNS
 asnlookup("2001:4860:4860::8888")
+
+# Look up an address through Team Cymru's DNS zones instead of whois
+asnlookup("8.8.8.8", transport="dns")
+
+# Look up many addresses over a single Team Cymru session
+asnlookup_bulk(["8.8.8.8", "1.1.1.1", "2001:4860:4860::8888"])
 """
 
 @mcp.prompt()
@@ -54,6 +60,9 @@ whoislookup("bbc.co.uk")
 
 # Look up a newer TLD
 whoislookup("github.dev")
+
+# Look up many domains at once; subdomains share their registration's lookup
+whoislookup_bulk(["a.example.com", "b.example.com", "example.org"], deadline=60)
 """
 
 @mcp.prompt()
@@ -73,6 +82,9 @@ geolookup("2001:4860:4860::8888")
 # Cloudflare's DNS
 geolookup("1.1.1.1")
 
+# Many addresses at once, e.g. from a firewall log
+geolookup_bulk(["8.8.8.8", "1.1.1.1", "2001:4860:4860::8888"])
+
 Note: If you haven't set up your MaxMind license key yet:
 1. Get a free key from: https://dev.maxmind.com/geoip/geolite2-free-geolocation-data
 2. Either:
@@ -83,32 +95,119 @@ Note: If you haven't set up your MaxMind license key yet:
 
 # Add the asnlookup function to the server as a tool
 @mcp.tool()
-def asnlookup(ipaddr: str) -> str:
-    from asnlookup import asnlookup
-    """perform a lookup on an IP address to get the ASN and country"""
-    return asnlookup(ipaddr)
+async def asnlookup(ipaddr: str, transport: str = None) -> str:
+    """perform a lookup on an IP address to get the ASN and country, optionally choosing the Team Cymru transport ("whois" or "dns")"""
+    from irtoolshed_mcp_server.asnlookup import asnlookup_async
+    return await asnlookup_async(ipaddr, transport=transport)
+
+# Add the asnlookup_bulk function to the server as a tool
+@mcp.tool()
+async def asnlookup_bulk(ipaddrs: list[str], transport: str = None) -> dict:
+    """perform ASN lookups for a list of IP addresses in one call, returning per-IP results in input order and a summary"""
+    from irtoolshed_mcp_server.asnlookup import asnlookup_bulk_async
+    return await asnlookup_bulk_async(ipaddrs, transport=transport)
 
 # Add the dnslookup function to the server as a tool
 @mcp.tool()
-def dnslookup(domain: str, record_type: str = "A") -> str:
-    from dnslookup import dnslookup
+async def dnslookup(domain: str, record_type: str = "A", timeout: float = None, lifetime: float = None) -> str:
     """perform a DNS lookup for a domain with specified record type"""
-    return dnslookup(domain, record_type)
+    from irtoolshed_mcp_server.dnslookup import dnslookup_async
+    return await dnslookup_async(domain, record_type, timeout, lifetime)
+
+# Add the dnslookup_all function to the server as a tool
+@mcp.tool()
+async def dnslookup_all(domain: str, record_types: list[str] = None, timeout: float = None,
+                        lifetime: float = None) -> dict:
+    """look up several DNS record types for a domain concurrently (default: all supported types), with per-type status"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_all
+    return await dnslookup_all(domain, record_types, timeout, lifetime)
+
+# Add the dnslookup_bulk function to the server as a tool
+@mcp.tool()
+async def dnslookup_bulk(domains: list[str], record_type: str = "A", concurrency: int = None,
+                         timeout: float = None, lifetime: float = None) -> dict:
+    """perform DNS lookups for a list of domains in one call, returning per-domain results in input order and a summary"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_bulk
+    return await dnslookup_bulk(domains, record_type, concurrency, timeout, lifetime)
+
+# Add the ptrsweep function to the server as a tool
+@mcp.tool()
+async def ptrsweep(cidr: str, concurrency: int = None, rate: float = None,
+                   timeout: float = None, lifetime: float = None) -> dict:
+    """resolve PTR records for every address in an IPv4 or IPv6 CIDR range, returning only addresses with records"""
+    from irtoolshed_mcp_server.ptrsweep import ptrsweep
+    return await ptrsweep(cidr, concurrency, rate, timeout, lifetime)
+
+# Add the watchlist functions to the server as tools
+@mcp.tool()
+async def watchlist_add(domains: list[str], record_types: list[str] = None) -> dict:
+    """watch domains for DNS changes; each (domain, record type) is re-resolved whenever its TTL expires"""
+    import asyncio
+    from irtoolshed_mcp_server.watchlist import get_watchlist
+    try:
+        entries = await asyncio.to_thread(get_watchlist().add, domains or [], record_types)
+    except ValueError as e:
+        return {"status": "error", "error": str(e), "query": {"domains": domains, "record_types": record_types}}
+    return {"status": "success", "entries": entries}
+
+@mcp.tool()
+def watchlist_remove(domains: list[str], record_types: list[str] = None) -> dict:
+    """stop watching domains, for the given record types or all of them"""
+    from irtoolshed_mcp_server.watchlist import get_watchlist
+    return {"status": "success", "removed": get_watchlist().remove(domains or [], record_types)}
+
+@mcp.tool()
+def watchlist_changes(since: float = None) -> dict:
+    """return watched domains whose DNS records changed after the given Unix timestamp"""
+    import time
+    from irtoolshed_mcp_server.watchlist import get_watchlist
+    now = time.time()
+    return {"status": "success", "now": now, "changes": get_watchlist().changed_since(since)}
+
+# Add the passive-DNS functions to the server as tools
+@mcp.tool()
+async def passivedns_domain(domain: str, record_type: str = None) -> dict:
+    """return every DNS record this server has seen a domain resolve to, with first/last seen times"""
+    import asyncio
+    from irtoolshed_mcp_server.passivedns import passivedns_domain
+    return await asyncio.to_thread(passivedns_domain, domain, record_type)
+
+@mcp.tool()
+async def passivedns_ip(ipaddr: str) -> dict:
+    """return every domain this server has seen resolve to an IP address, with first/last seen times"""
+    import asyncio
+    from irtoolshed_mcp_server.passivedns import passivedns_ip
+    return await asyncio.to_thread(passivedns_ip, ipaddr)
 
 # Add the whoislookup function to the server as a tool
 @mcp.tool()
 def whoislookup(domain: str) -> str:
-    from whoislookup import whoislookup
     """perform a WHOIS lookup for a domain name"""
+    from irtoolshed_mcp_server.whoislookup import whoislookup
     return whoislookup(domain)
 
+# Add the whoislookup_bulk function to the server as a tool
+@mcp.tool()
+async def whoislookup_bulk(domains: list[str], concurrency: int = None, deadline: float = None) -> dict:
+    """perform WHOIS lookups for a list of domains in one call, collapsed to registrable domains, within an overall deadline"""
+    import asyncio
+    from irtoolshed_mcp_server.whoislookup import whoislookup_bulk
+    return await asyncio.to_thread(whoislookup_bulk, domains, concurrency, deadline)
+
 # Add the geolookup function to the server as a tool
 @mcp.tool()
 def geolookup(ipaddr: str, license_key: str = None) -> str:
-    from geolookup import geolookup
     """perform a geolocation lookup for an IP address, optionally providing a MaxMind license key"""
+    from irtoolshed_mcp_server.geolookup import geolookup
     return geolookup(ipaddr, license_key)
 
+# Add the geolookup_bulk function to the server as a tool
+@mcp.tool()
+def geolookup_bulk(ipaddrs: list[str], license_key: str = None) -> dict:
+    """perform geolocation lookups for a list of IP addresses in one call, returning a per-IP result map and a summary"""
+    from irtoolshed_mcp_server.geolookup import geolookup_bulk
+    return geolookup_bulk(ipaddrs, license_key)
+
 # Add resources to provide documentation about the tools
 @mcp.resource(name="asnlookup_documentation",
              uri="resource://asnlookup/documentation")
@@ -155,12 +254,133 @@ def asnlookup_doc():
     }
     ```
 
+    ## Data Sources
+
+    By default lookups go to Team Cymru's whois service. The ASN_LOOKUP_MODE
+    environment variable selects a local dataset instead (a GeoLite2-ASN
+    .mmdb or a CAIDA pfx2as file, set with ASN_OFFLINE_DB), which works in
+    air-gapped environments and answers in microseconds:
+    - online: Team Cymru only (default)
+    - offline: local dataset only
+    - offline-first: local dataset, falling back to Team Cymru
+
+    Offline results have the same format; as_name is "Unknown" when the
+    dataset has no AS names (plain pfx2as files).
+
+    Team Cymru is queried over its port-43 whois service by default. Pass
+    transport="dns" (or set ASN_TRANSPORT=dns) to query its DNS zones
+    (origin.asn.cymru.com, origin6.asn.cymru.com and asn.cymru.com)
+    through the nameserver pool and answer cache that dnslookup uses;
+    results have the same format.
+
+    Team Cymru queries reuse a small pool of persistent whois sessions
+    (CYMRU_POOL_SIZE, default 4), so a lookup on a warm session costs one
+    round trip; sessions idle for CYMRU_POOL_IDLE_TIMEOUT seconds (default
+    60) are closed. Pool counters are available as the
+    resource://asnlookup/pool_stats resource.
+
+    Team Cymru answers are cached by the BGP prefix that announces the
+    address, so any later address inside that prefix is answered locally
+    for ASN_CACHE_TTL seconds (default 4 hours, up to ASN_CACHE_SIZE
+    prefixes). Unrouted space is cached per /24 (IPv6: /48) for
+    ASN_NEGATIVE_CACHE_TTL seconds (default 600). Cache counters are
+    available as the resource://asnlookup/cache_stats resource.
+
     Common error cases:
     - Invalid IP address format
     - No ASN information found (including private IP addresses)
+    - Invalid ASN lookup mode or transport
+    - Offline ASN database not found (offline mode)
     - Network connectivity issues
     """
 
+@mcp.resource(name="asnlookup_bulk_documentation",
+             uri="resource://asnlookup_bulk/documentation")
+def asnlookup_bulk_doc():
+    """Documentation for the asnlookup_bulk tool"""
+    return """
+    # Bulk ASN Lookup Tool Documentation
+
+    ## Overview
+
+    The asnlookup_bulk tool looks up the origin AS for up to 100,000 IP
+    addresses in a single call. Duplicate addresses are looked up once and
+    private addresses are skipped. Every address that needs Team Cymru is
+    sent over one bulk whois session (BEGIN/END), in chunks, instead of one
+    connection per address, so large batches are fast and are not throttled.
+    With transport="dns" the addresses are resolved through Team Cymru's
+    DNS zones instead, with up to ASN_DNS_CONCURRENCY (default 50) queries
+    in flight. It honors ASN_LOOKUP_MODE and ASN_TRANSPORT in the same way
+    as asnlookup.
+
+    ## Usage
+
+    ```python
+    asnlookup_bulk(["8.8.8.8", "1.1.1.1", "8.8.8.8", "10.0.0.1", "bogus"])
+    ```
+
+    ## Output Format
+
+    Results are in asnlookup's format, one per unique address, in input order:
+    ```json
+    {
+        "status": "success",
+        "results": [
+            {
+                "status": "success",
+                "ip_addr": "8.8.8.8",
+                "as_number": "15169",
+                "as_name": "GOOGLE - Google LLC, US"
+            },
+            {
+                "status": "success",
+                "ip_addr": "1.1.1.1",
+                "as_number": "13335",
+                "as_name": "CLOUDFLARENET, US"
+            },
+            {"status": "error", "error": "No ASN information found", "query": "10.0.0.1"},
+            {"status": "error", "error": "Invalid IP address format", "query": "bogus"}
+        ],
+        "summary": {
+            "total": 5,
+            "unique": 4,
+            "resolved": 2,
+            "invalid": 1,
+            "not_found": 1,
+            "queried_online": 2
+        }
+    }
+    ```
+
+    Error Response:
+    ```json
+    {
+        "status": "error",
+        "error": "Detailed error message",
+        "query": {"count": 5}
+    }
+    ```
+
+    Common error cases:
+    - No IP addresses provided
+    - Too many IP addresses in one call
+    - Network connectivity issues (reported on each affected address)
+    """
+
+@mcp.resource(name="asnlookup_pool_stats",
+             uri="resource://asnlookup/pool_stats")
+def asnlookup_pool_stats():
+    """Open, idle and reuse counters for the pooled Team Cymru whois sessions"""
+    from irtoolshed_mcp_server.asnlookup import get_pool_stats
+    return get_pool_stats()
+
+@mcp.resource(name="asnlookup_cache_stats",
+             uri="resource://asnlookup/cache_stats")
+def asnlookup_cache_stats():
+    """Hit, miss, eviction and expiry counters for the announced-prefix ASN cache"""
+    from irtoolshed_mcp_server.asnlookup import get_cache_stats
+    return get_cache_stats()
+
 @mcp.resource(name="dnslookup_documentation",
              uri="resource://dnslookup/documentation")
 def dnslookup_doc():
@@ -187,6 +407,20 @@ def dnslookup_doc():
 
     Supported record types: A, AAAA, MX, NS, TXT, CNAME, SOA, PTR
 
+    ## Timeouts
+
+    The tool runs on the server's event loop without blocking it, so a slow
+    or unresponsive nameserver only delays its own lookup. Two optional
+    arguments bound a query, each greater than 0 and at most 30 seconds:
+
+    - timeout: seconds to wait for an answer from each nameserver
+    - lifetime: seconds to spend on the whole query, across retries and
+      nameservers; when it runs out the result is "DNS query timed out"
+
+    ```python
+    dnslookup("slow.example.com", "TXT", timeout=1, lifetime=3)
+    ```
+
     ## Output Format
 
     Success Response:
@@ -232,8 +466,369 @@ def dnslookup_doc():
     - No records found
     - No nameservers available
     - DNS query timeout
+
+    ## Caching
+
+    Lookups go through one shared resolver, configured once from
+    /etc/resolv.conf (or the comma separated DNS_NAMESERVERS), with an LRU
+    answer cache of DNS_CACHE_SIZE answers (default 10000). Answers are
+    kept for their record TTL, so repeating a lookup during an
+    investigation does not leave the server until the TTL runs out.
+    "Domain does not exist" and "No records found" outcomes are cached too,
+    for the SOA minimum TTL of the zone but at most
+    DNS_NEGATIVE_CACHE_MAX_TTL seconds (default 900), and "No nameservers
+    available" for 30 seconds; cached errors are identical to fresh ones.
+    Cache counters are available as the resource://dnslookup/cache_stats
+    resource.
+
+    ## Nameserver Pool
+
+    When several nameservers are configured, each query goes to the
+    healthy one with the lowest median round-trip time. If it has not
+    answered within that server's 95th-percentile RTT (between 10 ms and
+    1 second), the query is also sent to the next best server and the
+    first answer is used; a server that fails is skipped straight away.
+    Servers failing half of their recent queries are avoided for 30
+    seconds. Set DNS_HEDGE_DELAY to a fixed number of seconds, or to "off"
+    to disable hedging. Per-server RTT and failure statistics are available
+    as the resource://dnslookup/nameserver_stats resource.
+
+    ## Transports
+
+    DNS_TRANSPORT selects how queries reach the nameservers:
+
+    - udp (default): UDP, falling back to a one-off TCP connection for
+      truncated answers
+    - tcp: persistent, pipelined TCP connections on port 53, reused across
+      queries so large TXT and DNSSEC answers skip the TCP handshake
+    - tls: DNS-over-TLS on port 853 with certificate verification against
+      DNS_TLS_SERVER_NAME (default: the nameserver address)
+
+    Idle connections are closed after DNS_CONNECTION_IDLE_TIMEOUT seconds
+    (default 30) and reopened on demand. Results have the same format with
+    every transport.
     """
 
+@mcp.resource(name="dnslookup_all_documentation",
+             uri="resource://dnslookup_all/documentation")
+def dnslookup_all_doc():
+    """Documentation for the dnslookup_all tool"""
+    return """
+    # All-Record-Types DNS Lookup Tool Documentation
+
+    ## Overview
+
+    The dnslookup_all tool profiles a domain in one call. It queries a set
+    of record types concurrently, defaulting to every type dnslookup
+    supports (A, AAAA, MX, NS, TXT, CNAME, SOA, PTR), so the call takes
+    about as long as the slowest single query instead of the sum of eight
+    round trips. Answers come from the same shared resolver and cache as
+    dnslookup, and timeout and lifetime apply to each query.
+
+    ## Usage
+
+    ```python
+    dnslookup_all("google.com")
+    dnslookup_all("google.com", ["A", "AAAA", "MX"])
+    ```
+
+    ## Output Format
+
+    Each type has its own status; the call succeeds if any type has records:
+    ```json
+    {
+        "status": "success",
+        "domain": "google.com",
+        "record_types": ["A", "MX", "CNAME"],
+        "results": {
+            "A": {"status": "success", "records": ["142.250.190.78"]},
+            "MX": {
+                "status": "success",
+                "records": [{"preference": 10, "exchange": "smtp.google.com."}]
+            },
+            "CNAME": {"status": "error", "error": "No CNAME records found for google.com"}
+        }
+    }
+    ```
+
+    If no type has records, status is "error" with the shared error (for
+    example "Domain example.invalid does not exist"), the query and the
+    per-type results. An invalid record type or timeout fails the whole
+    call before any query is sent.
+    """
+
+@mcp.resource(name="dnslookup_bulk_documentation",
+             uri="resource://dnslookup_bulk/documentation")
+def dnslookup_bulk_doc():
+    """Documentation for the dnslookup_bulk tool"""
+    return """
+    # Bulk DNS Lookup Tool Documentation
+
+    ## Overview
+
+    The dnslookup_bulk tool resolves one record type for up to 100,000
+    domains in a single call, for example an IOC list. Names are stripped,
+    lowercased and have any trailing dot removed, duplicates are resolved
+    once, and at most `concurrency` queries are in flight (default
+    DNS_BULK_CONCURRENCY, or 100; at most 1000). Each query is bounded by
+    `lifetime` seconds (default 5) and answers share dnslookup's cache.
+
+    ## Usage
+
+    ```python
+    dnslookup_bulk(["example.com", "Example.COM.", "google.com"])
+    dnslookup_bulk(domains, "MX", concurrency=200, lifetime=2)
+    ```
+
+    ## Output Format
+
+    Results are in dnslookup's format, one per unique domain, in input order:
+    ```json
+    {
+        "status": "success",
+        "record_type": "A",
+        "results": [
+            {
+                "status": "success",
+                "domain": "example.com",
+                "record_type": "A",
+                "records": ["93.184.216.34"]
+            },
+            {
+                "status": "error",
+                "error": "Domain nonexistent.invalid does not exist",
+                "query": {"domain": "nonexistent.invalid", "record_type": "A"}
+            }
+        ],
+        "summary": {
+            "total": 3,
+            "unique": 2,
+            "resolved": 1,
+            "not_found": 1,
+            "timed_out": 0
+        }
+    }
+    ```
+
+    An empty list, more than 100,000 domains, an invalid record type or
+    an out-of-range concurrency, timeout or lifetime fails the whole call.
+    """
+
+@mcp.resource(name="ptrsweep_documentation",
+             uri="resource://ptrsweep/documentation")
+def ptrsweep_doc():
+    """Documentation for the ptrsweep tool"""
+    return """
+    # Reverse-DNS Sweep Tool Documentation
+
+    ## Overview
+
+    The ptrsweep tool resolves the PTR record of every address in an IPv4
+    or IPv6 CIDR range, so a suspicious /24 can be mapped in one call
+    without building in-addr.arpa or ip6.arpa names by hand. Ranges are
+    limited to 4096 addresses (a /20, or an IPv6 /116); host bits are
+    ignored. Addresses are generated lazily and resolved with up to
+    PTR_SWEEP_CONCURRENCY queries in flight (default 50) at no more than
+    PTR_SWEEP_RATE queries per second (default 500); both can be passed
+    per call. Each query is bounded by `lifetime` seconds (default 5); it
+    and `timeout` must be greater than 0 and at most 30 seconds.
+
+    ## Usage
+
+    ```python
+    ptrsweep("192.0.2.0/24")
+    ptrsweep("2001:db8::/120", concurrency=20, rate=100)
+    ```
+
+    ## Output Format
+
+    Only addresses with PTR records are listed, in address order:
+    ```json
+    {
+        "status": "success",
+        "network": "192.0.2.0/24",
+        "results": [
+            {"ip_addr": "192.0.2.10", "records": ["mail.example.com."]}
+        ],
+        "summary": {
+            "addresses": 256,
+            "with_ptr": 1,
+            "timed_out": 0,
+            "errors": 0
+        }
+    }
+    ```
+
+    Error Response:
+    ```json
+    {
+        "status": "error",
+        "error": "Invalid CIDR format",
+        "query": "192.0.2.0/33"
+    }
+    ```
+    """
+
+@mcp.resource(name="dnslookup_cache_stats",
+             uri="resource://dnslookup/cache_stats")
+def dnslookup_cache_stats():
+    """Hit, miss and eviction counters for the shared DNS answer cache"""
+    from irtoolshed_mcp_server.resolver import get_cache_stats
+    return get_cache_stats()
+
+@mcp.resource(name="dnslookup_nameserver_stats",
+             uri="resource://dnslookup/nameserver_stats")
+def dnslookup_nameserver_stats():
+    """Hedging counters and per-nameserver RTT and failure statistics"""
+    from irtoolshed_mcp_server.resolver import get_nameserver_stats
+    return get_nameserver_stats()
+
+@mcp.resource(name="watchlist_documentation",
+             uri="resource://watchlist/documentation")
+def watchlist_doc():
+    """Documentation for the watchlist tools"""
+    return """
+    # Domain Watchlist Documentation
+
+    ## Overview
+
+    The watchlist tools follow suspicious domains during an incident
+    without re-running dnslookup by hand. Each watched (domain, record
+    type) keeps its last answer and is re-resolved in the background only
+    once that answer's TTL has run out (at least WATCHLIST_MIN_INTERVAL
+    seconds apart, default 30; failed lookups every 5 minutes). Polling
+    watchlist_changes is therefore free: it only reports entries whose
+    records changed.
+
+    ## Usage
+
+    ```python
+    watchlist_add(["evil.example.com", "cdn.example.net"], ["A", "NS"])
+    watchlist_changes()                 # every entry that has changed
+    watchlist_changes(1718000000.0)     # changes after a Unix timestamp
+    watchlist_remove(["cdn.example.net"])
+    ```
+
+    Pass the "now" value of one watchlist_changes response as `since` in
+    the next to see only newer changes. Up to 10,000 entries can be watched.
+
+    ## Output Format
+
+    watchlist_changes:
+    ```json
+    {
+        "status": "success",
+        "now": 1718000300.0,
+        "changes": [
+            {
+                "domain": "evil.example.com",
+                "record_type": "A",
+                "status": "success",
+                "records": ["203.0.113.9"],
+                "previous": {"status": "success", "records": ["198.51.100.7"]},
+                "ttl": 300,
+                "added_at": 1718000000.0,
+                "checked_at": 1718000290.0,
+                "next_check": 1718000590.0,
+                "changed_at": 1718000290.0
+            }
+        ]
+    }
+    ```
+
+    Entries that fail to resolve carry "status": "error" and the same
+    "error" message as dnslookup; a domain disappearing or reappearing
+    counts as a change. watchlist_add returns the entries it watches in
+    the same format.
+    """
+
+@mcp.resource(name="watchlist_stats",
+             uri="resource://watchlist/stats")
+def watchlist_stats():
+    """Number of watched entries, checks and changes, and scheduler state"""
+    from irtoolshed_mcp_server.watchlist import get_watchlist
+    return get_watchlist().stats()
+
+@mcp.resource(name="passivedns_documentation",
+             uri="resource://passivedns/documentation")
+def passivedns_doc():
+    """Documentation for the passive-DNS tools"""
+    return """
+    # Passive DNS Documentation
+
+    ## Overview
+
+    Every successful DNS resolution made by this server (dnslookup and the
+    bulk, all-types and watchlist tools) is recorded in a local SQLite
+    store at PASSIVE_DNS_DB (default
+    ~/.local/share/irtoolshed/passivedns.sqlite3; "off" disables it).
+    Writes are batched by a background thread, so lookups never wait on
+    the disk. The store is indexed by domain and by record data, so both
+    pivots answer in milliseconds:
+
+    - passivedns_domain: every record a domain has resolved to
+    - passivedns_ip: every domain seen resolving to an address
+
+    Rows not seen for PASSIVE_DNS_RETENTION_DAYS days (default 90) are
+    deleted, and the least recently seen rows go first once the store holds
+    PASSIVE_DNS_MAX_ROWS rows (default 1,000,000).
+
+    ## Usage
+
+    ```python
+    passivedns_domain("evil.example.com")
+    passivedns_domain("evil.example.com", "NS")
+    passivedns_ip("203.0.113.9")
+    ```
+
+    ## Output Format
+
+    passivedns_domain:
+    ```json
+    {
+        "status": "success",
+        "domain": "evil.example.com",
+        "records": [
+            {
+                "record_type": "A",
+                "rdata": "203.0.113.9",
+                "first_seen": 1718000000.0,
+                "last_seen": 1718086400.0,
+                "count": 12
+            }
+        ]
+    }
+    ```
+
+    passivedns_ip:
+    ```json
+    {
+        "status": "success",
+        "ip_addr": "203.0.113.9",
+        "domains": [
+            {
+                "domain": "evil.example.com",
+                "record_type": "A",
+                "first_seen": 1718000000.0,
+                "last_seen": 1718086400.0,
+                "count": 12
+            }
+        ]
+    }
+    ```
+
+    Times are Unix timestamps; results are most recently seen first, up to
+    1000 rows.
+    """
+
+@mcp.resource(name="passivedns_stats",
+             uri="resource://passivedns/stats")
+def passivedns_stats():
+    """Row count, write counters and retention settings of the passive-DNS store"""
+    from irtoolshed_mcp_server.passivedns import get_store
+    store = get_store()
+    return store.stats() if store else {"status": "disabled"}
+
 @mcp.resource(name="whoislookup_documentation",
              uri="resource://whoislookup/documentation")
 def whoislookup_doc():
@@ -287,6 +882,167 @@ def whoislookup_doc():
     - Domain not found
     - WHOIS server not available
     - Rate limiting or access restrictions
+
+    ## Caching
+
+    Results are cached on disk under the registrable domain, worked out
+    with a bundled copy of the Public Suffix List: a.example.co.uk and
+    b.example.co.uk share the entry for example.co.uk. A cached result is
+    returned exactly as first looked up, raw_output included, with the
+    queried name in "domain" (or "query"). Registered domains are kept for
+    WHOIS_CACHE_TTL seconds (default 86400) and "Domain not found" for
+    WHOIS_NEGATIVE_CACHE_TTL seconds (default 3600); other errors are not
+    cached. "Domain not found" needs an RDAP 404 or a registry "no match"
+    answer; a response with no registration data and no such marker, such
+    as a rate-limit notice, is the error "No registration data in WHOIS
+    response". WHOIS_CACHE_DB sets the SQLite file (default
+    ~/.local/share/irtoolshed/whoiscache.sqlite3) or "off". Cache counters
+    are available as the resource://whoislookup/cache_stats resource.
+
+    ## Rate Limiting
+
+    WHOIS servers throttle or ban clients that query too fast, so queries
+    are queued per server: the registry's WHOIS server for the domain, and
+    the registrar's server when its referral is followed. Each server gets a token bucket of WHOIS_RATE queries per second
+    (default 1) with bursts of WHOIS_BURST (default 3), and at most
+    WHOIS_MAX_CONCURRENCY queries in flight (default 2). Queries to one
+    server are admitted in arrival order, and a backlog at one registry
+    never delays queries to another. A query that has waited
+    WHOIS_QUEUE_TIMEOUT seconds (default 60) returns an error. Queue depth
+    and wait times per server are available as the
+    resource://whoislookup/scheduler_stats resource.
+
+    ## WHOIS Clients
+
+    By default lookups use python-whois. Set WHOIS_CLIENT=native to use
+    the built-in port-43 client instead, which:
+    - Asks whois.iana.org for a TLD's WHOIS server once and keeps the
+      answer in WHOIS_SERVER_MAP (a JSON file, default
+      ~/.local/share/irtoolshed/whois_servers.json, or "off"), refreshed
+      after WHOIS_SERVER_MAP_MAX_AGE seconds (default 604800)
+    - Queries the registry directly, with WHOIS_CONNECT_TIMEOUT (default 5)
+      and WHOIS_READ_TIMEOUT (default 10, for the whole response) seconds
+    - Follows the registrar referral only when the registry's answer lacks
+      the registrar, registrant, dates or name servers
+    Both clients return results in the same format. Native client counters
+    are available as the resource://whoislookup/client_stats resource.
+
+    ## RDAP
+
+    Lookups try RDAP first and fall back to the WHOIS client above when the
+    TLD has no RDAP service, the RDAP server fails, or it reports the
+    domain as not registered. Set WHOIS_BACKENDS to change the order or
+    drop a backend (default "rdap,whois"). The result's "source" field
+    names the backend that answered; for RDAP, raw_output holds the JSON
+    response(s).
+    - RDAP servers come from IANA's bootstrap registry (RDAP_BOOTSTRAP_URL),
+      cached in RDAP_BOOTSTRAP_FILE (default
+      ~/.local/share/irtoolshed/rdap_dns.json, or "off") and downloaded
+      again after RDAP_BOOTSTRAP_MAX_AGE seconds (default 86400)
+    - Requests share one HTTP session keeping up to RDAP_POOL_SIZE
+      connections (default 10) alive per RDAP host, with RDAP_TIMEOUT
+      seconds (default 10) per response, and are queued per host like
+      WHOIS queries
+    - The registrar's RDAP record is only fetched when the registry's
+      answer lacks a field
+    RDAP counters are available as the resource://whoislookup/rdap_stats
+    resource.
+    """
+
+@mcp.resource(name="whoislookup_cache_stats",
+             uri="resource://whoislookup/cache_stats")
+def whoislookup_cache_stats():
+    """Entry count, hit/miss counters and TTLs of the WHOIS cache"""
+    from irtoolshed_mcp_server.whoiscache import get_cache_stats
+    return get_cache_stats()
+
+@mcp.resource(name="whoislookup_scheduler_stats",
+             uri="resource://whoislookup/scheduler_stats")
+def whoislookup_scheduler_stats():
+    """Queue depth, wait times and admission counters for each WHOIS server"""
+    from irtoolshed_mcp_server.whoisscheduler import get_scheduler_stats
+    return get_scheduler_stats()
+
+@mcp.resource(name="whoislookup_client_stats",
+             uri="resource://whoislookup/client_stats")
+def whoislookup_client_stats():
+    """Query, IANA and referral counters of the native WHOIS client"""
+    from irtoolshed_mcp_server.whoisclient import get_client_stats
+    return get_client_stats()
+
+@mcp.resource(name="whoislookup_rdap_stats",
+             uri="resource://whoislookup/rdap_stats")
+def whoislookup_rdap_stats():
+    """Request, not-found, referral and bootstrap download counters of the RDAP client"""
+    from irtoolshed_mcp_server.rdapclient import get_client_stats
+    return get_client_stats()
+
+@mcp.resource(name="whoislookup_bulk_documentation",
+             uri="resource://whoislookup_bulk/documentation")
+def whoislookup_bulk_doc():
+    """Documentation for the whoislookup_bulk tool"""
+    return """
+    # Bulk WHOIS Lookup Tool Documentation
+
+    ## Overview
+
+    The whoislookup_bulk tool looks up WHOIS registration information for
+    up to 10,000 domains in a single call, for example a list of newly
+    seen domains. Names are stripped, lowercased and have any trailing dot
+    removed, then collapsed to their registrable domains (a.example.com and
+    b.example.com become example.com), and each registrable domain is
+    looked up once. Lookups run on up to `concurrency` worker threads
+    (default WHOIS_BULK_CONCURRENCY, or 16; at most 100), interleaved
+    across TLDs, and share whoislookup's cache and per-server rate limits.
+
+    The whole batch is bounded by `deadline` seconds (default
+    WHOIS_BULK_DEADLINE, or 120). When it passes, the call returns what has
+    finished: lookups still running are reported as "timed_out" and those
+    not yet started as "pending". Running lookups complete in the
+    background and land in the cache, so repeating the call picks them up.
+
+    ## Usage
+
+    ```python
+    whoislookup_bulk(["a.example.com", "b.example.com", "example.org"])
+    whoislookup_bulk(domains, concurrency=32, deadline=60)
+    ```
+
+    ## Output Format
+
+    Results are in whoislookup's format, one per registrable domain, in
+    input order:
+    ```json
+    {
+        "status": "success",
+        "results": [
+            {
+                "status": "success",
+                "domain": "example.com",
+                "registrar": "Example Registrar, LLC",
+                "...": "..."
+            },
+            {
+                "status": "timed_out",
+                "error": "WHOIS lookup did not finish before the deadline",
+                "query": "example.org",
+                "raw_output": null
+            }
+        ],
+        "collapsed": {"a.example.com": "example.com", "b.example.com": "example.com"},
+        "summary": {
+            "total": 3,
+            "unique": 2,
+            "succeeded": 1,
+            "failed": 0,
+            "timed_out": 1,
+            "pending": 0
+        }
+    }
+    ```
+
+    An empty list, more than 10,000 domains, or an out-of-range
+    concurrency or deadline fails the whole call.
     """
 
 @mcp.resource(name="geolookup_documentation",
@@ -377,6 +1133,16 @@ def geolookup_doc():
     }
     ```
 
+    While the server downloads the database in the background (first start
+    on a new host), lookups return immediately with a warming status:
+    ```json
+    {
+        "status": "warming",
+        "error": "GeoIP2 database is being downloaded in the background. Please try again shortly.",
+        "query": {"ip": "8.8.8.8"}
+    }
+    ```
+
     Common error cases:
     - Invalid IP address format
     - Private IP address
@@ -385,8 +1151,105 @@ def geolookup_doc():
     - IP not found in database
     """
 
+@mcp.resource(name="geolookup_bulk_documentation",
+             uri="resource://geolookup_bulk/documentation")
+def geolookup_bulk_doc():
+    """Documentation for the geolookup_bulk tool"""
+    return """
+    # Bulk Geolocation Lookup Tool Documentation
+
+    ## Overview
+
+    The geolookup_bulk tool geolocates up to 100,000 IP addresses in a
+    single call, for example every source address in a firewall log.
+    Addresses are validated and deduplicated first; private and reserved
+    addresses are skipped without a database lookup. It has the same
+    license key requirements as geolookup.
+
+    ## Usage
+
+    ```python
+    geolookup_bulk(["8.8.8.8", "1.1.1.1", "10.0.0.1", "bogus"])
+    ```
+
+    ## Output Format
+
+    Results are compact (no raw_output) and keyed by IP address:
+    ```json
+    {
+        "status": "success",
+        "results": {
+            "8.8.8.8": {
+                "status": "success",
+                "country": "US",
+                "latitude": 37.751,
+                "longitude": -97.822,
+                "asn": 15169,
+                "as_org": "Google LLC",
+                "network": "8.8.8.0/24"
+            },
+            "10.0.0.1": {"status": "skipped", "error": "Private or reserved IP address"},
+            "bogus": {"status": "error", "error": "Invalid IP address format"}
+        },
+        "summary": {
+            "total": 4,
+            "unique": 4,
+            "resolved": 2,
+            "not_found": 0,
+            "skipped": 1,
+            "invalid": 1,
+            "networks": 2,
+            "countries": {"US": 2}
+        }
+    }
+    ```
+
+    Error Response:
+    ```json
+    {
+        "status": "error",
+        "error": "Detailed error message",
+        "query": {"count": 4}
+    }
+    ```
+
+    Common error cases:
+    - Too many IP addresses in one call
+    - Missing or invalid MaxMind license key
+    - Database not found or download failed
+    """
+
+@mcp.resource(name="geolookup_cache_stats",
+             uri="resource://geolookup/cache_stats")
+def geolookup_cache_stats():
+    """Hit, miss and eviction counters for the geolookup per-network result cache"""
+    from irtoolshed_mcp_server.geolookup import get_cache_stats
+    return get_cache_stats()
+
+@mcp.resource(name="geolookup_database_status",
+             uri="resource://geolookup/database_status")
+def geolookup_database_status():
+    """State of the GeoIP database and its background refresher"""
+    from irtoolshed_mcp_server.geolookup import get_database_status
+    return get_database_status()
+
 def main():
     """Entry point for the MCP server"""
+    import sys
+    from irtoolshed_mcp_server.geolookup import start_refresher
+    from irtoolshed_mcp_server.asnlookup import get_lookup_mode
+    from irtoolshed_mcp_server.asnoffline import get_offline_index
+    from irtoolshed_mcp_server.passivedns import get_store
+    # Fetch or refresh the GeoIP database off the request path
+    start_refresher()
+    # Load the offline ASN dataset now rather than on the first lookup
+    if get_lookup_mode() != "online":
+        get_offline_index()
+    # Open the passive-DNS store now, so the first DNS lookup does not create it on the event loop
+    try:
+        get_store()
+    except Exception as e:
+        print(f"Passive DNS store unavailable: {e}", file=sys.stderr)
     mcp.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,264 @@
+# nameserverpool.py
+import asyncio
+import copy
+import threading
+import time
+from collections import deque
+import dns.resolver
+
+class NameserverStats:
+    """
+    Rolling RTT and failure statistics for one upstream nameserver.
+
+    Args:
+        address: Nameserver address
+        window: Number of recent queries the statistics cover
+    """
+
+    def __init__(self, address, window=100):
+        self.address = address
+        self.rtts = deque(maxlen=window)      # seconds, answered or abandoned queries
+        self.outcomes = deque(maxlen=window)  # True for a failed query
+        self.queries = 0
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def record(self, rtt, failed=False):
+        self.queries += 1
+        self.outcomes.append(failed)
+        if failed:
+            self.failures += 1
+            self.last_failure = time.monotonic()
+        else:
+            self.rtts.append(rtt)
+
+    def record_abandoned(self, elapsed):
+        """Count a query cancelled because another server answered first; it took at least elapsed."""
+        self.rtts.append(elapsed)
+
+    def percentile(self, fraction):
+        """Return the given RTT percentile in seconds, or None without samples."""
+        if not self.rtts:
+            return None
+        ordered = sorted(self.rtts)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def failure_rate(self):
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def to_dict(self, healthy):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "address": self.address,
+            "queries": self.queries,
+            "failures": self.failures,
+            "failure_rate": round(self.failure_rate(), 3),
+            "rtt_p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "rtt_p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "healthy": healthy
+        }
+
+class NameserverPool:
+    """
+    Spreads queries over several upstream nameservers and hedges slow ones.
+
+    Each query goes to the healthy server with the lowest median RTT. If it
+    has not answered after the hedge delay (that server's p95 RTT, or a
+    fixed delay), the same query is sent to the next best server and the
+    first answer wins. A server that fails outright is skipped in favour of
+    the next one straight away. Servers whose recent failure rate reaches
+    unhealthy_rate are only used when no healthy server is left, until
+    retry_interval seconds after their last failure.
+
+    Args:
+        resolver: dns.asyncresolver.Resolver whose nameservers, port and cache
+                  (a resolver.AnswerCache, or None) are used
+        hedge_delay: Fixed hedge delay in seconds, None for p95-based, or False to disable hedging
+        min_hedge_delay: Lower bound for the p95-based delay
+        max_hedge_delay: Upper bound for the p95-based delay, also used before any samples exist
+        unhealthy_rate: Failure rate at which a server is considered unhealthy
+        retry_interval: Seconds after its last failure before an unhealthy server is tried again
+        window: Number of recent queries per server the statistics cover
+        transport: dnstransport.DNSTransport to send queries over persistent TCP or TLS
+                   connections, or None to use the resolver's own UDP (and TCP fallback)
+    """
+
+    def __init__(self, resolver, hedge_delay=None, min_hedge_delay=0.01, max_hedge_delay=1.0,
+                 unhealthy_rate=0.5, retry_interval=30.0, window=100, transport=None):
+        self.resolver = resolver
+        self.transport = transport
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.unhealthy_rate = unhealthy_rate
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._servers = {str(ns): NameserverStats(str(ns), window) for ns in resolver.nameservers}
+        self.queries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def is_healthy(self, stats):
+        if len(stats.outcomes) < 3 or stats.failure_rate() < self.unhealthy_rate:
+            return True
+        return time.monotonic() - stats.last_failure >= self.retry_interval
+
+    def ranked(self):
+        """Return nameserver addresses, healthy ones first, fastest (median RTT) first."""
+        with self._lock:
+            def key(stats):
+                p50 = stats.percentile(0.5)
+                # Servers without samples sort first so they get measured
+                return (not self.is_healthy(stats), p50 if p50 is not None else 0.0)
+            return [stats.address for stats in sorted(self._servers.values(), key=key)]
+
+    def delay_for(self, address):
+        """Return seconds to wait before hedging a query sent to address, or None not to hedge."""
+        if self.hedge_delay is False:
+            return None
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            stats = self._servers[address]
+            p95 = stats.percentile(0.95) if len(stats.rtts) >= 10 else None
+        if p95 is None:
+            return self.max_hedge_delay
+        return min(max(p95, self.min_hedge_delay), self.max_hedge_delay)
+
+    async def resolve(self, qname, rdtype, timeout=None, lifetime=None):
+        """
+        Resolve qname through the pool.
+
+        Raises the same dnspython exceptions as Resolver.resolve(); answers,
+        NXDOMAIN and NoAnswer all come from (and go to) the resolver's cache.
+        Failovers and hedges share the lifetime: each attempt only gets the
+        time that is left of it.
+
+        Args:
+            qname: Domain name
+            rdtype: Record type text, e.g. "A"
+            timeout: Seconds to wait for each nameserver (default: resolver's)
+            lifetime: Seconds to spend on the whole query (default: resolver's)
+
+        Returns:
+            dns.resolver.Answer
+
+        Raises:
+            dns.resolver.LifetimeTimeout: If no server answered within the lifetime
+        """
+        cache = self.resolver.cache
+        cached = cache.lookup(qname, rdtype) if cache is not None else None
+        if cached is not None:
+            return cached
+        with self._lock:
+            self.queries += 1
+
+        limit = lifetime if lifetime is not None else self.resolver.lifetime
+        deadline = time.monotonic() + limit
+        errors = []
+
+        def remaining():
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise dns.resolver.LifetimeTimeout(timeout=limit, errors=errors)
+            return left
+
+        def start(address):
+            return asyncio.ensure_future(self._attempt(address, qname, rdtype, timeout, remaining()))
+
+        order = self.ranked()
+        primary = order[0]
+        candidates = order[1:]
+        delay = self.delay_for(primary)
+        tasks = {start(primary): primary}
+        last_error = None
+        try:
+            while tasks:
+                hedging = candidates and delay is not None
+                wait = min(delay, remaining()) if hedging else remaining()
+                done, _ = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if not hedging or delay > wait:
+                        remaining()  # the lifetime is used up
+                        continue
+                    # The primary is slow: hedge once to the next best server
+                    delay = None
+                    with self._lock:
+                        self.hedged += 1
+                    address = candidates.pop(0)
+                    tasks[start(address)] = address
+                    continue
+                for task in done:
+                    address = tasks.pop(task)
+                    try:
+                        answer = task.result()
+                    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                        self._count_win(address, primary)
+                        raise
+                    except Exception as e:
+                        last_error = e
+                        errors.append((address, False, self.resolver.port, e, None))
+                        continue
+                    self._count_win(address, primary)
+                    return answer
+                if not tasks and candidates:
+                    # Every attempt so far failed outright: move on to the next server
+                    delay = None
+                    address = candidates.pop(0)
+                    tasks[start(address)] = address
+        finally:
+            for task in tasks:
+                task.cancel()
+        raise last_error
+
+    def stats(self):
+        """Return pool counters and per-server RTT and failure statistics as a dict."""
+        with self._lock:
+            stats = {
+                "queries": self.queries,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "nameservers": [stats.to_dict(self.is_healthy(stats)) for stats in self._servers.values()]
+            }
+        stats["transport"] = self.transport.stats() if self.transport else {"transport": "udp"}
+        return stats
+
+    def _count_win(self, address, primary):
+        if address != primary:
+            with self._lock:
+                self.hedge_wins += 1
+
+    async def _attempt(self, address, qname, rdtype, timeout, lifetime):
+        """Resolve through one nameserver, recording its RTT or failure."""
+        stats = self._servers[address]
+        start = time.monotonic()
+        try:
+            answer = await self._send(address, qname, rdtype, timeout, lifetime)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            with self._lock:
+                stats.record(time.monotonic() - start)
+            raise
+        except asyncio.CancelledError:
+            with self._lock:
+                stats.record_abandoned(time.monotonic() - start)
+            raise
+        except Exception:
+            with self._lock:
+                stats.record(time.monotonic() - start, failed=True)
+            raise
+        with self._lock:
+            stats.record(time.monotonic() - start)
+        return answer
+
+    async def _send(self, address, qname, rdtype, timeout, lifetime):
+        if self.transport is not None:
+            limit = lifetime if timeout is None else min(timeout, lifetime)
+            return await self.transport.resolve(address, qname, rdtype, self.resolver.cache, limit)
+        resolver = copy.copy(self.resolver)
+        resolver.nameservers = [address]
+        if resolver.cache is not None:
+            # resolve() has already looked the query up and counted the miss
+            resolver.cache = resolver.cache.uncounted()
+        if timeout is not None:
+            resolver.timeout = timeout
+        return await resolver.resolve(qname, rdtype, lifetime=lifetime)
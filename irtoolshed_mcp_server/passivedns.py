@@ -0,0 +1,351 @@
+# passivedns.py
+import contextlib
+import ipaddress
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Constants for the local passive-DNS store
+PASSIVE_DNS_DB_ENV = "PASSIVE_DNS_DB"  # path to the SQLite file, or "off"
+PASSIVE_DNS_DB_DEFAULT = os.path.expanduser("~/.local/share/irtoolshed/passivedns.sqlite3")
+PASSIVE_DNS_RETENTION_DAYS_ENV = "PASSIVE_DNS_RETENTION_DAYS"
+PASSIVE_DNS_RETENTION_DAYS_DEFAULT = 90
+PASSIVE_DNS_MAX_ROWS_ENV = "PASSIVE_DNS_MAX_ROWS"
+PASSIVE_DNS_MAX_ROWS_DEFAULT = 1000000
+PASSIVE_DNS_BATCH_SIZE = 500
+PASSIVE_DNS_BATCH_DELAY = 0.5      # seconds to gather a batch before writing it
+PASSIVE_DNS_QUEUE_SIZE = 100000
+PASSIVE_DNS_PRUNE_INTERVAL = 3600  # seconds between retention passes
+PASSIVE_DNS_QUERY_LIMIT = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    domain TEXT NOT NULL,
+    record_type TEXT NOT NULL,
+    rdata TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (domain, record_type, rdata)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observations_rdata ON observations (rdata);
+CREATE INDEX IF NOT EXISTS observations_last_seen ON observations (last_seen);
+"""
+
+UPSERT = """
+INSERT INTO observations (domain, record_type, rdata, first_seen, last_seen, count)
+VALUES (?, ?, ?, ?, ?, 1)
+ON CONFLICT (domain, record_type, rdata) DO UPDATE SET
+    first_seen = MIN(first_seen, excluded.first_seen),
+    last_seen = MAX(last_seen, excluded.last_seen),
+    count = count + 1
+"""
+
+def _normalize_name(name):
+    return name.strip().rstrip(".").lower()
+
+class PassiveDNSStore:
+    """
+    Local passive-DNS store: every (domain, type, rdata) ever resolved, with
+    first/last seen times and a counter.
+
+    Observations are queued by observe() and written by a background thread
+    in batched transactions, so recording a lookup never waits on the disk.
+    Rows are indexed by domain and by rdata for fast pivots in both
+    directions. Rows not seen for retention_days are deleted, and the
+    oldest rows go first if the store grows beyond max_rows.
+
+    Args:
+        path: SQLite database file
+        retention_days: Days a row is kept after it was last seen (0 keeps rows forever)
+        max_rows: Maximum number of rows (0 for no limit)
+        batch_size: Maximum observations written per transaction
+        batch_delay: Seconds to wait for more observations before writing a batch
+    """
+
+    def __init__(self, path, retention_days=PASSIVE_DNS_RETENTION_DAYS_DEFAULT,
+                 max_rows=PASSIVE_DNS_MAX_ROWS_DEFAULT, batch_size=PASSIVE_DNS_BATCH_SIZE,
+                 batch_delay=PASSIVE_DNS_BATCH_DELAY):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._queue = queue.Queue(PASSIVE_DNS_QUEUE_SIZE)
+        self._local = threading.local()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._last_prune = 0.0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.pruned = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with contextlib.closing(self._connect()) as connection:
+            connection.executescript(SCHEMA)
+
+    def observe(self, domain, record_type, rdatas, seen=None):
+        """
+        Queue the records of a successful resolution for writing.
+
+        Args:
+            domain: Domain name that was resolved
+            record_type: Record type text, e.g. "A"
+            rdatas: Iterable of record data (dnspython rdata objects or strings)
+            seen: Unix timestamp of the resolution (default now)
+        """
+        seen = time.time() if seen is None else seen
+        domain = _normalize_name(domain)
+        record_type = record_type.upper()
+        self._start()
+        for rdata in rdatas:
+            rdata = str(rdata)
+            if record_type != "TXT":
+                # Names are case-insensitive; keep pivots on them exact-match
+                rdata = rdata.lower()
+            try:
+                self._queue.put_nowait((domain, record_type, rdata, seen))
+            except queue.Full:
+                self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """
+        Wait until everything observed so far has been written.
+
+        Returns:
+            bool: False if the writer did not catch up within timeout seconds
+        """
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def domain_history(self, domain, record_type=None, limit=PASSIVE_DNS_QUERY_LIMIT):
+        """
+        Return every record seen for a domain, most recently seen first.
+
+        Args:
+            domain: Domain name
+            record_type: Only this record type (optional)
+            limit: Maximum rows returned
+
+        Returns:
+            list: Dicts with record_type, rdata, first_seen, last_seen and count
+        """
+        sql = "SELECT record_type, rdata, first_seen, last_seen, count FROM observations WHERE domain = ?"
+        params = [_normalize_name(domain)]
+        if record_type:
+            sql += " AND record_type = ?"
+            params.append(record_type.upper())
+        sql += " ORDER BY last_seen DESC, record_type, rdata LIMIT ?"
+        params.append(limit)
+        rows = self._reader().execute(sql, params).fetchall()
+        return [{"record_type": r[0], "rdata": r[1], "first_seen": r[2], "last_seen": r[3], "count": r[4]}
+                for r in rows]
+
+    def rdata_domains(self, rdata, limit=PASSIVE_DNS_QUERY_LIMIT):
+        """
+        Return every domain seen resolving to a value (an address, nameserver, mail host...).
+
+        Args:
+            rdata: Record data as returned by dnslookup, e.g. "192.0.2.1" or "ns1.example.com."
+            limit: Maximum rows returned
+
+        Returns:
+            list: Dicts with domain, record_type, first_seen, last_seen and count
+        """
+        rows = self._reader().execute(
+            "SELECT domain, record_type, first_seen, last_seen, count FROM observations "
+            "WHERE rdata IN (?, ?) ORDER BY last_seen DESC, domain LIMIT ?",
+            (rdata.strip(), rdata.strip().lower(), limit)).fetchall()
+        return [{"domain": r[0], "record_type": r[1], "first_seen": r[2], "last_seen": r[3], "count": r[4]}
+                for r in rows]
+
+    def prune(self, now=None):
+        """
+        Apply the retention policy.
+
+        Returns:
+            int: Number of rows deleted
+        """
+        now = time.time() if now is None else now
+        deleted = 0
+        with contextlib.closing(self._connect()) as connection, connection:
+            if self.retention_days > 0:
+                deleted += connection.execute("DELETE FROM observations WHERE last_seen < ?",
+                                              (now - self.retention_days * 86400,)).rowcount
+            if self.max_rows > 0:
+                excess = connection.execute("SELECT COUNT(*) FROM observations").fetchone()[0] - self.max_rows
+                if excess > 0:
+                    deleted += connection.execute(
+                        "DELETE FROM observations WHERE (domain, record_type, rdata) IN ("
+                        "SELECT domain, record_type, rdata FROM observations ORDER BY last_seen LIMIT ?)",
+                        (excess,)).rowcount
+        self.pruned += deleted
+        self._last_prune = now
+        return deleted
+
+    def close(self, timeout=5.0):
+        """Write what is queued and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        """Return row count, write counters and retention settings as a dict."""
+        rows = self._reader().execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+        return {
+            "path": self.path,
+            "rows": rows,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "pruned": self.pruned,
+            "retention_days": self.retention_days,
+            "max_rows": self.max_rows
+        }
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self):
+        """Return this thread's read connection (WAL lets reads run alongside the writer)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="passive-dns-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        connection = self._connect()
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.batch_delay
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    # A flush writes what is queued now instead of waiting for a full batch
+                    deadline = 0
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic())) \
+                        if deadline else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    with connection:
+                        connection.executemany(UPSERT, [(d, t, r, s, s) for d, t, r, s in batch])
+                    self.written += len(batch)
+                    self.batches += 1
+                if time.time() - self._last_prune >= PASSIVE_DNS_PRUNE_INTERVAL:
+                    self.prune()
+            except sqlite3.Error:
+                self.dropped += len(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                connection.close()
+                return
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """
+    Return the process-wide passive-DNS store, or None if PASSIVE_DNS_DB is "off".
+
+    Returns:
+        PassiveDNSStore: The shared store, opened on first use
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.getenv(PASSIVE_DNS_DB_ENV) or PASSIVE_DNS_DB_DEFAULT
+            if path.lower() == "off":
+                return None
+            _store = PassiveDNSStore(
+                path,
+                retention_days=float(os.getenv(PASSIVE_DNS_RETENTION_DAYS_ENV) or PASSIVE_DNS_RETENTION_DAYS_DEFAULT),
+                max_rows=int(os.getenv(PASSIVE_DNS_MAX_ROWS_ENV) or PASSIVE_DNS_MAX_ROWS_DEFAULT))
+        return _store
+
+def observe(domain, record_type, rdatas):
+    """Record a successful resolution in the shared store; never raises."""
+    try:
+        store = get_store()
+        if store is not None:
+            store.observe(domain, record_type, rdatas)
+    except Exception:
+        pass
+
+def passivedns_domain(domain, record_type=None):
+    """
+    Look up the resolution history of a domain in the passive-DNS store.
+
+    Args:
+        domain: Domain name
+        record_type: Only this record type (optional)
+
+    Returns:
+        dict: Every record seen for the domain, or error information
+    """
+    domain = _normalize_name(domain) if domain else ""
+    if not domain:
+        return {"status": "error", "error": "No domain provided", "query": domain}
+    store = get_store()
+    if store is None:
+        return {"status": "error", "error": "Passive DNS store is disabled", "query": domain}
+    store.flush(1.0)
+    return {"status": "success", "domain": domain, "records": store.domain_history(domain, record_type)}
+
+def passivedns_ip(ip):
+    """
+    Look up every domain seen resolving to an IP address in the passive-DNS store.
+
+    Args:
+        ip: IPv4 or IPv6 address
+
+    Returns:
+        dict: Domains with first/last seen times, or error information
+    """
+    ip = ip.strip() if ip else ""
+    try:
+        ip_obj = ipaddress.ip_address(ip)
+    except ValueError:
+        return {"status": "error", "error": "Invalid IP address format", "query": ip}
+    store = get_store()
+    if store is None:
+        return {"status": "error", "error": "Passive DNS store is disabled", "query": ip}
+    store.flush(1.0)
+    # Stored in dnspython's canonical text form, e.g. compressed IPv6
+    return {"status": "success", "ip_addr": str(ip_obj), "domains": store.rdata_domains(str(ip_obj))}
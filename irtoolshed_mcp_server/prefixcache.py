@@ -0,0 +1,194 @@
+# prefixcache.py
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+
+_ADDRESS_BITS = {4: 32, 6: 128}
+
+def _as_address(ip_addr):
+    """Return ip_addr as an ipaddress address object."""
+    if isinstance(ip_addr, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+        return ip_addr
+    return ipaddress.ip_address(ip_addr)
+
+def _as_network(network):
+    """Return network as an ipaddress network object, ignoring host bits."""
+    if isinstance(network, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        return network
+    return ipaddress.ip_network(network, strict=False)
+
+class PrefixIndex:
+    """
+    Longest-prefix-match index of values keyed by IPv4/IPv6 network.
+
+    Each address family keeps one table per prefix length in use; a lookup
+    masks the address to each length, longest first, so it costs at most
+    one dict probe per distinct length rather than one step per bit.
+    Lookups are safe to run concurrently; writers need their own locking.
+    """
+
+    def __init__(self):
+        self._tables = {4: {}, 6: {}}    # version -> {prefixlen: {network int: value}}
+        self._lengths = {4: [], 6: []}   # version -> prefix lengths in use, longest first
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def get(self, ip_addr, default=None):
+        """
+        Return the value stored for the longest network containing ip_addr.
+
+        Args:
+            ip_addr: IP address as a string or ipaddress object
+
+        Returns:
+            The stored value, or default if no network contains ip_addr
+        """
+        found = self._find(_as_address(ip_addr))
+        return found[1] if found else default
+
+    def insert(self, network, value):
+        """
+        Store value for every address in network, replacing any value for the same network.
+
+        Args:
+            network: Network as a string (host bits are ignored) or ipaddress network object
+
+        Returns:
+            tuple: The key identifying the network, for use with remove()
+        """
+        network = _as_network(network)
+        version, prefixlen = network.version, network.prefixlen
+        table = self._tables[version].get(prefixlen)
+        if table is None:
+            table = self._tables[version][prefixlen] = {}
+            self._lengths[version] = sorted(self._tables[version], reverse=True)
+        network_int = int(network.network_address)
+        if network_int not in table:
+            self._size += 1
+        table[network_int] = value
+        return (version, prefixlen, network_int)
+
+    def remove(self, key):
+        """Remove the network identified by a key returned from insert() or _find()."""
+        version, prefixlen, network_int = key
+        table = self._tables[version][prefixlen]
+        del table[network_int]
+        self._size -= 1
+        if not table:
+            del self._tables[version][prefixlen]
+            self._lengths[version] = sorted(self._tables[version], reverse=True)
+
+    def clear(self):
+        """Remove every network."""
+        self._tables = {4: {}, 6: {}}
+        self._lengths = {4: [], 6: []}
+        self._size = 0
+
+    def _find(self, ip_obj):
+        """Return (key, value) for the longest network containing ip_obj, or None."""
+        version = ip_obj.version
+        bits = _ADDRESS_BITS[version]
+        ip_int = int(ip_obj)
+        tables = self._tables[version]
+        for prefixlen in self._lengths[version]:
+            network_int = ip_int >> (bits - prefixlen) << (bits - prefixlen)
+            table = tables.get(prefixlen)
+            if table is not None and network_int in table:
+                return (version, prefixlen, network_int), table[network_int]
+        return None
+
+class PrefixCache:
+    """
+    Longest-prefix-match cache keyed by IPv4/IPv6 network, with LRU eviction.
+
+    Values are stored against a network (e.g. 8.8.8.0/24) and looked up by
+    any address inside it, using a PrefixIndex underneath. Entries may carry
+    a time to live; an expired entry is dropped when a lookup reaches it.
+
+    Args:
+        maxsize: Maximum number of networks kept before the least recently
+                 used one is evicted
+    """
+
+    def __init__(self, maxsize=65536):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._index = PrefixIndex()
+        self._lru = OrderedDict()  # index key -> expiry (monotonic time or None), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._lru)
+
+    def get(self, ip_addr, default=None):
+        """
+        Return the value stored for the longest network containing ip_addr.
+
+        Args:
+            ip_addr: IP address as a string or ipaddress object
+
+        Returns:
+            The cached value, or default if no cached network contains ip_addr
+        """
+        ip_obj = _as_address(ip_addr)
+        with self._lock:
+            found = self._index._find(ip_obj)
+            while found is not None:
+                expires = self._lru[found[0]]
+                if expires is None or expires > time.monotonic():
+                    break
+                # Drop the stale entry; a shorter, still valid network may cover ip_addr
+                self._index.remove(found[0])
+                del self._lru[found[0]]
+                self.expired += 1
+                found = self._index._find(ip_obj)
+            if found is None:
+                self.misses += 1
+                return default
+            self._lru.move_to_end(found[0])
+            self.hits += 1
+            return found[1]
+
+    def put(self, network, value, ttl=None):
+        """
+        Store value for every address in network.
+
+        Args:
+            network: Network as a string (host bits are ignored) or ipaddress network object
+            ttl: Seconds until the entry expires, or None to keep it until evicted
+        """
+        network = _as_network(network)
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            key = self._index.insert(network, value)
+            self._lru[key] = expires
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._index.remove(self._lru.popitem(last=False)[0])
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached network; counters are kept."""
+        with self._lock:
+            self._index.clear()
+            self._lru.clear()
+
+    def stats(self):
+        """Return size, hit, miss, eviction and expiry counters as a dict."""
+        with self._lock:
+            return {
+                "size": len(self._lru),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired
+            }
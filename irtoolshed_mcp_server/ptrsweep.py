@@ -0,0 +1,157 @@
+# ptrsweep.py
+import asyncio
+import ipaddress
+import os
+import time
+import dns.exception
+import dns.resolver
+import dns.reversename
+from irtoolshed_mcp_server.dnslookup import DNS_MAX_LIFETIME
+from irtoolshed_mcp_server.resolver import resolve_async
+
+# Constants for reverse-DNS sweeps
+PTR_SWEEP_MAX_ADDRESSES = 4096  # a /20, or an IPv6 /116
+PTR_SWEEP_CONCURRENCY_ENV = "PTR_SWEEP_CONCURRENCY"
+PTR_SWEEP_CONCURRENCY_DEFAULT = 50
+PTR_SWEEP_RATE_ENV = "PTR_SWEEP_RATE"
+PTR_SWEEP_RATE_DEFAULT = 500  # queries per second
+PTR_SWEEP_LIFETIME = 5.0
+
+class RateLimiter:
+    """
+    Spaces out asyncio callers so no more than `rate` acquire per second.
+
+    Args:
+        rate: Acquisitions per second (0 or None disables the limit)
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def iter_addresses(network):
+    """
+    Yield every address in a network, one at a time.
+
+    Args:
+        network: ipaddress network object
+
+    Yields:
+        ipaddress address objects, in address order
+    """
+    # ipaddress iterates lazily; a single address (/32, /128) yields itself
+    yield from network
+
+async def _lookup_ptr(ip_obj, timeout, lifetime):
+    """Return (records or None, error message or None) for one address."""
+    try:
+        answer = await resolve_async(dns.reversename.from_address(str(ip_obj)).to_text(), "PTR",
+                                     timeout, lifetime)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return None, None
+    except dns.exception.Timeout:
+        return None, "DNS query timed out"
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+    return sorted(str(rdata) for rdata in answer), None
+
+async def ptrsweep(cidr, concurrency=None, rate=None, timeout=None, lifetime=None):
+    """
+    Resolve the PTR records of every address in a CIDR range.
+
+    Addresses are generated lazily and resolved by a fixed number of
+    concurrent workers, paced to at most `rate` queries per second. Only
+    addresses that have PTR records are returned.
+
+    Args:
+        cidr: IPv4 or IPv6 network, e.g. "192.0.2.0/24" (host bits are ignored)
+        concurrency: Maximum queries in flight (default PTR_SWEEP_CONCURRENCY, or 50)
+        rate: Maximum queries per second (default PTR_SWEEP_RATE, or 500)
+        timeout: Seconds to wait for each nameserver (optional)
+        lifetime: Seconds to spend on each query (default 5)
+
+    Returns:
+        dict: Addresses with their PTR records, in address order, plus a summary
+    """
+    cidr = cidr.strip() if cidr else ""
+    if concurrency is None:
+        concurrency = int(os.getenv(PTR_SWEEP_CONCURRENCY_ENV) or PTR_SWEEP_CONCURRENCY_DEFAULT)
+    if rate is None:
+        rate = float(os.getenv(PTR_SWEEP_RATE_ENV) or PTR_SWEEP_RATE_DEFAULT)
+    lifetime = PTR_SWEEP_LIFETIME if lifetime is None else lifetime
+
+    # Validate input
+    try:
+        network = ipaddress.ip_network(cidr, strict=False)
+    except ValueError:
+        return {
+            "status": "error",
+            "error": "Invalid CIDR format",
+            "query": cidr
+        }
+    if network.num_addresses > PTR_SWEEP_MAX_ADDRESSES:
+        return {
+            "status": "error",
+            "error": f"Range too large. Maximum is {PTR_SWEEP_MAX_ADDRESSES} addresses",
+            "query": cidr
+        }
+    if concurrency < 1 or rate < 0:
+        return {
+            "status": "error",
+            "error": "Invalid concurrency or rate. Concurrency must be at least 1 and rate must not be negative",
+            "query": cidr
+        }
+    for name, value in (("timeout", timeout), ("lifetime", lifetime)):
+        if value is not None and not 0 < value <= DNS_MAX_LIFETIME:
+            return {
+                "status": "error",
+                "error": f"Invalid {name}. Must be greater than 0 and at most {DNS_MAX_LIFETIME:g} seconds",
+                "query": cidr
+            }
+
+    addresses = iter_addresses(network)
+    limiter = RateLimiter(rate)
+    found = {}
+    errors = 0
+    timed_out = 0
+
+    async def worker():
+        nonlocal errors, timed_out
+        for ip_obj in addresses:
+            await limiter.acquire()
+            records, error = await _lookup_ptr(ip_obj, timeout, lifetime)
+            if records:
+                found[ip_obj] = records
+            elif error == "DNS query timed out":
+                timed_out += 1
+            elif error:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, network.num_addresses))))
+
+    return {
+        "status": "success",
+        "network": str(network),
+        "results": [{"ip_addr": str(ip_obj), "records": found[ip_obj]} for ip_obj in sorted(found)],
+        "summary": {
+            "addresses": network.num_addresses,
+            "with_ptr": len(found),
+            "timed_out": timed_out,
+            "errors": errors
+        }
+    }
+
+if __name__ == "__main__":
+    print("Running ptrsweep as main")
+    print(asyncio.run(ptrsweep("8.8.8.0/29")))
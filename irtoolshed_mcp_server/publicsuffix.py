@@ -0,0 +1,108 @@
+# publicsuffix.py
+import os
+import threading
+
+# The Public Suffix List (https://publicsuffix.org/), bundled with the package
+PUBLIC_SUFFIX_LIST_PATH = os.path.join(os.path.dirname(__file__), "data", "public_suffix_list.dat")
+
+def _to_ascii(label):
+    """Return an IDN rule in its A-label (punycode) form, or as given if it cannot be encoded."""
+    try:
+        return label.encode("idna").decode("ascii")
+    except UnicodeError:
+        return label
+
+class PublicSuffixList:
+    """
+    Public Suffix List rules: which parts of a name are controlled by a registry.
+
+    Normal rules ("co.uk"), wildcards ("*.ck") and exceptions ("!www.ck")
+    are matched as the list specifies, longest match first, with "*" as the
+    default rule. Only the ICANN section is used unless include_private is
+    set: suffixes such as blogspot.com are hosting providers, not registries,
+    and WHOIS only knows the registration above them.
+
+    Args:
+        path: Public Suffix List file
+        include_private: Also use the PRIVATE DOMAINS section
+    """
+
+    def __init__(self, path=PUBLIC_SUFFIX_LIST_PATH, include_private=False):
+        self.path = path
+        self._rules = set()
+        self._wildcards = set()   # parents of "*." rules
+        self._exceptions = set()  # names of "!" rules
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("// ===BEGIN PRIVATE DOMAINS===") and not include_private:
+                    break
+                if not line or line.startswith("//"):
+                    continue
+                rule = ".".join(_to_ascii(label) for label in line.split()[0].lower().split("."))
+                if rule.startswith("!"):
+                    self._exceptions.add(rule[1:])
+                elif rule.startswith("*."):
+                    self._wildcards.add(rule[2:])
+                else:
+                    self._rules.add(rule)
+
+    def __len__(self):
+        return len(self._rules) + len(self._wildcards) + len(self._exceptions)
+
+    def public_suffix(self, domain):
+        """
+        Return the public suffix of a domain, e.g. "co.uk" for "www.example.co.uk".
+
+        Args:
+            domain: Domain name
+
+        Returns:
+            str: The public suffix (lowercased), or "" for an empty name
+        """
+        labels = domain.strip().rstrip(".").lower().split(".")
+        if labels == [""]:
+            return ""
+        for i in range(len(labels)):
+            name = ".".join(labels[i:])
+            if name in self._exceptions:
+                return ".".join(labels[i + 1:])
+            if name in self._rules or ".".join(labels[i + 1:]) in self._wildcards:
+                return name
+        return labels[-1]
+
+    def registrable_domain(self, domain):
+        """
+        Return the registrable domain: the public suffix plus one label.
+
+        Args:
+            domain: Domain name, e.g. "a.evil.co.uk"
+
+        Returns:
+            str: e.g. "evil.co.uk", or None if the name is itself a public suffix
+        """
+        domain = domain.strip().rstrip(".").lower()
+        suffix = self.public_suffix(domain)
+        if not suffix or domain == suffix:
+            return None
+        return ".".join(domain[:-len(suffix) - 1].split(".")[-1:] + [suffix])
+
+_public_suffix_list = None
+_public_suffix_list_lock = threading.Lock()
+
+def get_public_suffix_list():
+    """
+    Return the bundled Public Suffix List, loading it on first use.
+
+    Returns:
+        PublicSuffixList: ICANN rules from the bundled list
+    """
+    global _public_suffix_list
+    with _public_suffix_list_lock:
+        if _public_suffix_list is None:
+            _public_suffix_list = PublicSuffixList()
+        return _public_suffix_list
+
+def registrable_domain(domain):
+    """Return the registrable domain of a name per the bundled list, or None for a public suffix."""
+    return get_public_suffix_list().registrable_domain(domain)
@@ -0,0 +1,306 @@
+# rdapclient.py
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from irtoolshed_mcp_server.whoisclient import WHOIS_FIELDS, WhoisRecord, parse_date
+from irtoolshed_mcp_server.whoisscheduler import get_whois_scheduler
+
+# Constants for RDAP lookups
+RDAP_BOOTSTRAP_URL_ENV = "RDAP_BOOTSTRAP_URL"
+RDAP_BOOTSTRAP_URL_DEFAULT = "https://data.iana.org/rdap/dns.json"
+RDAP_BOOTSTRAP_FILE_ENV = "RDAP_BOOTSTRAP_FILE"  # path to the cached copy, or "off"
+RDAP_BOOTSTRAP_FILE_DEFAULT = os.path.expanduser("~/.local/share/irtoolshed/rdap_dns.json")
+RDAP_BOOTSTRAP_MAX_AGE_ENV = "RDAP_BOOTSTRAP_MAX_AGE"
+RDAP_BOOTSTRAP_MAX_AGE_DEFAULT = 86400
+RDAP_TIMEOUT_ENV = "RDAP_TIMEOUT"
+RDAP_TIMEOUT_DEFAULT = 10.0
+RDAP_POOL_SIZE_ENV = "RDAP_POOL_SIZE"
+RDAP_POOL_SIZE_DEFAULT = 10  # keep-alive connections per RDAP host
+RDAP_MEDIA_TYPE = "application/rdap+json"
+
+class RDAPBootstrap:
+    """
+    IANA's RDAP bootstrap registry for domains (RFC 9224), cached on disk.
+
+    The registry maps TLDs to RDAP base URLs. It is downloaded on first use
+    and again once the cached copy is older than max_age; if the download
+    fails a stale copy is kept.
+
+    Args:
+        url: Bootstrap registry URL
+        path: File to cache the registry in, or None to keep it in memory only
+        max_age: Seconds before the registry is downloaded again
+        session: requests.Session to download with
+        timeout: Seconds to wait for the download
+    """
+
+    def __init__(self, url=RDAP_BOOTSTRAP_URL_DEFAULT, path=None, max_age=RDAP_BOOTSTRAP_MAX_AGE_DEFAULT,
+                 session=None, timeout=RDAP_TIMEOUT_DEFAULT):
+        self.url = url
+        self.path = path
+        self.max_age = max_age
+        self.session = session or pooled_session()
+        self.timeout = timeout
+        self._lock = threading.Lock()       # guards _services and _loaded_at
+        self._load_lock = threading.Lock()  # held by the one thread reading or downloading the registry
+        self._services = None  # tld -> [base URL]
+        self._loaded_at = 0.0
+        self.downloads = 0
+
+    def base_urls(self, tld):
+        """
+        Return the RDAP base URLs for a TLD.
+
+        The registry is read or downloaded outside the lock that guards it,
+        so lookups are not held up by the fetch: while one thread refreshes
+        a stale copy the others keep using it, and only the very first load
+        is waited for.
+
+        Returns:
+            list: Base URLs, each ending in "/", or [] if the TLD has no RDAP service
+        """
+        with self._lock:
+            services, loaded_at = self._services, self._loaded_at
+        if services is None:
+            with self._load_lock:
+                services = self._load()
+        elif time.time() - loaded_at >= self.max_age and self._load_lock.acquire(blocking=False):
+            try:
+                services = self._load()
+            finally:
+                self._load_lock.release()
+        return services.get(tld.lower(), [])
+
+    def _load(self):
+        """Read or download the registry and swap it in; call with _load_lock held."""
+        with self._lock:
+            services, loaded_at = self._services, self._loaded_at
+        if services is not None and time.time() - loaded_at < self.max_age:
+            return services  # another thread refreshed it meanwhile
+        if services is None and self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    services = self._parse(json.load(f))
+                loaded_at = os.path.getmtime(self.path)
+            except (OSError, ValueError):
+                services = None
+            if services is not None:
+                with self._lock:
+                    self._services, self._loaded_at = services, loaded_at
+                if time.time() - loaded_at < self.max_age:
+                    return services
+        try:
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            registry = response.json()
+            fresh = self._parse(registry)
+        except (requests.RequestException, ValueError):
+            if services is None:
+                raise
+            return services  # keep the stale copy
+        with self._lock:
+            self.downloads += 1
+            self._services, self._loaded_at = fresh, time.time()
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(registry, f)
+            os.replace(temporary, self.path)
+        return fresh
+
+    @staticmethod
+    def _parse(registry):
+        services = {}
+        for tlds, urls in registry["services"]:
+            # Prefer HTTPS endpoints, as RFC 9224 recommends
+            urls = sorted((url if url.endswith("/") else url + "/" for url in urls),
+                          key=lambda url: not url.startswith("https:"))
+            for tld in tlds:
+                services[tld.lower()] = urls
+        return services
+
+def _vcard_value(entity, *properties):
+    """Return the first of the given vCard properties (e.g. "org", "fn") of an RDAP entity."""
+    vcard = entity.get("vcardArray") or [None, []]
+    for prop in properties:
+        for item in vcard[1]:
+            if item and item[0] == prop and len(item) > 3:
+                value = item[3]
+                value = value[0] if isinstance(value, list) and value else value
+                if isinstance(value, str) and value.strip():
+                    return value.strip()
+    return None
+
+def _entities(data):
+    """Yield every entity of an RDAP object, including nested ones."""
+    for entity in data.get("entities") or []:
+        yield entity
+        yield from _entities(entity)
+
+def parse_domain(data, text):
+    """
+    Map an RDAP domain object to whoislookup's fields.
+
+    Args:
+        data: Decoded RDAP domain object
+        text: The response body, kept as the raw output
+
+    Returns:
+        WhoisRecord: The fields found, with text set to the response body
+    """
+    record = WhoisRecord(text=text, domain_name=data.get("ldhName") or data.get("unicodeName"))
+    for entity in _entities(data):
+        roles = entity.get("roles") or []
+        if "registrar" in roles and not record.get("registrar"):
+            record["registrar"] = _vcard_value(entity, "fn", "org")
+        if "registrant" in roles and not record.get("registrant"):
+            record["registrant"] = _vcard_value(entity, "org", "fn")
+    for event in data.get("events") or []:
+        field = {"registration": "creation_date", "expiration": "expiration_date"}.get(event.get("eventAction"))
+        if field and event.get("eventDate") and not record.get(field):
+            record[field] = parse_date(event["eventDate"])
+    name_servers = [ns.get("ldhName") for ns in data.get("nameservers") or [] if ns.get("ldhName")]
+    if name_servers:
+        record["name_servers"] = [ns.rstrip(".") for ns in name_servers]
+    for link in data.get("links") or []:
+        if link.get("rel") == "related" and RDAP_MEDIA_TYPE in (link.get("type") or RDAP_MEDIA_TYPE) \
+                and "/domain/" in (link.get("href") or ""):
+            record["related"] = link["href"]
+            break
+    return record
+
+def pooled_session(pool_size=RDAP_POOL_SIZE_DEFAULT):
+    """Return a requests.Session keeping up to pool_size connections open per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept"] = RDAP_MEDIA_TYPE
+    return session
+
+class RDAPClient:
+    """
+    RDAP client with pooled, keep-alive HTTPS sessions.
+
+    The RDAP server for a domain comes from the cached bootstrap registry.
+    All requests share one requests.Session, which keeps up to pool_size
+    connections open per RDAP host, so repeated lookups skip the TCP and
+    TLS handshakes. The registrar's RDAP record (a "related" link) is only
+    fetched when the registry's answer lacks one of the requested fields.
+
+    Args:
+        bootstrap: RDAPBootstrap (default: IANA's registry, in memory only)
+        session: requests.Session to send requests with (default: a new pooled session)
+        timeout: Seconds to wait for each response
+        pool_size: Keep-alive connections per RDAP host
+        scheduler: whoisscheduler.WhoisScheduler to queue requests through, per host, or None
+    """
+
+    def __init__(self, bootstrap=None, session=None, timeout=RDAP_TIMEOUT_DEFAULT,
+                 pool_size=RDAP_POOL_SIZE_DEFAULT, scheduler=None):
+        self.session = session if session is not None else pooled_session(pool_size)
+        self.bootstrap = bootstrap if bootstrap is not None else RDAPBootstrap(session=self.session, timeout=timeout)
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.not_found = 0
+        self.referrals = 0
+
+    def lookup(self, domain, fields=None):
+        """
+        Look up a domain at its registry's RDAP server, and at its registrar's if fields are missing.
+
+        Args:
+            domain: Domain name (normally the registrable domain)
+            fields: Fields that must be present before the registrar is skipped
+                    (default WHOIS_FIELDS)
+
+        Returns:
+            WhoisRecord: Parsed fields and the response body; domain_name is None
+                         if the domain is not registered
+
+        Raises:
+            LookupError: If the TLD has no RDAP service
+            requests.RequestException: If the server cannot be reached or returns an error
+        """
+        domain = domain.strip().rstrip(".").lower()
+        urls = self.bootstrap.base_urls(domain.rsplit(".", 1)[-1])
+        if not urls:
+            raise LookupError(f"No RDAP server is known for .{domain.rsplit('.', 1)[-1]}")
+        response = self._get(urls[0] + "domain/" + domain)
+        if response.status_code == 404:
+            with self._lock:
+                self.not_found += 1
+            return WhoisRecord(text=response.text, domain_name=None)
+        response.raise_for_status()
+        record = parse_domain(response.json(), response.text)
+
+        related = record.pop("related", None)
+        missing = [field for field in (fields or WHOIS_FIELDS) if not record.get(field)]
+        if missing and related:
+            try:
+                response = self._get(related)
+                response.raise_for_status()
+                extra = parse_domain(response.json(), response.text)
+            except (requests.RequestException, ValueError):
+                return record  # the registry's answer is still useful
+            with self._lock:
+                self.referrals += 1
+            for field in WHOIS_FIELDS:
+                if not record.get(field) and extra.get(field):
+                    record[field] = extra[field]
+            record["text"] = record.text + "\n" + extra.text
+        return record
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "not_found": self.not_found,
+                "referrals": self.referrals,
+                "bootstrap_downloads": self.bootstrap.downloads
+            }
+
+    def _get(self, url):
+        with self._lock:
+            self.requests += 1
+        if self.scheduler is None:
+            return self.session.get(url, timeout=self.timeout)
+        with self.scheduler.slot(urlsplit(url).netloc):
+            return self.session.get(url, timeout=self.timeout)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_rdap_client():
+    """
+    Return the process-wide RDAP client, creating it on first use.
+
+    Returns:
+        RDAPClient: Client using the shared scheduler and the bootstrap registry cached at RDAP_BOOTSTRAP_FILE
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            timeout = float(os.getenv(RDAP_TIMEOUT_ENV) or RDAP_TIMEOUT_DEFAULT)
+            path = os.getenv(RDAP_BOOTSTRAP_FILE_ENV) or RDAP_BOOTSTRAP_FILE_DEFAULT
+            session = pooled_session(int(os.getenv(RDAP_POOL_SIZE_ENV) or RDAP_POOL_SIZE_DEFAULT))
+            bootstrap = RDAPBootstrap(
+                os.getenv(RDAP_BOOTSTRAP_URL_ENV) or RDAP_BOOTSTRAP_URL_DEFAULT,
+                None if path.lower() == "off" else path,
+                max_age=float(os.getenv(RDAP_BOOTSTRAP_MAX_AGE_ENV) or RDAP_BOOTSTRAP_MAX_AGE_DEFAULT),
+                session=session, timeout=timeout)
+            _client = RDAPClient(bootstrap, session, timeout=timeout, scheduler=get_whois_scheduler())
+        return _client
+
+def get_client_stats():
+    """Return the RDAP client counters."""
+    return get_rdap_client().stats()
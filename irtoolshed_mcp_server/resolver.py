@@ -0,0 +1,318 @@
+# resolver.py
+import copy
+import os
+import threading
+import time
+import dns.asyncresolver
+import dns.name
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.resolver
+from irtoolshed_mcp_server.dnstransport import create_transport
+from irtoolshed_mcp_server.nameserverpool import NameserverPool
+
+# Constants for the shared resolver and its answer cache
+DNS_CACHE_SIZE_ENV = "DNS_CACHE_SIZE"
+DNS_CACHE_SIZE_DEFAULT = 10000
+DNS_NAMESERVERS_ENV = "DNS_NAMESERVERS"
+DNS_NEGATIVE_CACHE_MAX_TTL_ENV = "DNS_NEGATIVE_CACHE_MAX_TTL"
+DNS_NEGATIVE_CACHE_MAX_TTL_DEFAULT = 900
+DNS_SERVFAIL_CACHE_TTL = 30  # RFC 2308 section 7.1 allows at most 5 minutes
+DNS_HEDGE_DELAY_ENV = "DNS_HEDGE_DELAY"  # seconds, "auto" (p95-based) or "off"
+DNS_HEDGE_DELAY_DEFAULT = "auto"
+
+class AnswerCache(dns.resolver.LRUCache):
+    """
+    dnspython LRU answer cache that also counts evictions.
+
+    Answers expire with the TTL of the records they hold, so a hit is always
+    still valid. Negative answers (NXDOMAIN and NoAnswer) are kept for the
+    SOA minimum TTL from the authority section, as in RFC 2308, but never
+    longer than negative_ttl_cap. Server failures (NoNameservers) carry no
+    SOA and are remembered for DNS_SERVFAIL_CACHE_TTL seconds.
+
+    Args:
+        max_size: Maximum number of cached answers
+        negative_ttl_cap: Maximum seconds a negative answer is kept
+    """
+
+    def __init__(self, max_size=DNS_CACHE_SIZE_DEFAULT, negative_ttl_cap=DNS_NEGATIVE_CACHE_MAX_TTL_DEFAULT):
+        super().__init__(max_size)
+        self.negative_ttl_cap = negative_ttl_cap
+        self.evictions = 0
+        self._failures = {}  # (name, rdtype) -> expiry time
+
+    def put(self, key, value):
+        if value.rrset is None:
+            # dnspython already set the expiry from the SOA; apply the cap
+            value.expiration = min(value.expiration, time.time() + self.negative_ttl_cap)
+        with self.lock:
+            node = self.data.get(key)
+            if node is not None:
+                node.unlink()
+                del self.data[node.key]
+            while len(self.data) >= self.max_size:
+                gnode = self.sentinel.prev
+                gnode.unlink()
+                del self.data[gnode.key]
+                self.evictions += 1
+            node = dns.resolver.LRUCacheNode(key, value)
+            node.link_after(self.sentinel)
+            self.data[key] = node
+
+    def peek(self, key):
+        """Return the cached answer for key, like get(), without counting a hit or miss."""
+        with self.lock:
+            node = self.data.get(key)
+            if node is None or node.value.expiration <= time.time():
+                return None
+            return node.value
+
+    def lookup(self, qname, rdtype):
+        """
+        Look up an answer the way dnspython's resolver does, counting one hit or miss.
+
+        Args:
+            qname: Domain name
+            rdtype: Record type text, e.g. "A"
+
+        Returns:
+            dns.resolver.Answer, or None if nothing is cached
+
+        Raises:
+            dns.resolver.NXDOMAIN: For a cached NXDOMAIN
+            dns.resolver.NoAnswer: For a cached answer without records
+        """
+        name = dns.name.from_text(qname)
+        answer = self.peek((name, dns.rdatatype.from_text(rdtype), dns.rdataclass.IN))
+        nxdomain = None
+        if answer is None:
+            nxdomain = self.peek((name, dns.rdatatype.ANY, dns.rdataclass.IN))
+            if nxdomain is not None and nxdomain.response.rcode() != dns.rcode.NXDOMAIN:
+                nxdomain = None
+        with self.lock:
+            if answer is None and nxdomain is None:
+                self.statistics.misses += 1
+            else:
+                self.statistics.hits += 1
+        if nxdomain is not None:
+            raise dns.resolver.NXDOMAIN(qnames=[name], responses={name: nxdomain.response})
+        if answer is not None and answer.rrset is None:
+            raise dns.resolver.NoAnswer(response=answer.response)
+        return answer
+
+    def uncounted(self):
+        """Return a view of the cache for resolvers queried after lookup() missed, so the miss is counted once."""
+        return _UncountedCache(self)
+
+    def has_failure(self, qname, rdtype):
+        """Return True if a server failure for qname and rdtype is still cached."""
+        key = (qname.lower().rstrip("."), rdtype.upper())
+        with self.lock:
+            expires = self._failures.get(key)
+            if expires is None:
+                return False
+            if expires <= time.time():
+                del self._failures[key]
+                return False
+            self.statistics.hits += 1
+            return True
+
+    def put_failure(self, qname, rdtype):
+        """Remember a server failure for qname and rdtype."""
+        key = (qname.lower().rstrip("."), rdtype.upper())
+        with self.lock:
+            self._failures[key] = time.time() + min(DNS_SERVFAIL_CACHE_TTL, self.negative_ttl_cap)
+
+    def flush(self, key=None):
+        super().flush(key)
+        if key is None:
+            with self.lock:
+                self._failures = {}
+
+    def stats(self):
+        """Return size, hit, miss, eviction and cached-failure counters as a dict."""
+        with self.lock:
+            return {
+                "size": len(self.data),
+                "maxsize": self.max_size,
+                "hits": self.statistics.hits,
+                "misses": self.statistics.misses,
+                "evictions": self.evictions,
+                "failures": len(self._failures)
+            }
+
+class _UncountedCache:
+    """An AnswerCache whose reads are not counted; dnspython's resolver probes it twice per query."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, key):
+        return self.cache.peek(key)
+
+    def put(self, key, value):
+        self.cache.put(key, value)
+
+_cache = AnswerCache(
+    int(os.getenv(DNS_CACHE_SIZE_ENV) or DNS_CACHE_SIZE_DEFAULT),
+    float(os.getenv(DNS_NEGATIVE_CACHE_MAX_TTL_ENV) or DNS_NEGATIVE_CACHE_MAX_TTL_DEFAULT)
+)
+_resolver = None
+_async_resolver = None
+_nameserver_pool = None
+_resolver_lock = threading.Lock()
+
+def configure(resolver):
+    """
+    Apply the shared configuration to a dnspython resolver.
+
+    The resolver gets the process-wide answer cache and, when DNS_NAMESERVERS
+    is set (comma separated), those nameservers instead of /etc/resolv.conf.
+
+    Args:
+        resolver: dns.resolver.Resolver or dns.asyncresolver.Resolver
+
+    Returns:
+        The same resolver
+    """
+    nameservers = [ns.strip() for ns in (os.getenv(DNS_NAMESERVERS_ENV) or "").split(",") if ns.strip()]
+    if nameservers:
+        resolver.nameservers = nameservers
+    resolver.cache = _cache
+    return resolver
+
+def get_resolver():
+    """
+    Return the process-wide resolver, configured once on first use.
+
+    Returns:
+        dns.resolver.Resolver: Resolver sharing the process-wide answer cache
+    """
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = configure(dns.resolver.Resolver())
+        return _resolver
+
+def get_async_resolver():
+    """
+    Return the process-wide asyncio resolver, configured once on first use.
+
+    Returns:
+        dns.asyncresolver.Resolver: Resolver sharing the process-wide answer cache
+    """
+    global _async_resolver
+    with _resolver_lock:
+        if _async_resolver is None:
+            _async_resolver = configure(dns.asyncresolver.Resolver())
+        return _async_resolver
+
+def _hedge_delay():
+    """Return the configured hedge delay: seconds, None for p95-based, or False when disabled."""
+    value = (os.getenv(DNS_HEDGE_DELAY_ENV) or DNS_HEDGE_DELAY_DEFAULT).strip().lower()
+    if value == "auto":
+        return None
+    if value == "off":
+        return False
+    return float(value)
+
+def get_nameserver_pool():
+    """
+    Return the nameserver pool for the shared asyncio resolver.
+
+    Queries use the transport selected by DNS_TRANSPORT: "udp" (default,
+    with dnspython's TCP fallback for truncated answers), or "tcp" / "tls"
+    over persistent, pipelined connections. The pool is rebuilt if the
+    asyncio resolver has been replaced.
+
+    Returns:
+        NameserverPool: Pool over the asyncio resolver's nameservers
+    """
+    global _nameserver_pool
+    resolver = get_async_resolver()
+    with _resolver_lock:
+        if _nameserver_pool is None or _nameserver_pool.resolver is not resolver:
+            if _nameserver_pool is not None and _nameserver_pool.transport is not None:
+                _nameserver_pool.transport.close()
+            _nameserver_pool = create_nameserver_pool(resolver)
+        return _nameserver_pool
+
+def create_nameserver_pool(resolver):
+    """
+    Create a nameserver pool over a resolver, with DNS_HEDGE_DELAY and the DNS_TRANSPORT transport.
+
+    Stream transport connections belong to one event loop, so code running
+    its own loop needs its own pool.
+
+    Returns:
+        NameserverPool: Pool over the resolver's nameservers
+    """
+    return NameserverPool(resolver, hedge_delay=_hedge_delay(), transport=create_transport(tcp_port=resolver.port))
+
+def _with_timeout(resolver, timeout):
+    """Return a copy of resolver with a per-server timeout whose cache reads are not counted again."""
+    resolver = copy.copy(resolver)
+    resolver.cache = resolver.cache.uncounted()
+    if timeout is not None:
+        resolver.timeout = timeout
+    return resolver
+
+def resolve(qname, rdtype, timeout=None, lifetime=None):
+    """
+    Resolve qname through the shared resolver and cache.
+
+    Raises the same dnspython exceptions as Resolver.resolve(); a cached
+    server failure raises NoNameservers without contacting any server.
+
+    Args:
+        qname: Domain name
+        rdtype: Record type text, e.g. "A"
+        timeout: Seconds to wait for each nameserver (default: resolver's)
+        lifetime: Seconds to spend on the whole query (default: resolver's)
+
+    Returns:
+        dns.resolver.Answer
+    """
+    if _cache.has_failure(qname, rdtype):
+        raise dns.resolver.NoNameservers()
+    resolver = get_resolver()
+    cached = resolver.cache.lookup(qname, rdtype)
+    if cached is not None:
+        return cached
+    try:
+        return _with_timeout(resolver, timeout).resolve(qname, rdtype, lifetime=lifetime)
+    except dns.resolver.NoNameservers:
+        _cache.put_failure(qname, rdtype)
+        raise
+
+async def resolve_async(qname, rdtype, timeout=None, lifetime=None, pool=None):
+    """
+    Asyncio version of resolve().
+
+    Queries go through the nameserver pool, which prefers the fastest
+    healthy nameserver and hedges slow queries to a second one.
+
+    Args:
+        pool: NameserverPool to use (default: the shared pool)
+    """
+    if _cache.has_failure(qname, rdtype):
+        raise dns.resolver.NoNameservers()
+    try:
+        return await (pool or get_nameserver_pool()).resolve(qname, rdtype, timeout, lifetime)
+    except dns.resolver.NoNameservers:
+        _cache.put_failure(qname, rdtype)
+        raise
+
+def get_cache_stats():
+    """Return the shared DNS answer cache counters."""
+    return _cache.stats()
+
+def get_nameserver_stats():
+    """Return the nameserver pool's hedging counters and per-server statistics."""
+    return get_nameserver_pool().stats()
+
+def flush_cache():
+    """Drop every cached answer; counters are kept."""
+    _cache.flush()
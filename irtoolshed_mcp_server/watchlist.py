@@ -0,0 +1,288 @@
+# watchlist.py
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from irtoolshed_mcp_server.dnslookup import valid_types, _format_answers, _format_error
+from irtoolshed_mcp_server.resolver import create_nameserver_pool, get_async_resolver, resolve_async
+from irtoolshed_mcp_server import passivedns
+
+# Constants for the domain watchlist
+WATCHLIST_MAX_ENTRIES = 10000
+WATCHLIST_MIN_INTERVAL_ENV = "WATCHLIST_MIN_INTERVAL"
+WATCHLIST_MIN_INTERVAL_DEFAULT = 30.0  # never re-check an entry more often than this
+WATCHLIST_NEGATIVE_INTERVAL = 300.0    # re-check interval for lookups that failed
+WATCHLIST_CONCURRENCY = 16
+
+def _record_key(record):
+    return str(record)
+
+class Watchlist:
+    """
+    Domains under watch, re-resolved as their answers expire.
+
+    Each (domain, record type) entry keeps its last answer and when it
+    expires. Only entries whose TTL has run out are re-queried, so polling
+    for changes costs nothing until the DNS data could actually have moved.
+    Lookups share the answer cache and go through a nameserver pool on the
+    watchlist's own event loop, so DNS_TRANSPORT applies to them as well.
+
+    Args:
+        min_interval: Shortest re-check interval in seconds, whatever the TTL
+        negative_interval: Re-check interval for failed lookups (NXDOMAIN, no records, errors)
+        concurrency: Number of lookups run at once when many entries are due
+        resolver: Callable(domain, record_type) returning a dnspython Answer, mainly for testing
+        clock: Callable returning the current time in seconds, mainly for testing
+    """
+
+    def __init__(self, min_interval=WATCHLIST_MIN_INTERVAL_DEFAULT, negative_interval=WATCHLIST_NEGATIVE_INTERVAL,
+                 concurrency=WATCHLIST_CONCURRENCY, resolver=None, clock=None):
+        self.min_interval = min_interval
+        self.negative_interval = negative_interval
+        self.concurrency = concurrency
+        self._resolve = resolver or self._resolve_in_loop
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pool = None
+        self._entries = {}  # (domain, record_type) -> entry dict
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.checks = 0
+        self.changes = 0
+
+    def add(self, domains, record_types=None):
+        """
+        Watch domains for the given record types and resolve them now.
+
+        Args:
+            domains: List of domain names
+            record_types: Record types to watch (default ["A"])
+
+        Returns:
+            list: The watched entries, in the order given
+
+        Raises:
+            ValueError: For an invalid record type or too many entries
+        """
+        keys = []
+        for domain in domains:
+            domain = domain.strip().rstrip(".").lower() if domain else ""
+            for record_type in record_types or ["A"]:
+                record_type = record_type.strip().upper()
+                if record_type not in valid_types:
+                    raise ValueError(f"Invalid record type. Must be one of: {', '.join(valid_types)}")
+                if domain and (domain, record_type) not in keys:
+                    keys.append((domain, record_type))
+        with self._lock:
+            new = [key for key in keys if key not in self._entries]
+            if len(self._entries) + len(new) > WATCHLIST_MAX_ENTRIES:
+                raise ValueError(f"Too many watchlist entries. Maximum is {WATCHLIST_MAX_ENTRIES}")
+            for domain, record_type in new:
+                self._entries[(domain, record_type)] = {
+                    "domain": domain,
+                    "record_type": record_type,
+                    "status": "pending",
+                    "records": [],
+                    "ttl": None,
+                    "added_at": self._clock(),
+                    "checked_at": None,
+                    "next_check": None,  # resolved by add() itself
+                    "changed_at": None,
+                    "previous": None
+                }
+        self._check_many(new)
+        self._wake.set()
+        with self._lock:
+            return [dict(self._entries[key]) for key in keys if key in self._entries]
+
+    def remove(self, domains, record_types=None):
+        """
+        Stop watching domains, for the given record types or all of them.
+
+        Returns:
+            int: Number of entries removed
+        """
+        domains = {domain.strip().rstrip(".").lower() for domain in domains if domain}
+        types = {record_type.strip().upper() for record_type in record_types} if record_types else None
+        with self._lock:
+            keys = [key for key in self._entries if key[0] in domains and (types is None or key[1] in types)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def refresh_due(self):
+        """
+        Re-resolve every entry whose answer has expired.
+
+        Returns:
+            int: Number of entries re-resolved
+        """
+        now = self._clock()
+        with self._lock:
+            due = [key for key, entry in self._entries.items()
+                   if entry["next_check"] is not None and entry["next_check"] <= now]
+        self._check_many(due)
+        return len(due)
+
+    def next_due(self):
+        """Return seconds until the next entry expires, or None if nothing is watched."""
+        with self._lock:
+            checks = [entry["next_check"] for entry in self._entries.values() if entry["next_check"] is not None]
+            if not checks:
+                return None
+            return max(0.0, min(checks) - self._clock())
+
+    def changed_since(self, since=None):
+        """
+        Return the entries whose answer changed after a point in time.
+
+        Args:
+            since: Unix timestamp; None returns every entry that has ever changed
+
+        Returns:
+            list: Changed entries, most recent change first
+        """
+        with self._lock:
+            changed = [dict(entry) for entry in self._entries.values()
+                       if entry["changed_at"] is not None and (since is None or entry["changed_at"] > since)]
+        return sorted(changed, key=lambda entry: entry["changed_at"], reverse=True)
+
+    def entries(self):
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+    def stats(self):
+        """Return the number of entries, checks, changes and scheduler state as a dict."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "checks": self.checks,
+                "changes": self.changes,
+                "scheduler_running": self.is_running()
+            }
+
+    def start(self):
+        """Start the background scheduler thread."""
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dns-watchlist", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the scheduler thread, waiting up to timeout seconds for it to exit."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        with self._lock:
+            loop, pool = self._loop, self._pool
+            self._loop = self._pool = None
+        if loop is not None:
+            loop.call_soon_threadsafe(self._close_loop, loop, pool)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _resolve_in_loop(self, domain, record_type):
+        """Resolve through the watchlist's nameserver pool; called from worker threads."""
+        loop, pool = self._event_loop()
+        return asyncio.run_coroutine_threadsafe(resolve_async(domain, record_type, pool=pool), loop).result()
+
+    def _event_loop(self):
+        """Return the event loop lookups run on and its pool, starting them on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._pool = create_nameserver_pool(get_async_resolver())
+                threading.Thread(target=self._run_loop, args=(self._loop,), name="dns-watchlist-resolver",
+                                 daemon=True).start()
+            return self._loop, self._pool
+
+    @staticmethod
+    def _run_loop(loop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    @staticmethod
+    def _close_loop(loop, pool):
+        if pool.transport is not None:
+            pool.transport.close()
+        loop.stop()
+
+    def _check_many(self, keys):
+        if len(keys) <= 1:
+            for key in keys:
+                self._check(*key)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(keys))) as executor:
+            list(executor.map(lambda key: self._check(*key), keys))
+
+    def _check(self, domain, record_type):
+        """Resolve one entry and record whether its answer changed."""
+        try:
+            answer = self._resolve(domain, record_type)
+        except Exception as e:
+            result = _format_error(e, domain, record_type)
+            interval = self.negative_interval
+        else:
+            passivedns.observe(domain, record_type, answer)
+            result = _format_answers(domain, record_type, answer)
+            # Cached answers carry their remaining lifetime in expiration
+            interval = max(self.min_interval, answer.expiration - time.time())
+        now = self._clock()
+        records = sorted(result.get("records", []), key=_record_key)
+        with self._lock:
+            self.checks += 1
+            entry = self._entries.get((domain, record_type))
+            if entry is None:
+                return  # removed while it was being resolved
+            current = (entry["status"], entry["records"], entry.get("error"))
+            if entry["checked_at"] is not None and current != (result["status"], records, result.get("error")):
+                entry["previous"] = {"status": entry["status"], "records": entry["records"]}
+                if entry.get("error"):
+                    entry["previous"]["error"] = entry["error"]
+                entry["changed_at"] = now
+                self.changes += 1
+            entry["status"] = result["status"]
+            entry["records"] = records
+            entry.pop("error", None)
+            if "error" in result:
+                entry["error"] = result["error"]
+            entry["ttl"] = round(interval)
+            entry["checked_at"] = now
+            entry["next_check"] = now + interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh_due()
+            except Exception:
+                pass
+            delay = self.next_due()
+            self._wake.wait(delay if delay is not None else None)
+            self._wake.clear()
+
+_watchlist = None
+_watchlist_lock = threading.Lock()
+
+def get_watchlist():
+    """
+    Return the process-wide watchlist, starting its scheduler on first use.
+
+    Returns:
+        Watchlist: The shared watchlist
+    """
+    global _watchlist
+    with _watchlist_lock:
+        if _watchlist is None:
+            _watchlist = Watchlist(min_interval=float(os.getenv(WATCHLIST_MIN_INTERVAL_ENV) or
+                                                      WATCHLIST_MIN_INTERVAL_DEFAULT))
+        _watchlist.start()
+        return _watchlist
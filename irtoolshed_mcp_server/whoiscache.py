@@ -0,0 +1,174 @@
+# whoiscache.py
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Constants for the on-disk WHOIS cache
+WHOIS_CACHE_DB_ENV = "WHOIS_CACHE_DB"  # path to the SQLite file, or "off"
+WHOIS_CACHE_DB_DEFAULT = os.path.expanduser("~/.local/share/irtoolshed/whoiscache.sqlite3")
+WHOIS_CACHE_TTL_ENV = "WHOIS_CACHE_TTL"
+WHOIS_CACHE_TTL_DEFAULT = 86400  # 1 day
+WHOIS_NEGATIVE_CACHE_TTL_ENV = "WHOIS_NEGATIVE_CACHE_TTL"
+WHOIS_NEGATIVE_CACHE_TTL_DEFAULT = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS whois_cache (
+    domain TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    stored REAL NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS whois_cache_expires ON whois_cache (expires);
+"""
+
+class WhoisCache:
+    """
+    WHOIS results kept in a SQLite file, keyed by registrable domain.
+
+    Results are stored as JSON exactly as whoislookup returned them,
+    raw_output included, so a hit is indistinguishable from a fresh query
+    and survives restarts. "Domain not found" results are kept for the
+    shorter negative_ttl. Cache errors are counted and otherwise ignored;
+    they never fail a lookup.
+
+    Args:
+        path: SQLite database file
+        ttl: Seconds a result for a registered domain is kept
+        negative_ttl: Seconds a "Domain not found" result is kept (0 disables)
+    """
+
+    def __init__(self, path, ttl=WHOIS_CACHE_TTL_DEFAULT, negative_ttl=WHOIS_NEGATIVE_CACHE_TTL_DEFAULT):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with contextlib.closing(self._connect()) as connection:
+            connection.executescript(SCHEMA)
+
+    def get(self, domain, now=None):
+        """
+        Return the cached result for a registrable domain.
+
+        Args:
+            domain: Registrable domain
+            now: Unix timestamp to check expiry against (default now)
+
+        Returns:
+            dict: The stored result, or None if absent or expired
+        """
+        now = time.time() if now is None else now
+        try:
+            row = self._connection().execute(
+                "SELECT result FROM whois_cache WHERE domain = ? AND expires > ?", (domain.lower(), now)).fetchone()
+        except sqlite3.Error:
+            row = None
+            self._count("errors")
+        self._count("hits" if row else "misses")
+        return json.loads(row[0]) if row else None
+
+    def put(self, domain, result, negative=False, now=None):
+        """
+        Store a result for a registrable domain, replacing any earlier one.
+
+        Args:
+            domain: Registrable domain
+            result: Result dict, as returned by whoislookup
+            negative: True for a "Domain not found" result
+            now: Unix timestamp the result was obtained (default now)
+        """
+        ttl = self.negative_ttl if negative else self.ttl
+        if ttl <= 0:
+            return
+        now = time.time() if now is None else now
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO whois_cache (domain, result, stored, expires) "
+                                   "VALUES (?, ?, ?, ?)",
+                                   (domain.lower(), json.dumps(result, default=str), now, now + ttl))
+        except sqlite3.Error:
+            self._count("errors")
+            return
+        self._count("stores")
+
+    def purge(self, now=None):
+        """
+        Delete expired results.
+
+        Returns:
+            int: Number of rows deleted
+        """
+        now = time.time() if now is None else now
+        connection = self._connection()
+        with connection:
+            return connection.execute("DELETE FROM whois_cache WHERE expires <= ?", (now,)).rowcount
+
+    def stats(self):
+        """Return entry count, hit/miss counters and TTLs as a dict."""
+        entries = self._connection().execute("SELECT COUNT(*) FROM whois_cache").fetchone()[0]
+        with self._lock:
+            return {
+                "path": self.path,
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "errors": self.errors,
+                "ttl": self.ttl,
+                "negative_ttl": self.negative_ttl
+            }
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _connection(self):
+        """Return this thread's connection; WHOIS lookups run on worker threads."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_whois_cache():
+    """
+    Return the process-wide WHOIS cache, or None if WHOIS_CACHE_DB is "off".
+
+    Returns:
+        WhoisCache: The shared cache, opened on first use
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = os.getenv(WHOIS_CACHE_DB_ENV) or WHOIS_CACHE_DB_DEFAULT
+            if path.lower() == "off":
+                return None
+            _cache = WhoisCache(
+                path,
+                ttl=float(os.getenv(WHOIS_CACHE_TTL_ENV) or WHOIS_CACHE_TTL_DEFAULT),
+                negative_ttl=float(os.getenv(WHOIS_NEGATIVE_CACHE_TTL_ENV) or WHOIS_NEGATIVE_CACHE_TTL_DEFAULT))
+        return _cache
+
+def get_cache_stats():
+    """Return the WHOIS cache counters."""
+    cache = get_whois_cache()
+    return cache.stats() if cache else {"status": "disabled"}
@@ -0,0 +1,380 @@
+# whoisclient.py
+import json
+import os
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from irtoolshed_mcp_server.whoisscheduler import get_whois_scheduler
+
+# Constants for the built-in port-43 WHOIS client
+WHOIS_CLIENT_ENV = "WHOIS_CLIENT"
+WHOIS_CLIENTS = ["python-whois", "native"]
+WHOIS_CLIENT_DEFAULT = "python-whois"
+WHOIS_IANA_SERVER = "whois.iana.org"
+WHOIS_PORT = 43
+WHOIS_CONNECT_TIMEOUT_ENV = "WHOIS_CONNECT_TIMEOUT"
+WHOIS_CONNECT_TIMEOUT_DEFAULT = 5.0
+WHOIS_READ_TIMEOUT_ENV = "WHOIS_READ_TIMEOUT"
+WHOIS_READ_TIMEOUT_DEFAULT = 10.0  # for the whole response
+WHOIS_MAX_RESPONSE = 1024 * 1024
+WHOIS_SERVER_MAP_ENV = "WHOIS_SERVER_MAP"  # path to the JSON file, or "off"
+WHOIS_SERVER_MAP_DEFAULT = os.path.expanduser("~/.local/share/irtoolshed/whois_servers.json")
+WHOIS_SERVER_MAP_MAX_AGE_ENV = "WHOIS_SERVER_MAP_MAX_AGE"
+WHOIS_SERVER_MAP_MAX_AGE_DEFAULT = 7 * 86400
+
+# Fields whoislookup maps; a registrar referral is only followed if one is missing
+WHOIS_FIELDS = ["registrar", "registrant", "creation_date", "expiration_date", "name_servers"]
+
+# Response keys (lowercased) for each field, most specific first
+FIELD_KEYS = {
+    "domain_name": ["domain name", "domain"],
+    "registrar": ["registrar", "sponsoring registrar", "registrar name"],
+    "registrant": ["registrant organization", "registrant organisation", "registrant name", "registrant"],
+    "org": ["organization", "organisation", "org"],
+    "creation_date": ["creation date", "created", "created on", "registered on", "registration time",
+                      "domain registration date", "registered"],
+    "expiration_date": ["registry expiry date", "registrar registration expiration date", "expiration date",
+                        "expiry date", "expires", "expires on", "expire date", "paid-till", "expiration time",
+                        "renewal date"],
+    "name_servers": ["name server", "name servers", "nameserver", "nameservers", "nserver"],
+    "whois_server": ["registrar whois server", "whois server", "refer"]
+}
+_FIELD_BY_KEY = {key: field for field, keys in FIELD_KEYS.items() for key in keys}
+
+NOT_FOUND_PATTERNS = re.compile(
+    r"^(no match|not found|no data found|no entries found|no object found|domain not found|"
+    r"the queried object does not exist|status:\s*(free|available)|.* is free$)", re.IGNORECASE | re.MULTILINE)
+
+DATE_FORMATS = ["%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S.%f%z",
+                "%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d-%b-%Y", "%d-%B-%Y", "%Y.%m.%d", "%d.%m.%Y", "%Y/%m/%d"]
+
+# Query syntax for servers that do not take a bare domain name
+QUERY_FORMATS = {
+    "whois.verisign-grs.com": "domain {}",
+    "whois.denic.de": "-T dn,ace {}",
+    "whois.jprs.jp": "{}/e",
+}
+
+class WhoisRecord(dict):
+    """Parsed WHOIS fields, also readable as attributes (None when absent), like python-whois results."""
+
+    def __getattr__(self, name):
+        return self.get(name)
+
+def parse_date(value):
+    """Return a WHOIS date as a naive UTC datetime, or the text itself if its format is unknown."""
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    return value
+
+def parse_response(text):
+    """
+    Parse a WHOIS response into whoislookup's fields.
+
+    Understands "Key: value" lines and the indented layout some registries
+    use, where a key line is followed by its values on their own lines.
+
+    Args:
+        text: WHOIS response text
+
+    Returns:
+        WhoisRecord: The fields found, with text set to the response
+    """
+    values = {}
+    current = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("%", "#", ">>>")):
+            current = None
+            continue
+        key, sep, value = stripped.partition(":")
+        field = _FIELD_BY_KEY.get(key.strip().lower()) if sep else None
+        if field is None and current is not None and line[:1].isspace():
+            # A value listed under the key line above it
+            values.setdefault(current, []).append(stripped)
+            continue
+        current = None
+        if field is None:
+            continue
+        value = value.strip()
+        if value:
+            values.setdefault(field, []).append(value)
+        else:
+            current = field
+
+    record = WhoisRecord(text=text)
+    for field, found in values.items():
+        if field == "name_servers":
+            record[field] = list(dict.fromkeys(v.split()[0].rstrip(".") for v in found))
+        elif field in ("creation_date", "expiration_date"):
+            record[field] = parse_date(found[0])
+        else:
+            record[field] = found[0]
+    return record
+
+def _split_server(server):
+    """Return (host, port) for "host" or "host:port"."""
+    host, _, port = server.partition(":")
+    return host, int(port) if port else WHOIS_PORT
+
+def _referral_server(value):
+    """Return the host of a referral, which registries give as a name or URL, or None."""
+    value = re.sub(r"^[a-z]+://", "", value.strip().lower()).rstrip("/")
+    return value if value and "/" not in value and " " not in value else None
+
+class WhoisServerMap:
+    """
+    TLD to WHOIS server map, kept in a JSON file across restarts.
+
+    Entries come from whois.iana.org and are refreshed when they are older
+    than max_age; if IANA cannot be reached the stale entry is kept.
+
+    Args:
+        path: JSON file, or None to keep the map in memory only
+        max_age: Seconds before an entry is looked up again
+    """
+
+    def __init__(self, path=None, max_age=WHOIS_SERVER_MAP_MAX_AGE_DEFAULT):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._servers = {}  # tld -> {"server": host or "", "updated": timestamp}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._servers = json.load(f)
+            except (OSError, ValueError):
+                self._servers = {}
+
+    def get(self, tld):
+        """
+        Return the entry for a TLD.
+
+        Returns:
+            tuple: (server, fresh), where server is "" for a TLD without a WHOIS
+                   server, or None if the TLD has never been looked up
+        """
+        with self._lock:
+            entry = self._servers.get(tld)
+        if entry is None:
+            return None
+        return entry["server"], time.time() - entry["updated"] < self.max_age
+
+    def set(self, tld, server):
+        with self._lock:
+            self._servers[tld] = {"server": server, "updated": time.time()}
+            servers = dict(self._servers)
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(servers, f, indent=1, sort_keys=True)
+            os.replace(temporary, self.path)
+
+    def __len__(self):
+        return len(self._servers)
+
+class WhoisClient:
+    """
+    Port-43 WHOIS client that queries the registry for a domain's TLD directly.
+
+    The registry's server comes from a WhoisServerMap, so IANA is only asked
+    once per TLD (and again once the entry is stale). A registrar referral
+    ("Registrar WHOIS Server") is followed only when the registry's answer
+    lacks one of the requested fields. Every query gets explicit connect
+    and read timeouts and, with a scheduler, waits for its server's turn.
+
+    Args:
+        server_map: WhoisServerMap (default: in memory only)
+        iana_server: Server to ask for TLD servers, "host" or "host:port"
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for the whole response
+        scheduler: whoisscheduler.WhoisScheduler to queue queries through, or None
+    """
+
+    def __init__(self, server_map=None, iana_server=WHOIS_IANA_SERVER, connect_timeout=WHOIS_CONNECT_TIMEOUT_DEFAULT,
+                 read_timeout=WHOIS_READ_TIMEOUT_DEFAULT, scheduler=None):
+        self.server_map = server_map if server_map is not None else WhoisServerMap()
+        self.iana_server = iana_server
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.scheduler = scheduler
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.iana_queries = 0
+        self.referrals = 0
+
+    def server_for(self, domain):
+        """
+        Return the WHOIS server of a domain's TLD, asking IANA if it is not known or stale.
+
+        Returns:
+            str: Server as "host" or "host:port", or "" if the TLD has no WHOIS server
+        """
+        tld = domain.rstrip(".").lower().rsplit(".", 1)[-1]
+        entry = self.server_map.get(tld)
+        if entry is not None and entry[1]:
+            return entry[0]
+        try:
+            text = self.query(self.iana_server, tld)
+        except OSError:
+            if entry is not None:
+                return entry[0]
+            raise
+        with self._lock:
+            self.iana_queries += 1
+        match = re.search(r"^(?:whois|refer):\s*(\S+)", text, re.IGNORECASE | re.MULTILINE)
+        server = match.group(1).lower() if match else ""
+        self.server_map.set(tld, server)
+        return server
+
+    def query(self, server, query):
+        """
+        Send one query to a WHOIS server and return its response.
+
+        Raises:
+            OSError: If the server cannot be reached or does not answer in time
+        """
+        host, port = _split_server(server)
+        text = QUERY_FORMATS.get(host, "{}").format(query)
+        if self.scheduler is not None:
+            with self.scheduler.slot(server):
+                return self._send(server, host, port, text)
+        return self._send(server, host, port, text)
+
+    def lookup(self, domain, fields=None):
+        """
+        Look up a domain at its registry, and at its registrar if fields are missing.
+
+        Args:
+            domain: Domain name (normally the registrable domain)
+            fields: Fields that must be present before the referral is skipped
+                    (default WHOIS_FIELDS)
+
+        Returns:
+            WhoisRecord: Parsed fields and the raw text; domain_name is None if
+                         the response has no registration data, which means the
+                         domain is not registered only if NOT_FOUND_PATTERNS matches
+                         the text (throttled or refused queries parse empty too)
+        """
+        domain = domain.strip().rstrip(".").lower()
+        server = self.server_for(domain)
+        if not server:
+            raise LookupError(f"No WHOIS server is known for .{domain.rsplit('.', 1)[-1]}")
+        record = self._parse(domain, self.query(server, domain))
+        if record.domain_name is None:
+            return record
+
+        referral = _referral_server(record.whois_server or "")
+        missing = [field for field in (fields or WHOIS_FIELDS) if not record.get(field)]
+        if missing and referral and referral != server:
+            try:
+                extra = self._parse(domain, self.query(referral, domain))
+            except OSError:
+                return record  # the registry's answer is still useful
+            with self._lock:
+                self.referrals += 1
+            for field, value in extra.items():
+                if field != "text" and not record.get(field):
+                    record[field] = value
+            record["text"] = record.text + "\n" + extra.text
+        return record
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "iana_queries": self.iana_queries,
+                "referrals": self.referrals,
+                "known_tlds": len(self.server_map)
+            }
+
+    def _parse(self, domain, text):
+        record = parse_response(text)
+        if record.domain_name is None and not NOT_FOUND_PATTERNS.search(text) and (
+                set(record) & set(WHOIS_FIELDS)):
+            # Some registries never repeat the name back
+            record["domain_name"] = domain
+        return record
+
+    def _send(self, server, host, port, text):
+        deadline = time.monotonic() + self.read_timeout
+        try:
+            with socket.create_connection((host, port), timeout=self.connect_timeout) as sock:
+                sock.sendall(text.encode("utf-8") + b"\r\n")
+                chunks = []
+                size = 0
+                while size < WHOIS_MAX_RESPONSE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise socket.timeout("timed out")
+                    sock.settimeout(remaining)
+                    data = sock.recv(65536)
+                    if not data:
+                        break
+                    chunks.append(data)
+                    size += len(data)
+        except socket.timeout:
+            raise TimeoutError(f"WHOIS server {server} timed out")
+        except OSError as e:
+            raise OSError(f"WHOIS server {server} failed: {e}") from e
+        finally:
+            with self._lock:
+                self.queries += 1
+        return b"".join(chunks).decode("utf-8", "replace")
+
+def get_whois_client_name(client=None):
+    """
+    Get the WHOIS client whoislookup uses.
+
+    Args:
+        client: Explicit client name; falls back to WHOIS_CLIENT, then "python-whois"
+
+    Returns:
+        str: "python-whois" or "native"
+
+    Raises:
+        ValueError: For an unknown client name
+    """
+    client = (client or os.getenv(WHOIS_CLIENT_ENV) or WHOIS_CLIENT_DEFAULT).strip().lower()
+    if client not in WHOIS_CLIENTS:
+        raise ValueError(f"Invalid WHOIS client. Must be one of: {', '.join(WHOIS_CLIENTS)}")
+    return client
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_whois_client():
+    """
+    Return the process-wide native WHOIS client, creating it on first use.
+
+    Returns:
+        WhoisClient: Client using the shared scheduler and the server map at WHOIS_SERVER_MAP
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            path = os.getenv(WHOIS_SERVER_MAP_ENV) or WHOIS_SERVER_MAP_DEFAULT
+            _client = WhoisClient(
+                WhoisServerMap(None if path.lower() == "off" else path,
+                               max_age=float(os.getenv(WHOIS_SERVER_MAP_MAX_AGE_ENV) or
+                                             WHOIS_SERVER_MAP_MAX_AGE_DEFAULT)),
+                connect_timeout=float(os.getenv(WHOIS_CONNECT_TIMEOUT_ENV) or WHOIS_CONNECT_TIMEOUT_DEFAULT),
+                read_timeout=float(os.getenv(WHOIS_READ_TIMEOUT_ENV) or WHOIS_READ_TIMEOUT_DEFAULT),
+                scheduler=get_whois_scheduler())
+        return _client
+
+def get_client_stats():
+    """Return the native WHOIS client counters."""
+    return get_whois_client().stats()
@@ -1,7 +1,29 @@
 # whoislookup.py
+import os
 import whois
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from whois.parser import WhoisEntry
+from whois.whois import NICClient
+from irtoolshed_mcp_server.publicsuffix import registrable_domain
+from irtoolshed_mcp_server.rdapclient import get_rdap_client
+from irtoolshed_mcp_server.whoiscache import get_whois_cache
+from irtoolshed_mcp_server.whoisclient import NOT_FOUND_PATTERNS, get_whois_client, get_whois_client_name
+from irtoolshed_mcp_server.whoisscheduler import get_whois_scheduler, whois_server
+
+# Constants for choosing between RDAP and WHOIS
+WHOIS_BACKENDS_ENV = "WHOIS_BACKENDS"  # comma separated, in order of preference
+WHOIS_BACKENDS = ["rdap", "whois"]
+WHOIS_BACKENDS_DEFAULT = "rdap,whois"
+
+# Constants for bulk lookups
+WHOIS_BULK_MAX_DOMAINS = 10000
+WHOIS_BULK_CONCURRENCY_ENV = "WHOIS_BULK_CONCURRENCY"
+WHOIS_BULK_CONCURRENCY_DEFAULT = 16
+WHOIS_BULK_MAX_CONCURRENCY = 100
+WHOIS_BULK_DEADLINE_ENV = "WHOIS_BULK_DEADLINE"
+WHOIS_BULK_DEADLINE_DEFAULT = 120.0  # seconds for the whole batch
 
 def is_valid_domain(domain):
     """Check if a domain name is valid."""
@@ -34,10 +56,37 @@ def format_nameservers(nameservers):
         
     return []
 
+def get_whois_backends(backends=None):
+    """
+    Get the registration data sources to try, in order.
+
+    Args:
+        backends: Explicit list or comma separated string; falls back to WHOIS_BACKENDS, then "rdap,whois"
+
+    Returns:
+        list: Backend names ("rdap", "whois")
+
+    Raises:
+        ValueError: For an unknown or empty backend list
+    """
+    backends = backends or os.getenv(WHOIS_BACKENDS_ENV) or WHOIS_BACKENDS_DEFAULT
+    if isinstance(backends, str):
+        backends = backends.split(",")
+    backends = [backend.strip().lower() for backend in backends if backend.strip()]
+    if not backends or any(backend not in WHOIS_BACKENDS for backend in backends):
+        raise ValueError(f"Invalid WHOIS backends. Must be a list of: {', '.join(WHOIS_BACKENDS)}")
+    return backends
+
 def whoislookup(domain):
     """
     Perform WHOIS lookup for a domain name.
 
+    The backends in WHOIS_BACKENDS are tried in order (RDAP, then WHOIS, by
+    default), moving on whenever one cannot answer; "source" says which
+    one did. Results are cached on disk under the registrable domain (per
+    the bundled Public Suffix List), so a.example.com and b.example.com
+    share one query. Cached results are returned exactly as first looked up.
+
     Args:
         domain: The domain name to look up
 
@@ -45,33 +94,123 @@ def whoislookup(domain):
         dict: A dictionary with domain registration information or error details.
              Always includes raw_output for debugging and custom parsing.
     """
+    # Sanitize input
+    domain = domain.strip() if domain else ""
+
+    # Validate domain format
+    if not is_valid_domain(domain):
+        return {
+            "status": "error",
+            "error": "Invalid domain name format",
+            "query": domain,
+            "raw_output": None
+        }
+
+    key = registrable_domain(domain) or domain.lower()
+    cache = get_whois_cache()
+    if cache is not None:
+        result = cache.get(key)
+        if result is not None:
+            result["domain" if "domain" in result else "query"] = domain
+            return result
+
     try:
-        # Sanitize input
-        domain = domain.strip() if domain else ""
-        
-        # Validate domain format
-        if not is_valid_domain(domain):
-            return {
-                "status": "error",
-                "error": "Invalid domain name format",
-                "query": domain,
-                "raw_output": None
-            }
+        backends = get_whois_backends()
+    except ValueError as e:
+        return {
+            "status": "error",
+            "error": str(e),
+            "query": domain,
+            "raw_output": None
+        }
+
+    not_found = None
+    for backend in backends:
+        result, negative = _whois_query(domain, key, backend)
+        result["source"] = backend
+        if negative is False:
+            break
+        if negative:
+            # Let a later backend confirm it; its raw output is usually more telling
+            not_found = result, negative
+    if negative is None and not_found is not None:
+        result, negative = not_found
+
+    if cache is not None and negative is not None:
+        cache.put(key, result, negative=negative)
+    return result
+
+def _python_whois(key):
+    """
+    Look key up with python-whois, queuing each hop behind other queries to its server.
+
+    python-whois is only asked for the registry's answer; the referral to
+    the registrar's WHOIS server is followed here, so that hop is queued
+    and rate-limited too. A registrar that cannot be reached leaves the
+    registry's answer as it is.
+    """
+    scheduler = get_whois_scheduler()
+    server = whois_server(key)
+    with scheduler.slot(server):
+        w = whois.whois(key, flags=NICClient.WHOIS_QUICK)
+    text = w.text or ""
+    if text.startswith("Socket not responding"):
+        return w
+    query = key.encode("idna").decode("ascii")
+    referral = NICClient.findwhois_server(text, server, query)
+    if not referral or referral == server:
+        return w
+    with scheduler.slot(referral):
+        extra = NICClient().whois(query, referral, 0, quiet=True)
+    if extra.startswith("Socket not responding"):
+        return w
+    return WhoisEntry.load(key, text + extra)
+
+def _whois_query(domain, key, backend="whois"):
+    """
+    Query one backend for the registration of key and map it to a result for domain.
+
+    Returns:
+        tuple: (result dict, negative), where negative is False for a registered
+               domain, True for "Domain not found" and None for other errors
+    """
+    try:
+        # Perform the query, queued behind other queries to the same server
+        if backend == "rdap":
+            w = get_rdap_client().lookup(key)
+        elif get_whois_client_name() == "native":
+            w = get_whois_client().lookup(key)
+        else:
+            w = _python_whois(key)
 
-        # Perform WHOIS query
-        w = whois.whois(domain)
-        
         # Store raw output
         raw_output = w.text
 
-        # Check if the domain exists
+        # python-whois reports connection failures and timeouts as the response text
+        if raw_output and raw_output.startswith("Socket not responding"):
+            return {
+                "status": "error",
+                "error": raw_output.strip(),
+                "query": domain,
+                "raw_output": raw_output
+            }, None
+
+        # Check if the domain exists; rate-limit banners and refusals also parse
+        # to nothing, so only an RDAP 404 or a registry's "no match" is cached
         if not w.domain_name:
+            if backend != "rdap" and not NOT_FOUND_PATTERNS.search(raw_output or ""):
+                return {
+                    "status": "error",
+                    "error": "No registration data in WHOIS response",
+                    "query": domain,
+                    "raw_output": raw_output
+                }, None
             return {
                 "status": "error",
                 "error": "Domain not found",
                 "query": domain,
                 "raw_output": raw_output
-            }
+            }, True
 
         # Process the results with default "Unknown" for unmappable fields
         result = {
@@ -114,22 +253,145 @@ def whoislookup(domain):
             if org and str(org).strip():
                 result["registrant"] = org
 
-        return result
+        return result, False
 
     except whois.parser.PywhoisError as e:
+        # python-whois raises this when the registry answers "no match"
         return {
             "status": "error",
             "error": str(e),
             "query": domain,
             "raw_output": getattr(e, 'text', None)
-        }
+        }, True
     except Exception as e:
         return {
             "status": "error",
             "error": str(e),
             "query": domain,
             "raw_output": None
+        }, None
+
+def _interleave_by_tld(domains):
+    """Order domains round-robin across TLDs, so workers spread over registries."""
+    by_tld = {}
+    for domain in domains:
+        by_tld.setdefault(domain.rsplit(".", 1)[-1], []).append(domain)
+    queues = list(by_tld.values())
+    ordered = []
+    for i in range(max(len(queue) for queue in queues)):
+        ordered.extend(queue[i] for queue in queues if i < len(queue))
+    return ordered
+
+def whoislookup_bulk(domains, concurrency=None, deadline=None, on_result=None):
+    """
+    Perform WHOIS lookups for many domains in one call.
+
+    Names are normalized (stripped, lowercased, trailing dot removed) and
+    collapsed to their registrable domains, so a.example.com and
+    b.example.com cost one lookup. The lookups run on a bounded pool of
+    worker threads, interleaved across TLDs, and go through the WHOIS cache
+    and per-server scheduler like whoislookup(). Once the deadline passes
+    the call returns what has finished; lookups still running are reported
+    as "timed_out" and those not yet started as "pending". Running lookups
+    are not interrupted, so their results still reach the cache.
+
+    Args:
+        domains: List of domain names, or a string of comma/whitespace separated names
+        concurrency: Maximum lookups in flight (default WHOIS_BULK_CONCURRENCY, or 16)
+        deadline: Seconds allowed for the whole batch (default WHOIS_BULK_DEADLINE, or 120)
+        on_result: Callable invoked with each result as soon as it finishes (optional)
+
+    Returns:
+        dict: One result per registrable domain, in input order, plus a summary
+    """
+    # Sanitize input
+    if isinstance(domains, str):
+        domains = domains.replace(",", " ").split()
+    domains = [d.strip().rstrip(".").lower() for d in (domains or []) if d and d.strip().rstrip(".")]
+    if concurrency is None:
+        concurrency = int(os.getenv(WHOIS_BULK_CONCURRENCY_ENV) or WHOIS_BULK_CONCURRENCY_DEFAULT)
+    if deadline is None:
+        deadline = float(os.getenv(WHOIS_BULK_DEADLINE_ENV) or WHOIS_BULK_DEADLINE_DEFAULT)
+
+    if not domains:
+        return {
+            "status": "error",
+            "error": "No domains provided",
+            "query": {"count": 0}
+        }
+    if len(domains) > WHOIS_BULK_MAX_DOMAINS:
+        return {
+            "status": "error",
+            "error": f"Too many domains. Maximum is {WHOIS_BULK_MAX_DOMAINS}",
+            "query": {"count": len(domains)}
+        }
+    if not 1 <= concurrency <= WHOIS_BULK_MAX_CONCURRENCY:
+        return {
+            "status": "error",
+            "error": f"Invalid concurrency. Must be between 1 and {WHOIS_BULK_MAX_CONCURRENCY}",
+            "query": {"count": len(domains)}
+        }
+    if deadline <= 0:
+        return {
+            "status": "error",
+            "error": "Invalid deadline. Must be greater than 0",
+            "query": {"count": len(domains)}
+        }
+
+    # Collapse to registrable domains, keeping first-seen order
+    keys = {domain: registrable_domain(domain) or domain for domain in domains}
+    unique_domains = list(dict.fromkeys(keys.values()))
+    results = {}
+
+    executor = ThreadPoolExecutor(max_workers=min(concurrency, len(unique_domains)),
+                                  thread_name_prefix="whois-bulk")
+    futures = {executor.submit(whoislookup, domain): domain for domain in _interleave_by_tld(unique_domains)}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            domain = futures[future]
+            results[domain] = future.result()
+            if on_result is not None:
+                on_result(results[domain])
+    except TimeoutError:
+        pass
+    finally:
+        # Drop lookups that have not started; running ones finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    for future, domain in futures.items():
+        if domain in results:
+            continue
+        if future.done() and not future.cancelled():
+            results[domain] = future.result()
+        elif future.cancelled():
+            results[domain] = {
+                "status": "pending",
+                "error": "WHOIS lookup was not started before the deadline",
+                "query": domain,
+                "raw_output": None
+            }
+        else:
+            results[domain] = {
+                "status": "timed_out",
+                "error": "WHOIS lookup did not finish before the deadline",
+                "query": domain,
+                "raw_output": None
+            }
+
+    ordered = [results[domain] for domain in unique_domains]
+    return {
+        "status": "success",
+        "results": ordered,
+        "collapsed": {domain: key for domain, key in keys.items() if domain != key},
+        "summary": {
+            "total": len(domains),
+            "unique": len(unique_domains),
+            "succeeded": sum(1 for r in ordered if r["status"] == "success"),
+            "failed": sum(1 for r in ordered if r["status"] == "error"),
+            "timed_out": sum(1 for r in ordered if r["status"] == "timed_out"),
+            "pending": sum(1 for r in ordered if r["status"] == "pending")
         }
+    }
 
 if __name__ == "__main__":
     print("Running whoislookup as main")
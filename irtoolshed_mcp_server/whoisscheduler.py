@@ -0,0 +1,259 @@
+# whoisscheduler.py
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+from whois.whois import NICClient
+
+# Constants for per-server WHOIS rate limiting
+WHOIS_RATE_ENV = "WHOIS_RATE"
+WHOIS_RATE_DEFAULT = 1.0  # queries per second, per WHOIS server
+WHOIS_BURST_ENV = "WHOIS_BURST"
+WHOIS_BURST_DEFAULT = 3
+WHOIS_MAX_CONCURRENCY_ENV = "WHOIS_MAX_CONCURRENCY"
+WHOIS_MAX_CONCURRENCY_DEFAULT = 2  # queries in flight, per WHOIS server
+WHOIS_QUEUE_TIMEOUT_ENV = "WHOIS_QUEUE_TIMEOUT"
+WHOIS_QUEUE_TIMEOUT_DEFAULT = 60.0
+WHOIS_WAIT_WINDOW = 1000  # recent queue waits kept for the percentiles
+
+class ServerQueue:
+    """
+    Token bucket and concurrency limit for one WHOIS server.
+
+    Callers are admitted strictly in arrival order: the caller at the head
+    of the queue waits for both a free slot and a token, and nobody behind
+    it can overtake. Tokens refill at rate per second up to burst.
+
+    Args:
+        server: WHOIS server the queue is for
+        rate: Queries per second (0 disables the rate limit)
+        burst: Queries allowed back to back before the rate applies
+        max_concurrency: Queries in flight at once
+    """
+
+    def __init__(self, server, rate=WHOIS_RATE_DEFAULT, burst=WHOIS_BURST_DEFAULT,
+                 max_concurrency=WHOIS_MAX_CONCURRENCY_DEFAULT):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.server = server
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        self._waiting = deque()  # tickets, first come first served
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waits = deque(maxlen=WHOIS_WAIT_WINDOW)
+        self.in_flight = 0
+        self.max_depth = 0
+        self.admitted = 0
+        self.timed_out = 0
+
+    def acquire(self, timeout=None):
+        """
+        Wait for this caller's turn, a free slot and a token.
+
+        Args:
+            timeout: Seconds to wait (None waits indefinitely)
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            TimeoutError: If the turn did not come within timeout seconds
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        ticket = object()
+        with self._cond:
+            self._waiting.append(ticket)
+            self.max_depth = max(self.max_depth, len(self._waiting))
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] is ticket and self.in_flight < self.max_concurrency:
+                        wait = self._take_token()
+                        if wait == 0:
+                            break
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timed_out += 1
+                            raise TimeoutError(f"Timed out waiting for WHOIS server {self.server}")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting.remove(ticket)
+                # Let the next caller in line check its turn
+                self._cond.notify_all()
+            self.in_flight += 1
+            self.admitted += 1
+            waited = time.monotonic() - start
+            self._waits.append(waited)
+            return waited
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "server": self.server,
+                "queue_depth": len(self._waiting),
+                "max_queue_depth": self.max_depth,
+                "in_flight": self.in_flight,
+                "admitted": self.admitted,
+                "timed_out": self.timed_out,
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 2) if waits else None,
+                "wait_p95_ms": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 2)
+                if waits else None,
+                "wait_max_ms": round(waits[-1] * 1000, 2) if waits else None
+            }
+
+    def _take_token(self):
+        """Take a token and return 0, or return seconds until one is available."""
+        if not self.rate:
+            return 0
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+class WhoisScheduler:
+    """
+    Queues WHOIS queries per server so no registry is hammered.
+
+    Every server gets its own ServerQueue with the same limits, so a
+    backlog at one registry never holds up queries to another.
+
+    Args:
+        rate: Queries per second, per server (0 disables the rate limit)
+        burst: Queries allowed back to back, per server
+        max_concurrency: Queries in flight, per server
+        queue_timeout: Default seconds a query may wait for its turn
+    """
+
+    def __init__(self, rate=WHOIS_RATE_DEFAULT, burst=WHOIS_BURST_DEFAULT,
+                 max_concurrency=WHOIS_MAX_CONCURRENCY_DEFAULT, queue_timeout=WHOIS_QUEUE_TIMEOUT_DEFAULT):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._queues = {}  # server -> ServerQueue
+
+    def queue(self, server):
+        """Return the queue for a server, creating it on first use."""
+        with self._lock:
+            queue = self._queues.get(server)
+            if queue is None:
+                queue = self._queues[server] = ServerQueue(server, self.rate, self.burst, self.max_concurrency)
+            return queue
+
+    @contextlib.contextmanager
+    def slot(self, server, timeout=None):
+        """
+        Hold one of a server's query slots for the duration of a with block.
+
+        Args:
+            server: WHOIS server the query goes to
+            timeout: Seconds to wait for the slot (default queue_timeout)
+
+        Raises:
+            TimeoutError: If no slot was free in time
+        """
+        queue = self.queue(server)
+        queue.acquire(self.queue_timeout if timeout is None else timeout)
+        try:
+            yield
+        finally:
+            queue.release()
+
+    def stats(self):
+        """Return the limits and per-server queue depth, wait-time and admission counters as a dict."""
+        with self._lock:
+            queues = list(self._queues.values())
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "max_concurrency": self.max_concurrency,
+            "queue_timeout": self.queue_timeout,
+            "servers": [queue.stats() for queue in queues]
+        }
+
+IANA_WHOIS_HOST = NICClient.IANAHOST
+# Endings python-whois's choose_server matches on the whole name rather than the TLD
+WHOIS_NAME_RULES = ("id", "hr", ".pp.ua")
+_whois_servers = {}  # TLD -> WHOIS server
+_whois_servers_lock = threading.Lock()
+
+def whois_server(domain):
+    """
+    Return the WHOIS server that python-whois queries for a domain.
+
+    Servers are worked out once per TLD, from python-whois's built-in table
+    or, for other TLDs, from whois.iana.org (itself queued through the
+    scheduler), and remembered for the life of the process. The few names
+    python-whois routes by their ending instead (WHOIS_NAME_RULES) are
+    worked out for each domain; that needs no query.
+
+    Args:
+        domain: Domain name
+
+    Returns:
+        str: WHOIS server host name, or the TLD itself if it could not be found
+    """
+    domain = domain.rstrip(".").lower()
+    try:
+        domain = domain.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    if domain.endswith(WHOIS_NAME_RULES):
+        return NICClient().choose_server(domain) or domain.rsplit(".", 1)[-1]
+    tld = domain.rsplit(".", 1)[-1]
+    with _whois_servers_lock:
+        server = _whois_servers.get(tld)
+    if server is not None:
+        return server
+    try:
+        with get_whois_scheduler().slot(IANA_WHOIS_HOST):
+            # Another query may have looked the TLD up while this one was queued
+            server = _whois_servers.get(tld) or NICClient().choose_server(domain)
+    except Exception:
+        return tld  # not remembered, so the next query tries again
+    server = server or tld
+    with _whois_servers_lock:
+        _whois_servers[tld] = server
+    return server
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_whois_scheduler():
+    """
+    Return the process-wide WHOIS scheduler, creating it on first use.
+
+    Returns:
+        WhoisScheduler: Scheduler configured by WHOIS_RATE, WHOIS_BURST,
+                        WHOIS_MAX_CONCURRENCY and WHOIS_QUEUE_TIMEOUT
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = WhoisScheduler(
+                rate=float(os.getenv(WHOIS_RATE_ENV) or WHOIS_RATE_DEFAULT),
+                burst=int(os.getenv(WHOIS_BURST_ENV) or WHOIS_BURST_DEFAULT),
+                max_concurrency=int(os.getenv(WHOIS_MAX_CONCURRENCY_ENV) or WHOIS_MAX_CONCURRENCY_DEFAULT),
+                queue_timeout=float(os.getenv(WHOIS_QUEUE_TIMEOUT_ENV) or WHOIS_QUEUE_TIMEOUT_DEFAULT))
+        return _scheduler
+
+def get_scheduler_stats():
+    """Return the WHOIS scheduler counters."""
+    return get_whois_scheduler().stats()
@@ -0,0 +1,436 @@
+import http.server
+import ipaddress
+import json
+import socket
+import socketserver
+import ssl
+import struct
+import threading
+import time
+import dns.asyncresolver
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.rrset
+import pytest
+
+class FakeCymruHandler(socketserver.StreamRequestHandler):
+    """Speaks enough of whois.cymru.com's bulk protocol for cymruwhois.Client"""
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.active.add(self.request)
+        for raw in self.rfile:
+            line = raw.decode().strip()
+            if not line:
+                continue
+            if line.upper() == "BEGIN":
+                self.wfile.write(b"Bulk mode; whois.cymru.com [2025-01-01 00:00:00 +0000]\n")
+            elif line.upper() == "END":
+                break
+            elif line.upper() in ("PREFIX", "ASNUMBER", "COUNTRYCODE", "NOTRUNC", "VERBOSE"):
+                continue
+            else:
+                with server.lock:
+                    server.queries += 1
+                self.wfile.write(server.answer(line).encode() + b"\n")
+            self.wfile.flush()
+
+class FakeCymruServer(socketserver.ThreadingTCPServer):
+    """Local stand-in for whois.cymru.com port 43"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, routes):
+        super().__init__(("127.0.0.1", 0), FakeCymruHandler)
+        self.routes = {ipaddress.ip_network(prefix): info for prefix, info in routes.items()}
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.queries = 0
+        self.active = set()
+
+    def drop_connections(self):
+        """Close every open client connection from the server side"""
+        with self.lock:
+            active, self.active = self.active, set()
+        for sock in active:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def answer(self, ip):
+        try:
+            ip_obj = ipaddress.ip_address(ip)
+        except ValueError:
+            return f"Error: no ASN or IP match on line 1."
+        ip = str(ip_obj)  # Cymru echoes the address in its own (canonical) spelling
+        matches = [net for net in self.routes if ip_obj in net]
+        if not matches:
+            return f"NA      | {ip:<16} | NA                  |    | NA"
+        net = max(matches, key=lambda n: n.prefixlen)
+        asn, cc, owner = self.routes[net]
+        return f"{asn:<7} | {ip:<16} | {str(net):<19} | {cc} | {owner}"
+
+FAKE_CYMRU_ROUTES = {
+    "8.8.8.0/24": ("15169", "US", "GOOGLE - Google LLC, US"),
+    "8.0.0.0/12": ("3356", "US", "LEVEL3, US"),
+    "1.1.1.0/24": ("13335", "US", "CLOUDFLARENET, US"),
+    "2001:4860::/32": ("15169", "US", "GOOGLE - Google LLC, US"),
+}
+
+@pytest.fixture
+def cymru_server():
+    """Run a local fake Team Cymru whois server for the duration of a test"""
+    server = FakeCymruServer(FAKE_CYMRU_ROUTES)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    server.host, server.port = server.server_address
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class FakeWhoisHandler(socketserver.StreamRequestHandler):
+    """Answers one port-43 WHOIS query per connection, like a registry"""
+    def handle(self):
+        server = self.server
+        query = self.rfile.readline().decode().strip()
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.queries.append((query, time.monotonic()))
+        try:
+            time.sleep(server.delay)
+            text = server.records.get(query.lower(), f'No match for "{query.upper()}".\r\n')
+            self.wfile.write(text.encode())
+        finally:
+            with server.lock:
+                server.active -= 1
+
+class FakeWhoisServer(socketserver.ThreadingTCPServer):
+    """Local stand-in for a registry's WHOIS server"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, records=None, delay=0.0):
+        super().__init__(("127.0.0.1", 0), FakeWhoisHandler)
+        self.records = dict(records or {})  # query -> response text
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.queries = []  # (query, time.monotonic())
+        self.active = 0
+        self.max_active = 0
+
+@pytest.fixture
+def whois_servers():
+    """Start local fake WHOIS servers on demand: whois_servers(records, delay)"""
+    servers = []
+
+    def start(records=None, delay=0.0):
+        server = FakeWhoisServer(records, delay)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        server.host, server.port = server.server_address
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+class FakeRDAPHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the bootstrap registry and domain objects over keep-alive HTTP/1.1"""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+        time.sleep(server.delay)
+        if self.path == "/dns.json":
+            body = {"version": "1.0", "services": [[list(server.tlds), [f"{server.url}/rdap/"]]]}
+        elif self.path.startswith(("/rdap/domain/", "/registrar/domain/")):
+            body = server.domains.get(self.path)
+        else:
+            body = None
+        data = json.dumps(body if body is not None else {"errorCode": 404, "title": "Not Found"}).encode()
+        self.send_response(200 if body is not None else 404)
+        self.send_header("Content-Type", "application/rdap+json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeRDAPServer(http.server.ThreadingHTTPServer):
+    """Local stand-in for IANA's RDAP bootstrap registry and RDAP servers"""
+    daemon_threads = True
+
+    def __init__(self, tlds=("test",)):
+        super().__init__(("127.0.0.1", 0), FakeRDAPHandler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.tlds = tlds
+        self.domains = {}  # path -> RDAP object
+        self.delay = 0.0
+        self.lock = threading.Lock()
+        self.requests = []
+        self.connections = 0
+
+@pytest.fixture
+def rdap_server():
+    server = FakeRDAPServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class FakeDNSZone:
+    """Authoritative answers served by the local DNS stand-in"""
+
+    def __init__(self, zones=("test.",), soa_minimum=60):
+        self.zones = [zone.lower() for zone in zones]
+        self.soa_minimum = soa_minimum
+        self.records = {}   # name -> {rdtype text: (ttl, [rdata text])}
+        self.delays = {}    # name -> seconds to wait before answering
+        self.drop = set()   # names that are never answered
+        self.servfail = set()  # names answered with SERVFAIL
+        self.lock = threading.Lock()
+        self.queries = []
+        self.tcp_connections = 0
+        self.tcp_max_queries = None  # close TCP connections after this many queries
+
+    def add(self, name, rdtype, values, ttl=300):
+        """Serve values (rdata text) for name and rdtype"""
+        name = name.lower() if name.endswith(".") else name.lower() + "."
+        self.records.setdefault(name, {})[rdtype.upper()] = (ttl, list(values))
+
+    def count(self, name=None, rdtype=None):
+        """Number of queries received, optionally for one name and type"""
+        name = name.lower() if name and name.endswith(".") else (name.lower() + "." if name else None)
+        with self.lock:
+            return sum(1 for qname, qtype in self.queries
+                       if (name is None or qname == name) and (rdtype is None or qtype == rdtype))
+
+    def _soa(self, name):
+        apex = next((zone for zone in self.zones if name == zone or name.endswith("." + zone)),
+                    name.rstrip(".").rsplit(".", 1)[-1] + ".")
+        return dns.rrset.from_text(apex, self.soa_minimum, "IN", "SOA",
+                                   f"ns1.{apex} hostmaster.{apex} 1 3600 600 86400 {self.soa_minimum}")
+
+    def reply(self, wire):
+        """Return the wire-format response to a wire-format query, or None to drop it"""
+        query = dns.message.from_wire(wire)
+        question = query.question[0]
+        name = question.name.to_text().lower()
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        with self.lock:
+            self.queries.append((name, rdtype))
+        if name in self.drop:
+            return None
+        if name in self.delays:
+            time.sleep(self.delays[name])
+        response = dns.message.make_response(query)
+        if name in self.servfail:
+            response.set_rcode(dns.rcode.SERVFAIL)
+            return response.to_wire()
+        response.flags |= dns.flags.AA
+        records = self.records.get(name)
+        if records and rdtype in records:
+            ttl, values = records[rdtype]
+            response.answer.append(dns.rrset.from_text_list(question.name, ttl, "IN", rdtype, values))
+        else:
+            if not records:
+                response.set_rcode(dns.rcode.NXDOMAIN)
+            response.authority.append(self._soa(name))
+        return response.to_wire()
+
+class _DNSUDPHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        reply = self.server.zone.reply(data)
+        if reply is not None:
+            try:
+                sock.sendto(reply, self.client_address)
+            except OSError:
+                pass  # the server was shut down while the reply was delayed
+
+class _DNSTCPHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        zone = self.server.zone
+        with zone.lock:
+            zone.tcp_connections += 1
+        stream = self.request.makefile("rb")
+        answered = 0
+        while zone.tcp_max_queries is None or answered < zone.tcp_max_queries:
+            header = stream.read(2)
+            if len(header) < 2:
+                break
+            data = stream.read(struct.unpack("!H", header)[0])
+            reply = zone.reply(data)
+            answered += 1
+            if reply is not None:
+                self.request.sendall(struct.pack("!H", len(reply)) + reply)
+
+class _ThreadingUDPServer(socketserver.ThreadingUDPServer):
+    daemon_threads = True
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class _TLSThreadingTCPServer(_ThreadingTCPServer):
+    """TCP stand-in that wraps accepted connections in TLS"""
+
+    def get_request(self):
+        sock, address = super().get_request()
+        return self.ssl_context.wrap_socket(sock, server_side=True), address
+
+def _start_dns_server(zone, host="127.0.0.1", port=0):
+    """Serve zone over UDP and TCP on the same local port; returns the servers"""
+    for _ in range(20):
+        udp = _ThreadingUDPServer((host, port), _DNSUDPHandler)
+        try:
+            tcp = _ThreadingTCPServer((host, udp.server_address[1]), _DNSTCPHandler)
+            break
+        except OSError:
+            udp.server_close()
+            if port:
+                raise
+    servers = [udp, tcp]
+    for server in servers:
+        server.zone = zone
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    zone.host, zone.port = udp.server_address
+    return servers
+
+def _stop_dns_server(servers):
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def dns_server():
+    """Run a local authoritative DNS stand-in (UDP and TCP on the same port)"""
+    zone = FakeDNSZone(zones=("test.", "cymru.com."))
+    servers = _start_dns_server(zone)
+    yield zone
+    _stop_dns_server(servers)
+
+@pytest.fixture
+def dns_server_pair():
+    """Run two local DNS stand-ins on 127.0.0.1 and 127.0.0.2 with the same port, each with its own zone"""
+    zones = [FakeDNSZone(zones=("test.",)), FakeDNSZone(zones=("test.",))]
+    first = _start_dns_server(zones[0])
+    for _ in range(20):
+        try:
+            second = _start_dns_server(zones[1], "127.0.0.2", zones[0].port)
+            break
+        except OSError:
+            _stop_dns_server(first)
+            first = _start_dns_server(zones[0])
+    yield zones
+    _stop_dns_server(first + second)
+
+@pytest.fixture
+def local_resolver(dns_server, monkeypatch):
+    """Point the shared sync and asyncio resolvers at the local DNS stand-in, with an empty cache"""
+    from irtoolshed_mcp_server import resolver as resolver_module
+    for attr, factory in (("_resolver", dns.resolver.Resolver), ("_async_resolver", dns.asyncresolver.Resolver)):
+        resolver = factory(configure=False)
+        resolver.nameservers = [dns_server.host]
+        resolver.port = dns_server.port
+        monkeypatch.setattr(resolver_module, attr, resolver_module.configure(resolver))
+    resolver_module.flush_cache()
+    yield dns_server
+    resolver_module.flush_cache()
+
+@pytest.fixture(scope="session")
+def tls_certificate(tmp_path_factory):
+    """A self-signed certificate for "dns.test" and 127.0.0.1; returns (cert path, key path)"""
+    pytest.importorskip("cryptography")
+    import datetime
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "dns.test")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName(
+                [x509.DNSName("dns.test"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+    directory = tmp_path_factory.mktemp("tls")
+    cert_path, key_path = directory / "cert.pem", directory / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    return cert_path, key_path
+
+@pytest.fixture
+def dns_tls_server(dns_server, tls_certificate):
+    """Serve the dns_server zone over DNS-over-TLS too; the zone gets a .tls_port"""
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(*tls_certificate)
+    server = _TLSThreadingTCPServer(("127.0.0.1", 0), _DNSTCPHandler)
+    server.ssl_context = context
+    server.zone = dns_server
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    dns_server.tls_port = server.server_address[1]
+    yield dns_server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(autouse=True)
+def passive_dns_store(tmp_path, monkeypatch):
+    """Keep the passive-DNS store of every test in its own temporary file"""
+    from irtoolshed_mcp_server import passivedns
+    monkeypatch.setenv("PASSIVE_DNS_DB", str(tmp_path / "passivedns.sqlite3"))
+    monkeypatch.setattr(passivedns, "_store", None)
+    yield
+    if passivedns._store is not None:
+        passivedns._store.close()
+
+@pytest.fixture(autouse=True)
+def whois_cache(tmp_path, monkeypatch):
+    """Keep the WHOIS cache of every test in its own temporary file"""
+    from irtoolshed_mcp_server import whoiscache
+    monkeypatch.setenv("WHOIS_CACHE_DB", str(tmp_path / "whoiscache.sqlite3"))
+    monkeypatch.setattr(whoiscache, "_cache", None)
+    yield
+
+@pytest.fixture(autouse=True)
+def whois_scheduler(monkeypatch):
+    """Give every test a fresh WHOIS scheduler and TLD server table"""
+    from irtoolshed_mcp_server import whoisscheduler
+    monkeypatch.setattr(whoisscheduler, "_scheduler", None)
+    monkeypatch.setattr(whoisscheduler, "_whois_servers", {})
+
+@pytest.fixture(autouse=True)
+def whois_client(tmp_path, monkeypatch):
+    """Keep the native WHOIS client's server map of every test in its own temporary file"""
+    from irtoolshed_mcp_server import whoisclient
+    monkeypatch.setenv("WHOIS_SERVER_MAP", str(tmp_path / "whois_servers.json"))
+    monkeypatch.setattr(whoisclient, "_client", None)
+
+@pytest.fixture(autouse=True)
+def rdap_client(tmp_path, monkeypatch):
+    """Keep the cached RDAP bootstrap registry of every test in its own temporary file"""
+    from irtoolshed_mcp_server import rdapclient
+    monkeypatch.setenv("RDAP_BOOTSTRAP_FILE", str(tmp_path / "rdap_dns.json"))
+    monkeypatch.setattr(rdapclient, "_client", None)
@@ -0,0 +1,123 @@
+# Minimal MaxMind DB writer used to build small test databases
+import ipaddress
+import struct
+import time
+
+METADATA_MARKER = b"\xab\xcd\xefMaxMind.com"
+
+class UInt16(int):
+    """Integer that must be encoded as uint16"""
+
+class UInt32(int):
+    """Integer that must be encoded as uint32"""
+
+class UInt64(int):
+    """Integer that must be encoded as uint64"""
+
+def _control(type_num, size):
+    """Encode a control byte (plus extended type and size bytes)"""
+    if size < 29:
+        size_bits, extra = size, b""
+    elif size < 29 + 256:
+        size_bits, extra = 29, bytes([size - 29])
+    elif size < 285 + 65536:
+        size_bits, extra = 30, struct.pack(">H", size - 285)
+    else:
+        size_bits, extra = 31, struct.pack(">I", size - 65821)[1:]
+    if type_num <= 7:
+        return bytes([(type_num << 5) | size_bits]) + extra
+    return bytes([size_bits, type_num - 7]) + extra
+
+def _strip_uint(value):
+    """Big-endian bytes of an unsigned int with leading zeros removed"""
+    return value.to_bytes(16, "big").lstrip(b"\x00")
+
+def encode(value):
+    """Encode a Python value in the MaxMind DB data format"""
+    if isinstance(value, bool):
+        return _control(14, int(value))
+    if isinstance(value, dict):
+        out = _control(7, len(value))
+        for key, item in value.items():
+            out += encode(str(key)) + encode(item)
+        return out
+    if isinstance(value, (list, tuple)):
+        out = _control(11, len(value))
+        for item in value:
+            out += encode(item)
+        return out
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return _control(2, len(data)) + data
+    if isinstance(value, float):
+        return _control(3, 8) + struct.pack(">d", value)
+    if isinstance(value, UInt16):
+        return _control(5, len(_strip_uint(value))) + _strip_uint(value)
+    if isinstance(value, UInt32):
+        return _control(6, len(_strip_uint(value))) + _strip_uint(value)
+    if isinstance(value, UInt64):
+        return _control(9, len(_strip_uint(value))) + _strip_uint(value)
+    if isinstance(value, int):
+        data = _strip_uint(value)
+        if value < 0:
+            return _control(8, 4) + struct.pack(">i", value)
+        if value < 2 ** 16:
+            return _control(5, len(data)) + data
+        if value < 2 ** 32:
+            return _control(6, len(data)) + data
+        return _control(9, len(data)) + data
+    raise TypeError(f"Cannot encode {type(value)}")
+
+def write_mmdb(path, networks, database_type="GeoLite2-City"):
+    """
+    Write an IPv6 MaxMind DB file (IPv4 networks are mapped into ::/96).
+
+    Args:
+        path: Output file path
+        networks: Dict of non-overlapping network string -> record dict
+        database_type: Value for the database_type metadata field
+    """
+    nodes = [[None, None]]
+    data = b""
+    for network, record in networks.items():
+        net = ipaddress.ip_network(network)
+        bits = int(net.network_address)
+        prefixlen = net.prefixlen
+        if net.version == 4:
+            prefixlen += 96
+        offset = len(data)
+        data += encode(record)
+        node = 0
+        for i in range(prefixlen):
+            bit = (bits >> (127 - i)) & 1
+            if i == prefixlen - 1:
+                nodes[node][bit] = ("data", offset)
+            elif nodes[node][bit] is None:
+                nodes.append([None, None])
+                nodes[node][bit] = ("node", len(nodes) - 1)
+                node = len(nodes) - 1
+            else:
+                node = nodes[node][bit][1]
+
+    node_count = len(nodes)
+
+    def record_value(rec):
+        if rec is None:
+            return node_count
+        kind, value = rec
+        return value if kind == "node" else node_count + 16 + value
+
+    tree = b"".join(struct.pack(">II", record_value(left), record_value(right)) for left, right in nodes)
+    metadata = {
+        "node_count": UInt32(node_count),
+        "record_size": UInt16(32),
+        "ip_version": UInt16(6),
+        "database_type": database_type,
+        "languages": ["en"],
+        "binary_format_major_version": UInt16(2),
+        "binary_format_minor_version": UInt16(0),
+        "build_epoch": UInt64(int(time.time())),
+        "description": {"en": "Test database"}
+    }
+    with open(path, "wb") as f:
+        f.write(tree + b"\x00" * 16 + data + METADATA_MARKER + encode(metadata))
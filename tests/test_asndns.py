@@ -0,0 +1,140 @@
+import asyncio
+import ipaddress
+import time
+import dns.asyncresolver
+import pytest
+from irtoolshed_mcp_server import asndns
+from irtoolshed_mcp_server import asnlookup as asnlookup_module
+from irtoolshed_mcp_server import resolver as resolver_module
+from irtoolshed_mcp_server.asnlookup import asnlookup, asnlookup_async, asnlookup_bulk, asnlookup_bulk_async
+
+@pytest.fixture
+def cymru_dns(dns_server, monkeypatch):
+    """Serve Team Cymru's DNS zones from the local stand-in and point the resolver at it"""
+    dns_server.add("8.8.8.8.origin.asn.cymru.com", "TXT",
+                   ['"15169 | 8.8.8.0/24 | US | arin | 2023-12-28"'])
+    dns_server.add("1.1.1.1.origin.asn.cymru.com", "TXT",
+                   ['"13335 | 1.1.1.0/24 | AU | apnic | 2011-08-11"'])
+    # Overlapping announcements: the most specific prefix wins
+    dns_server.add("1.0.0.8.origin.asn.cymru.com", "TXT",
+                   ['"3356 | 8.0.0.0/12 | US | arin | 1992-12-01"',
+                    '"64500 64501 | 8.0.0.0/24 | US | arin | 2020-01-01"'])
+    dns_server.add(asndns.origin_query_name(ipaddress.ip_address("2001:4860:4860::8888")),
+                   "TXT", ['"15169 | 2001:4860::/32 | US | arin | 2005-03-14"'])
+    dns_server.add("AS15169.asn.cymru.com", "TXT", ['"15169 | US | arin | 2000-03-30 | GOOGLE - Google LLC, US"'])
+    dns_server.add("AS13335.asn.cymru.com", "TXT", ['"13335 | US | arin | 2010-07-14 | CLOUDFLARENET, US"'])
+    dns_server.add("AS64500.asn.cymru.com", "TXT", ['"64500 | ZZ | iana | | IANA-RESERVED, ZZ"'])
+    resolver = dns.asyncresolver.Resolver(configure=False)
+    resolver.nameservers = [dns_server.host]
+    resolver.port = dns_server.port
+    monkeypatch.setattr(resolver_module, "_async_resolver", resolver)
+    asnlookup_module._asn_cache.clear()
+    yield dns_server
+    asnlookup_module._asn_cache.clear()
+
+def test_origin_query_name():
+    """Test Team Cymru query names for IPv4 and IPv6"""
+    assert asndns.origin_query_name(ipaddress.ip_address("8.8.4.4")) == "4.4.8.8.origin.asn.cymru.com"
+    assert asndns.origin_query_name(ipaddress.ip_address("2001:db8::1")) == (
+        "1.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.8.b.d.0.1.0.0.2.origin6.asn.cymru.com")
+
+def test_asnlookup_dns(cymru_dns):
+    """Test single lookup over DNS returns asnlookup's format"""
+    assert asnlookup("8.8.8.8", transport="dns") == {
+        "status": "success",
+        "ip_addr": "8.8.8.8",
+        "as_number": "15169",
+        "as_name": "GOOGLE - Google LLC, US"
+    }
+
+def test_asnlookup_dns_ipv6(cymru_dns):
+    """Test single IPv6 lookup over DNS"""
+    result = asnlookup("2001:4860:4860::8888", transport="dns")
+    assert result["as_number"] == "15169"
+
+def test_asnlookup_dns_most_specific(cymru_dns):
+    """Test that the most specific announced prefix and first origin AS are used"""
+    result = asnlookup("8.0.0.1", transport="dns")
+    assert result["as_number"] == "64500"
+    assert result["as_name"] == "IANA-RESERVED, ZZ"
+
+def test_asnlookup_dns_unrouted(cymru_dns):
+    """Test that NXDOMAIN from the origin zone means no ASN information"""
+    result = asnlookup("9.9.9.9", transport="dns")
+    assert result["status"] == "error"
+    assert result["error"] == "No ASN information found"
+
+def test_asnlookup_dns_from_env(cymru_dns, monkeypatch):
+    """Test that ASN_TRANSPORT selects the DNS backend"""
+    monkeypatch.setenv("ASN_TRANSPORT", "dns")
+    assert asnlookup("1.1.1.1")["as_name"] == "CLOUDFLARENET, US"
+    assert cymru_dns.count("1.1.1.1.origin.asn.cymru.com", "TXT") == 1
+
+def test_asnlookup_invalid_transport():
+    """Test ASN lookup with an unknown transport"""
+    result = asnlookup("8.8.8.8", transport="carrier-pigeon")
+    assert result["status"] == "error"
+    assert "Invalid ASN transport" in result["error"]
+
+def test_asnlookup_bulk_dns(cymru_dns):
+    """Test bulk lookups over DNS: input order, shared AS name queries and the prefix cache"""
+    result = asnlookup_bulk(["1.1.1.1", "8.8.8.8", "9.9.9.9", "8.8.8.8", "10.0.0.1"], transport="dns")
+    assert [r.get("as_number") for r in result["results"]] == ["13335", "15169", None, None]
+    assert result["summary"]["queried_online"] == 3
+    assert cymru_dns.count("AS15169.asn.cymru.com") == 1
+    again = asnlookup_bulk(["8.8.8.9", "1.1.1.2"], transport="dns")
+    assert again["summary"]["resolved"] == 2
+    assert again["summary"]["queried_online"] == 0
+
+def test_asnlookup_bulk_dns_timeout(cymru_dns, monkeypatch):
+    """Test that a query that never answers fails only its own address"""
+    monkeypatch.setattr(asndns, "ASN_DNS_TIMEOUT", 0.3)
+    cymru_dns.drop.add("4.4.8.8.origin.asn.cymru.com.")
+    result = asnlookup_bulk(["8.8.4.4", "8.8.8.8"], transport="dns")
+    assert result["results"][0]["status"] == "error"
+    assert result["results"][0]["query"] == "8.8.4.4"
+    assert result["results"][1]["as_number"] == "15169"
+
+def test_lookup_many_concurrency(cymru_dns):
+    """Test that queries run concurrently under the semaphore"""
+    for i in range(20):
+        name = f"{i}.0.0.192.origin.asn.cymru.com"
+        cymru_dns.add(name, "TXT", ['"64500 | 192.0.0.0/24 | ZZ | iana | "'])
+        cymru_dns.delays[name + "."] = 0.2
+    ips = [ipaddress.ip_address(f"192.0.0.{i}") for i in range(20)]
+    start = time.perf_counter()
+    results = asndns.lookup_many(ips, concurrency=10)
+    elapsed = time.perf_counter() - start
+    assert all(record.asn == "64500" for record in results.values())
+    assert 0.4 <= elapsed < 1.5
+
+def test_asnlookup_async_uses_shared_pool(cymru_dns, monkeypatch):
+    """Test that the async entry points query on the caller's loop through the shared nameserver pool"""
+    def no_thread(coro):
+        coro.close()
+        raise AssertionError("async lookups must not start their own event loop")
+    monkeypatch.setattr(asndns, "run_sync", no_thread)
+
+    async def lookups():
+        single = await asnlookup_async("8.8.8.8", transport="dns")
+        bulk = await asnlookup_bulk_async(["1.1.1.1", "8.8.8.9", "9.9.9.9"], transport="dns")
+        return single, bulk
+    single, bulk = asyncio.run(lookups())
+    assert single["as_name"] == "GOOGLE - Google LLC, US"
+    assert [r.get("as_number") for r in bulk["results"]] == ["13335", "15169", None]
+    assert bulk["summary"]["queried_online"] == 2
+    # 8.8.8.8 origin and AS name, then 1.1.1.1 origin and AS name and 9.9.9.9 origin
+    assert resolver_module.get_nameserver_pool().stats()["queries"] == 5
+
+def test_asnlookup_async_errors():
+    """Test that the async entry points report the same validation errors as the sync ones"""
+    assert asyncio.run(asnlookup_async("not-an-ip", transport="dns"))["error"] == "Invalid IP address format"
+    assert asyncio.run(asnlookup_async("10.0.0.1", transport="dns"))["error"] == "No ASN information found"
+    assert "Invalid ASN transport" in asyncio.run(asnlookup_async("8.8.8.8", transport="carrier-pigeon"))["error"]
+    assert asyncio.run(asnlookup_bulk_async([], transport="dns"))["error"] == "No IP addresses provided"
+
+def test_asnlookup_tools_are_async():
+    """Test that the MCP asnlookup tools are registered as coroutines"""
+    from irtoolshed_mcp_server.mcp_server import mcp
+    assert mcp._tool_manager.get_tool("asnlookup").is_async
+    assert mcp._tool_manager.get_tool("asnlookup_bulk").is_async
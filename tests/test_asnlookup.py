@@ -1,5 +1,13 @@
 import pytest
-from irtoolshed_mcp_server.asnlookup import asnlookup
+from irtoolshed_mcp_server import asnlookup as asnlookup_module
+from irtoolshed_mcp_server import asnoffline
+from irtoolshed_mcp_server import prefixcache
+from irtoolshed_mcp_server.asnlookup import asnlookup, asnlookup_bulk
+
+@pytest.fixture(autouse=True)
+def empty_asn_cache():
+    """Start every test with an empty announced-prefix cache"""
+    asnlookup_module._asn_cache.clear()
 
 def test_asnlookup_google_dns():
     """Test ASN lookup for Google's DNS server"""
@@ -52,4 +60,211 @@ def test_asnlookup_private_ipv6():
     result = asnlookup("fd00::1")
     assert result["status"] == "error"
     assert "No ASN information found" in result["error"]
-    assert result["query"] == "fd00::1" 
\ No newline at end of file
+    assert result["query"] == "fd00::1"
+
+@pytest.fixture
+def offline_dataset(tmp_path, monkeypatch):
+    """Point the offline ASN index at a small pfx2as file"""
+    path = tmp_path / "routeviews.pfx2as"
+    path.write_text("8.8.8.0\t24\t15169\tGOOGLE - Google LLC, US\n")
+    monkeypatch.setenv("ASN_OFFLINE_DB", str(path))
+    monkeypatch.setattr(asnoffline, "_offline_index", None)
+
+def test_asnlookup_offline(offline_dataset):
+    """Test ASN lookup answered from the offline dataset"""
+    result = asnlookup("8.8.8.8", mode="offline")
+    assert result == {
+        "status": "success",
+        "ip_addr": "8.8.8.8",
+        "as_number": "15169",
+        "as_name": "GOOGLE - Google LLC, US"
+    }
+
+def test_asnlookup_offline_not_covered(offline_dataset):
+    """Test offline-only lookup for an address not in the dataset"""
+    result = asnlookup("9.9.9.9", mode="offline")
+    assert result["status"] == "error"
+    assert "No ASN information found" in result["error"]
+    assert result["query"] == "9.9.9.9"
+
+def test_asnlookup_offline_mode_from_env(offline_dataset, monkeypatch):
+    """Test that ASN_LOOKUP_MODE selects the offline engine"""
+    monkeypatch.setenv("ASN_LOOKUP_MODE", "offline-first")
+    result = asnlookup("8.8.8.8")
+    assert result["status"] == "success"
+    assert result["as_number"] == "15169"
+
+
+def test_asnlookup_offline_missing_dataset(tmp_path, monkeypatch):
+    """Test offline-only lookup without a dataset"""
+    monkeypatch.setenv("ASN_OFFLINE_DB", str(tmp_path / "missing.pfx2as"))
+    monkeypatch.setattr(asnoffline, "_offline_index", None)
+    result = asnlookup("8.8.8.8", mode="offline")
+    assert result["status"] == "error"
+    assert "Offline ASN database not found" in result["error"]
+
+def test_asnlookup_invalid_mode():
+    """Test ASN lookup with an unknown mode"""
+    result = asnlookup("8.8.8.8", mode="sideways")
+    assert result["status"] == "error"
+    assert "Invalid ASN lookup mode" in result["error"]
+
+
+@pytest.fixture
+def fake_cymru(cymru_server, monkeypatch):
+    """Point Team Cymru lookups at the local fake whois server"""
+    monkeypatch.setattr(asnlookup_module, "CYMRU_WHOIS_HOST", cymru_server.host)
+    monkeypatch.setattr(asnlookup_module, "CYMRU_WHOIS_PORT", cymru_server.port)
+    monkeypatch.setattr(asnlookup_module, "_cymru_pool", None)
+    yield cymru_server
+    if asnlookup_module._cymru_pool is not None:
+        asnlookup_module._cymru_pool.close()
+
+def test_asnlookup_offline_first_fallback(offline_dataset, fake_cymru):
+    """Test that offline-first falls back to Team Cymru for uncovered addresses"""
+    result = asnlookup("1.1.1.1", mode="offline-first")
+    assert result["status"] == "success"
+    assert result["as_number"] == "13335"
+    assert fake_cymru.queries == 1
+
+def test_asnlookup_reuses_pooled_session(fake_cymru):
+    """Test that repeated single lookups share one warm Team Cymru session"""
+    for ip in ["8.8.8.8", "1.1.1.1", "2001:4860:4860::8888", "9.9.9.9"]:
+        asnlookup(ip)
+    assert fake_cymru.connections == 1
+    assert asnlookup_module.get_pool_stats()["reused"] == 3
+
+def test_asnlookup_not_routed(fake_cymru):
+    """Test single lookup of an address Team Cymru has no route for"""
+    result = asnlookup("9.9.9.9")
+    assert result["status"] == "error"
+    assert result["error"] == "No ASN information found"
+
+def test_asnlookup_bulk(fake_cymru):
+    """Test bulk ASN lookup results, order and summary"""
+    result = asnlookup_bulk(["1.1.1.1", "8.8.8.8", "1.1.1.1", "10.0.0.1", "bogus", "9.9.9.9"])
+    assert result["status"] == "success"
+    assert [r.get("ip_addr", r.get("query")) for r in result["results"]] == [
+        "1.1.1.1", "8.8.8.8", "10.0.0.1", "bogus", "9.9.9.9"]
+    assert result["results"][0] == {
+        "status": "success",
+        "ip_addr": "1.1.1.1",
+        "as_number": "13335",
+        "as_name": "CLOUDFLARENET, US"
+    }
+    assert result["results"][1]["as_number"] == "15169"
+    assert result["results"][2]["error"] == "No ASN information found"
+    assert result["results"][3]["error"] == "Invalid IP address format"
+    assert result["results"][4]["error"] == "No ASN information found"
+    assert result["summary"] == {
+        "total": 6,
+        "unique": 5,
+        "resolved": 2,
+        "invalid": 1,
+        "not_found": 2,
+        "queried_online": 3
+    }
+    assert fake_cymru.queries == 3
+
+def test_asnlookup_ipv6_spellings(fake_cymru):
+    """Test that uppercase and uncompressed IPv6 input matches Cymru's canonical echo"""
+    assert asnlookup("2001:4860:4860:0:0:0:0:8888")["as_number"] == "15169"
+    result = asnlookup_bulk(["2001:4860:0:0::1", "2001:4860:4860::8844".upper()])
+    assert [r["as_number"] for r in result["results"]] == ["15169", "15169"]
+    assert [r["ip_addr"] for r in result["results"]] == ["2001:4860:0:0::1", "2001:4860:4860::8844".upper()]
+
+def test_asnlookup_bulk_single_session(fake_cymru, monkeypatch):
+    """Test that a large chunked batch uses one connection"""
+    monkeypatch.setattr(asnlookup_module, "ASN_BULK_CHUNK_SIZE", 250)
+    monkeypatch.setenv("ASN_CACHE_TTL", "0")
+    ips = [f"8.{i // 256}.{i % 256}.1" for i in range(2000)]
+    result = asnlookup_bulk(ips + ["2001:4860:4860::8888"])
+    assert result["summary"]["resolved"] == 2001
+    assert result["results"][0]["as_number"] == "3356"
+    assert result["results"][-1]["as_number"] == "15169"
+    assert fake_cymru.connections == 1
+    assert fake_cymru.queries == 2001
+
+def test_asnlookup_bulk_string_input(fake_cymru):
+    """Test bulk ASN lookup with a comma/whitespace separated string"""
+    result = asnlookup_bulk("8.8.8.8, 1.1.1.1\n8.8.8.8")
+    assert result["summary"]["unique"] == 2
+
+def test_asnlookup_bulk_offline(offline_dataset, fake_cymru):
+    """Test that offline-first bulk lookups only send uncovered addresses to Team Cymru"""
+    result = asnlookup_bulk(["8.8.8.8", "1.1.1.1"], mode="offline-first")
+    assert result["results"][0]["as_name"] == "GOOGLE - Google LLC, US"
+    assert result["results"][1]["as_number"] == "13335"
+    assert fake_cymru.queries == 1
+
+def test_asnlookup_bulk_offline_only(offline_dataset, fake_cymru):
+    """Test offline-only bulk lookups never contact Team Cymru"""
+    result = asnlookup_bulk(["8.8.8.8", "1.1.1.1"], mode="offline")
+    assert result["summary"]["resolved"] == 1
+    assert fake_cymru.connections == 0
+
+def test_asnlookup_bulk_connection_failure(monkeypatch):
+    """Test that a failed Team Cymru session is reported on each pending address"""
+    monkeypatch.setattr(asnlookup_module, "CYMRU_WHOIS_HOST", "127.0.0.1")
+    monkeypatch.setattr(asnlookup_module, "CYMRU_WHOIS_PORT", 1)
+    monkeypatch.setattr(asnlookup_module, "_cymru_pool", None)
+    result = asnlookup_bulk(["8.8.8.8", "10.0.0.1"])
+    assert result["status"] == "success"
+    assert result["results"][0]["status"] == "error"
+    assert result["results"][0]["query"] == "8.8.8.8"
+    assert result["results"][1]["error"] == "No ASN information found"
+
+def test_asnlookup_bulk_empty():
+    """Test bulk ASN lookup without addresses"""
+    result = asnlookup_bulk([])
+    assert result["status"] == "error"
+    assert result["query"] == {"count": 0}
+
+def test_asnlookup_bulk_too_many(monkeypatch):
+    """Test bulk ASN lookup over the size limit"""
+    monkeypatch.setattr(asnlookup_module, "ASN_BULK_MAX_IPS", 2)
+    result = asnlookup_bulk(["8.8.8.8", "1.1.1.1", "9.9.9.9"])
+    assert result["status"] == "error"
+    assert "Too many IP addresses" in result["error"]
+
+def test_asnlookup_cache_by_prefix(fake_cymru):
+    """Test that addresses inside a returned prefix are answered locally"""
+    hits = asnlookup_module.get_cache_stats()["hits"]
+    assert asnlookup("8.8.8.8")["as_number"] == "15169"
+    assert asnlookup("8.8.8.200")["as_number"] == "15169"
+    assert asnlookup("8.1.1.1")["as_number"] == "3356"
+    assert asnlookup("8.15.0.1")["as_number"] == "3356"
+    assert fake_cymru.queries == 2
+    assert asnlookup_module.get_cache_stats()["hits"] == hits + 2
+
+def test_asnlookup_negative_cache(fake_cymru):
+    """Test that unrouted space is cached with the negative TTL"""
+    assert asnlookup("9.9.9.9")["error"] == "No ASN information found"
+    assert asnlookup("9.9.9.10")["error"] == "No ASN information found"
+    assert asnlookup("9.9.10.1")["error"] == "No ASN information found"
+    assert fake_cymru.queries == 2
+
+def test_asnlookup_cache_ttl(fake_cymru, monkeypatch):
+    """Test that cached answers expire after their TTL"""
+    now = [1000.0]
+    monkeypatch.setattr(prefixcache.time, "monotonic", lambda: now[0])
+    monkeypatch.setenv("ASN_CACHE_TTL", "60")
+    monkeypatch.setenv("ASN_NEGATIVE_CACHE_TTL", "10")
+    asnlookup("8.8.8.8")
+    asnlookup("9.9.9.9")
+    now[0] += 30
+    asnlookup("8.8.8.9")
+    asnlookup("9.9.9.10")
+    assert fake_cymru.queries == 3
+    now[0] += 60
+    asnlookup("8.8.8.10")
+    assert fake_cymru.queries == 4
+
+def test_asnlookup_bulk_uses_cache_across_chunks(fake_cymru, monkeypatch):
+    """Test that prefixes learned from one chunk answer the next"""
+    monkeypatch.setattr(asnlookup_module, "ASN_BULK_CHUNK_SIZE", 10)
+    asnlookup("1.1.1.1")
+    result = asnlookup_bulk([f"8.8.8.{i}" for i in range(1, 51)] + ["1.1.1.2"])
+    assert result["summary"]["resolved"] == 51
+    assert result["summary"]["queried_online"] == 10
+    assert fake_cymru.queries == 11
@@ -0,0 +1,67 @@
+import pytest
+import gzip
+from irtoolshed_mcp_server import asnoffline
+from irtoolshed_mcp_server.asnoffline import OfflineASNIndex, find_offline_database, get_offline_index
+from tests.mmdbwriter import write_mmdb
+
+PFX2AS = """\
+# prefix\tlength\tasn\tname
+8.8.8.0\t24\t15169\tGOOGLE - Google LLC, US
+8.0.0.0\t9\t3356
+1.1.1.0\t24\t13335_4200
+1.0.0.0\t24\t{13335,4200}
+2001:4860::\t32\t15169\tGOOGLE - Google LLC, US
+not a line
+999.1.1.0\t24\t1234
+"""
+
+def write_pfx2as(path, text=PFX2AS):
+    """Helper to write a pfx2as file, gzipped if the path ends in .gz"""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "wt") as f:
+        f.write(text)
+    return str(path)
+
+def test_offline_index_pfx2as(tmp_path):
+    """Test longest-prefix lookups from a pfx2as file"""
+    index = OfflineASNIndex(write_pfx2as(tmp_path / "routeviews.pfx2as"))
+    assert index.lookup("8.8.8.8") == ("15169", "GOOGLE - Google LLC, US")
+    assert index.lookup("8.8.4.4") == ("3356", "Unknown")
+    assert index.lookup("1.1.1.1") == ("13335", "Unknown")
+    assert index.lookup("1.0.0.1") == ("13335", "Unknown")
+    assert index.lookup("2001:4860:4860::8888") == ("15169", "GOOGLE - Google LLC, US")
+    assert index.lookup("9.9.9.9") is None
+
+def test_offline_index_pfx2as_gzip(tmp_path):
+    """Test loading a gzipped pfx2as file"""
+    index = OfflineASNIndex(write_pfx2as(tmp_path / "routeviews.pfx2as.gz"))
+    assert index.lookup("8.8.8.8")[0] == "15169"
+
+def test_offline_index_mmdb(tmp_path):
+    """Test lookups from a GeoLite2-ASN style database"""
+    path = str(tmp_path / "GeoLite2-ASN.mmdb")
+    write_mmdb(path, {
+        "8.8.8.0/24": {"autonomous_system_number": 15169, "autonomous_system_organization": "GOOGLE"},
+        "2606:4700::/32": {"autonomous_system_number": 13335}
+    }, database_type="GeoLite2-ASN")
+    index = OfflineASNIndex(path)
+    assert index.lookup("8.8.8.8") == ("15169", "GOOGLE")
+    assert index.lookup("2606:4700:4700::1111") == ("13335", "Unknown")
+    assert index.lookup("9.9.9.9") is None
+    index.close()
+
+def test_find_offline_database(tmp_path, monkeypatch):
+    """Test dataset discovery from the environment"""
+    path = write_pfx2as(tmp_path / "routeviews.pfx2as")
+    monkeypatch.setenv("ASN_OFFLINE_DB", path)
+    assert find_offline_database() == path
+    monkeypatch.setenv("ASN_OFFLINE_DB", str(tmp_path / "missing.pfx2as"))
+    assert find_offline_database() is None
+
+def test_get_offline_index_loads_once(tmp_path, monkeypatch):
+    """Test that the shared index is loaded on first use and reused"""
+    monkeypatch.setenv("ASN_OFFLINE_DB", write_pfx2as(tmp_path / "routeviews.pfx2as"))
+    monkeypatch.setattr(asnoffline, "_offline_index", None)
+    index = get_offline_index()
+    assert index.lookup("8.8.8.8")[0] == "15169"
+    assert get_offline_index() is index
@@ -0,0 +1,111 @@
+import threading
+import time
+import cymruwhois
+import pytest
+from irtoolshed_mcp_server.cymrupool import CymruClientPool
+
+@pytest.fixture
+def pool(cymru_server):
+    """A connection pool pointed at the local fake Team Cymru server"""
+    pool = CymruClientPool(cymru_server.host, cymru_server.port, maxsize=2, idle_timeout=60)
+    yield pool
+    pool.close()
+
+def test_pool_reuses_session(pool, cymru_server):
+    """Test that sequential lookups share one session"""
+    assert pool.lookup("8.8.8.8").asn == "15169"
+    assert pool.lookup("1.1.1.1").asn == "13335"
+    assert cymru_server.connections == 1
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["reused"] == 1
+    assert stats["idle"] == 1
+    assert stats["in_use"] == 0
+
+def test_pool_is_bounded(pool, cymru_server):
+    """Test that concurrent callers never open more than maxsize sessions"""
+    results = []
+    def worker():
+        for _ in range(20):
+            results.append(pool.lookup("8.8.8.8").asn)
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["15169"] * 160
+    assert cymru_server.connections <= 2
+    assert pool.stats()["open"] <= 2
+
+def test_pool_health_check_discards_dropped_session(pool, cymru_server):
+    """Test that a session closed by the server is replaced before use"""
+    pool.lookup("8.8.8.8")
+    cymru_server.drop_connections()
+    time.sleep(0.05)
+    assert pool.lookup("1.1.1.1").asn == "13335"
+    stats = pool.stats()
+    assert stats["discarded"] == 1
+    assert stats["retries"] == 0
+    assert cymru_server.connections == 2
+
+def test_pool_reconnects_on_failure(pool, cymru_server, monkeypatch):
+    """Test that a failing reused session is retried once on a new connection"""
+    pool.lookup("8.8.8.8")
+    monkeypatch.setattr(pool, "_is_healthy", lambda client: True)
+    cymru_server.drop_connections()
+    time.sleep(0.05)
+    assert pool.lookup("1.1.1.1").asn == "13335"
+    assert pool.stats()["retries"] == 1
+    assert pool.stats()["open"] == 1
+
+def test_pool_reaps_idle_sessions(cymru_server):
+    """Test that sessions idle past idle_timeout are closed"""
+    pool = CymruClientPool(cymru_server.host, cymru_server.port, idle_timeout=0.05)
+    pool.lookup("8.8.8.8")
+    time.sleep(0.1)
+    pool.reap()
+    assert pool.stats()["open"] == 0
+    assert pool.stats()["reaped"] == 1
+    pool.close()
+
+def test_pool_wait_timeout(cymru_server):
+    """Test that callers give up when every session stays busy"""
+    pool = CymruClientPool(cymru_server.host, cymru_server.port, maxsize=1, wait_timeout=0.1)
+    release = threading.Event()
+    holder = threading.Thread(target=pool.call, args=(lambda client: release.wait(5),))
+    holder.start()
+    time.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        pool.lookup("8.8.8.8")
+    release.set()
+    holder.join()
+    pool.close()
+
+def test_pool_connection_refused():
+    """Test that a failed connect frees its slot and raises"""
+    pool = CymruClientPool("127.0.0.1", 1, maxsize=1)
+    with pytest.raises(OSError):
+        pool.lookup("8.8.8.8")
+    assert pool.stats()["open"] == 0
+
+def _percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def test_pool_latency_against_stand_in(pool, cymru_server):
+    """Measure p50/p99 single-lookup latency with and without the pool (run with -s to see it)"""
+    unpooled = []
+    for _ in range(50):
+        start = time.perf_counter()
+        client = cymruwhois.Client(cymru_server.host, cymru_server.port, memcache_host=None)
+        client.lookup("8.8.8.8")
+        client.disconnect()
+        unpooled.append(time.perf_counter() - start)
+    pooled = []
+    for _ in range(50):
+        start = time.perf_counter()
+        pool.lookup("8.8.8.8")
+        pooled.append(time.perf_counter() - start)
+    print(f"\nunpooled p50={_percentile(unpooled, 50) * 1000:.2f}ms p99={_percentile(unpooled, 99) * 1000:.2f}ms"
+          f"\npooled   p50={_percentile(pooled, 50) * 1000:.2f}ms p99={_percentile(pooled, 99) * 1000:.2f}ms")
+    assert cymru_server.connections == 51
@@ -1,7 +1,11 @@
 import pytest
-from irtoolshed_mcp_server.dnslookup import dnslookup
+from irtoolshed_mcp_server.dnslookup import dnslookup, dnslookup_async
+from irtoolshed_mcp_server import resolver as resolver_module
 import re
 import ipaddress
+import time
+import asyncio
+import dns.resolver
 
 def is_valid_ipv6(address):
     """Helper function to validate IPv6 address format"""
@@ -95,4 +99,265 @@ def test_dnslookup_no_records():
     result = dnslookup("google.com", "PTR")
     assert result["status"] == "error"
     assert "No PTR records found for google.com" in result["error"]
-    assert result["query"] == {"domain": "google.com", "record_type": "PTR"} 
\ No newline at end of file
+    assert result["query"] == {"domain": "google.com", "record_type": "PTR"} 
+
+@pytest.fixture
+def local_dns(local_resolver):
+    """The local DNS stand-in with a few example.test records"""
+    local_resolver.add("www.example.test", "A", ["192.0.2.10", "192.0.2.11"], ttl=300)
+    local_resolver.add("example.test", "MX", ["10 mail.example.test.", "20 backup.example.test."], ttl=300)
+    return local_resolver
+
+def test_dnslookup_local_a_record(local_dns):
+    """Test A record lookup against the local stand-in"""
+    result = dnslookup("www.example.test", "A")
+    result["records"].sort()
+    assert result == {
+        "status": "success",
+        "domain": "www.example.test",
+        "record_type": "A",
+        "records": ["192.0.2.10", "192.0.2.11"]
+    }
+
+def test_dnslookup_local_mx_record(local_dns):
+    """Test MX record formatting against the local stand-in"""
+    result = dnslookup("example.test", "MX")
+    assert sorted(result["records"], key=lambda r: r["preference"]) == [
+        {"preference": 10, "exchange": "mail.example.test."},
+        {"preference": 20, "exchange": "backup.example.test."}
+    ]
+
+def test_dnslookup_answer_cache(local_dns):
+    """Test that a repeated lookup is answered from the shared cache"""
+    first = dnslookup("www.example.test", "A")
+    hits = resolver_module.get_cache_stats()["hits"]
+    start = time.perf_counter()
+    second = dnslookup("www.example.test", "A")
+    elapsed = time.perf_counter() - start
+    assert second == first
+    assert local_dns.count("www.example.test", "A") == 1
+    assert resolver_module.get_cache_stats()["hits"] == hits + 1
+    assert elapsed < 0.05
+
+def test_dnslookup_answer_cache_honors_ttl(local_dns, monkeypatch):
+    """Test that cached answers expire with their record TTL"""
+    now = [time.time()]
+    monkeypatch.setattr(dns.resolver.time, "time", lambda: now[0])
+    local_dns.add("short.example.test", "A", ["192.0.2.20"], ttl=30)
+    dnslookup("short.example.test", "A")
+    now[0] += 20
+    dnslookup("short.example.test", "A")
+    assert local_dns.count("short.example.test", "A") == 1
+    now[0] += 20
+    dnslookup("short.example.test", "A")
+    assert local_dns.count("short.example.test", "A") == 2
+
+def test_dnslookup_negative_cache_nxdomain(local_dns, monkeypatch):
+    """Test that NXDOMAIN is cached for the SOA minimum TTL with an identical error"""
+    now = [time.time()]
+    monkeypatch.setattr(dns.resolver.time, "time", lambda: now[0])
+    monkeypatch.setattr(resolver_module.time, "time", lambda: now[0])
+    local_dns.soa_minimum = 60
+    first = dnslookup("missing.example.test", "A")
+    now[0] += 30
+    second = dnslookup("missing.example.test", "A")
+    assert first == second == {
+        "status": "error",
+        "error": "Domain missing.example.test does not exist",
+        "query": {"domain": "missing.example.test", "record_type": "A"}
+    }
+    assert local_dns.count("missing.example.test") == 1
+    now[0] += 40
+    dnslookup("missing.example.test", "A")
+    assert local_dns.count("missing.example.test") == 2
+
+def test_dnslookup_negative_cache_noanswer(local_dns):
+    """Test that NoAnswer is cached with an identical error"""
+    first = dnslookup("www.example.test", "TXT")
+    second = dnslookup("www.example.test", "TXT")
+    assert first == second == {
+        "status": "error",
+        "error": "No TXT records found for www.example.test",
+        "query": {"domain": "www.example.test", "record_type": "TXT"}
+    }
+    assert local_dns.count("www.example.test", "TXT") == 1
+
+def test_dnslookup_negative_cache_cap(local_dns, monkeypatch):
+    """Test that the cap shortens a long SOA minimum"""
+    now = [time.time()]
+    monkeypatch.setattr(dns.resolver.time, "time", lambda: now[0])
+    monkeypatch.setattr(resolver_module.time, "time", lambda: now[0])
+    monkeypatch.setattr(resolver_module._cache, "negative_ttl_cap", 100)
+    local_dns.soa_minimum = 86400
+    dnslookup("missing.example.test", "A")
+    now[0] += 150
+    dnslookup("missing.example.test", "A")
+    assert local_dns.count("missing.example.test") == 2
+
+def test_dnslookup_negative_cache_servfail(local_dns):
+    """Test that a server failure is remembered briefly with an identical error"""
+    local_dns.servfail.add("broken.example.test.")
+    first = dnslookup("broken.example.test", "A")
+    second = dnslookup("broken.example.test", "A")
+    assert first == second == {
+        "status": "error",
+        "error": "No nameservers available for broken.example.test",
+        "query": {"domain": "broken.example.test", "record_type": "A"}
+    }
+    assert local_dns.count("broken.example.test") == 1
+
+def test_dnslookup_async_matches_sync(local_dns):
+    """Test that the async lookup returns the same result as the sync one"""
+    result = asyncio.run(dnslookup_async("www.example.test", "A"))
+    result["records"].sort()
+    expected = dnslookup("www.example.test", "A")
+    expected["records"].sort()
+    assert result == expected
+    missing = asyncio.run(dnslookup_async("missing.example.test", "A"))
+    assert missing["error"] == "Domain missing.example.test does not exist"
+
+def test_dnslookup_async_interleaves(local_dns):
+    """Test that slow lookups run concurrently instead of one after another"""
+    names = [f"slow{i}.example.test" for i in range(20)]
+    for name in names:
+        local_dns.add(name, "A", ["192.0.2.30"])
+        local_dns.delays[name + "."] = 0.2
+
+    async def lookup_all():
+        return await asyncio.gather(*(dnslookup_async(name, "A") for name in names))
+
+    start = time.perf_counter()
+    results = asyncio.run(lookup_all())
+    elapsed = time.perf_counter() - start
+    assert [r["status"] for r in results] == ["success"] * 20
+    # Serially this would take 4 seconds
+    assert elapsed < 1.5
+
+def test_dnslookup_async_lifetime(local_dns):
+    """Test that lifetime bounds a query to an unresponsive server"""
+    local_dns.drop.add("dropped.example.test.")
+    start = time.perf_counter()
+    result = asyncio.run(dnslookup_async("dropped.example.test", "A", timeout=0.2, lifetime=0.5))
+    assert time.perf_counter() - start < 2
+    assert result == {
+        "status": "error",
+        "error": "DNS query timed out",
+        "query": {"domain": "dropped.example.test", "record_type": "A"}
+    }
+
+def test_dnslookup_invalid_timeout():
+    """Test that out-of-range timeout and lifetime values are rejected"""
+    result = dnslookup("example.test", "A", timeout=0)
+    assert result["status"] == "error"
+    assert "Invalid timeout" in result["error"]
+    result = asyncio.run(dnslookup_async("example.test", "A", lifetime=600))
+    assert result["status"] == "error"
+    assert "Invalid lifetime" in result["error"]
+
+def test_dnslookup_tool_is_async():
+    """Test that the MCP dnslookup tool is registered as a coroutine"""
+    from irtoolshed_mcp_server.mcp_server import mcp
+    tool = mcp._tool_manager.get_tool("dnslookup")
+    assert tool.is_async
+    assert {"timeout", "lifetime"} <= set(tool.parameters["properties"])
+
+def test_dnslookup_all_local(local_dns):
+    """Test that dnslookup_all merges per-type results"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_all
+    result = asyncio.run(dnslookup_all("example.test", ["mx", "A", "MX"]))
+    assert result["status"] == "success"
+    assert result["record_types"] == ["MX", "A"]
+    assert result["results"]["MX"]["status"] == "success"
+    assert len(result["results"]["MX"]["records"]) == 2
+    assert result["results"]["A"] == {"status": "error", "error": "No A records found for example.test"}
+
+def test_dnslookup_all_default_types(local_dns):
+    """Test that every supported type is queried by default"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_all, valid_types
+    result = asyncio.run(dnslookup_all("www.example.test"))
+    assert set(result["results"]) == set(valid_types)
+    assert result["results"]["A"]["status"] == "success"
+
+def test_dnslookup_all_concurrent(local_dns):
+    """Test that latency is bounded by the slowest query, not the sum"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_all, valid_types
+    local_dns.delays["www.example.test."] = 0.3
+    start = time.perf_counter()
+    result = asyncio.run(dnslookup_all("www.example.test"))
+    elapsed = time.perf_counter() - start
+    assert result["status"] == "success"
+    # One query after another would take 8 x 0.3 seconds
+    assert elapsed < 1.2
+
+def test_dnslookup_all_nxdomain(local_dns):
+    """Test that a missing domain reports the shared error"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_all
+    result = asyncio.run(dnslookup_all("missing.example.test", ["A", "MX"]))
+    assert result["status"] == "error"
+    assert result["error"] == "Domain missing.example.test does not exist"
+    assert result["results"]["MX"]["status"] == "error"
+
+def test_dnslookup_all_invalid_type():
+    """Test that an invalid record type fails the whole call"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_all
+    result = asyncio.run(dnslookup_all("example.test", ["A", "BOGUS"]))
+    assert result["status"] == "error"
+    assert "Invalid record type" in result["error"]
+    assert result["query"] == {"domain": "example.test", "record_types": ["A", "BOGUS"]}
+
+def test_dnslookup_bulk_normalizes_and_dedupes(local_dns):
+    """Test that bulk input is normalized, deduplicated and kept in input order"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_bulk
+    result = asyncio.run(dnslookup_bulk(
+        [" WWW.Example.Test. ", "missing.example.test", "www.example.test", ""]))
+    assert result["status"] == "success"
+    assert [r["status"] for r in result["results"]] == ["success", "error"]
+    assert result["results"][0]["domain"] == "www.example.test"
+    assert result["results"][1]["error"] == "Domain missing.example.test does not exist"
+    assert result["summary"] == {"total": 3, "unique": 2, "resolved": 1, "not_found": 1, "timed_out": 0}
+    assert local_dns.count("www.example.test", "A") == 1
+
+def test_dnslookup_bulk_concurrency_limit(local_dns):
+    """Test that no more than `concurrency` queries are in flight"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_bulk
+    names = [f"bulk{i}.example.test" for i in range(12)]
+    for name in names:
+        local_dns.add(name, "A", ["192.0.2.40"])
+        local_dns.delays[name + "."] = 0.2
+    start = time.perf_counter()
+    result = asyncio.run(dnslookup_bulk(names, concurrency=4))
+    elapsed = time.perf_counter() - start
+    assert result["summary"]["resolved"] == 12
+    # Three waves of four queries
+    assert 0.55 < elapsed < 2
+
+def test_dnslookup_bulk_deadline(local_dns):
+    """Test that a dropped query times out without holding up the rest"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_bulk
+    local_dns.drop.add("dropped.example.test.")
+    result = asyncio.run(dnslookup_bulk(["dropped.example.test", "www.example.test"], lifetime=0.5))
+    assert result["results"][0]["error"] == "DNS query timed out"
+    assert result["results"][1]["status"] == "success"
+    assert result["summary"]["timed_out"] == 1
+
+def test_dnslookup_bulk_throughput(local_dns):
+    """Test that bulk lookups sustain thousands of queries per minute"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_bulk
+    names = [f"host{i}.example.test" for i in range(2000)]
+    for name in names[::2]:
+        local_dns.add(name, "A", ["192.0.2.50"])
+    start = time.perf_counter()
+    result = asyncio.run(dnslookup_bulk(names))
+    elapsed = time.perf_counter() - start
+    assert result["summary"]["unique"] == 2000
+    assert result["summary"]["resolved"] == 1000
+    assert result["summary"]["not_found"] == 1000
+    # 2000 queries well inside a minute
+    assert elapsed < 20
+
+def test_dnslookup_bulk_invalid_input():
+    """Test bulk input validation"""
+    from irtoolshed_mcp_server.dnslookup import dnslookup_bulk
+    assert asyncio.run(dnslookup_bulk([]))["error"] == "No domains provided"
+    assert "Invalid record type" in asyncio.run(dnslookup_bulk(["example.test"], "BOGUS"))["error"]
+    assert "Invalid concurrency" in asyncio.run(dnslookup_bulk(["example.test"], concurrency=0))["error"]
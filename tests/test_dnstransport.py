@@ -0,0 +1,114 @@
+import asyncio
+import ssl
+import time
+import dns.asyncresolver
+import dns.resolver
+import pytest
+from irtoolshed_mcp_server import resolver as resolver_module
+from irtoolshed_mcp_server.dnslookup import dnslookup_async
+from irtoolshed_mcp_server.dnstransport import DNSTransport, create_transport
+from irtoolshed_mcp_server.nameserverpool import NameserverPool
+
+@pytest.fixture
+def records(dns_server):
+    dns_server.add("www.example.test", "A", ["192.0.2.10", "192.0.2.11"])
+    dns_server.add("big.example.test", "TXT", ['"%02d%s"' % (i, "x" * 200) for i in range(20)])
+    return dns_server
+
+def resolve_many(transport, address, names, rdtype="A"):
+    """Resolve names concurrently in one event loop; returns answers or exceptions"""
+    async def run():
+        return await asyncio.gather(*(transport.resolve(address, name, rdtype) for name in names),
+                                    return_exceptions=True)
+    return asyncio.run(run())
+
+def test_tcp_connection_reused_and_pipelined(records):
+    """Test that concurrent queries share one pipelined TCP connection"""
+    transport = DNSTransport("tcp", port=records.port)
+    answers = resolve_many(transport, records.host, ["www.example.test"] * 50)
+    assert all(sorted(str(r) for r in answer) == ["192.0.2.10", "192.0.2.11"] for answer in answers)
+    assert records.tcp_connections == 1
+    stats = transport.stats()["connections"][0]
+    assert stats["connects"] == 1
+    assert stats["queries"] == 50
+
+def test_tcp_large_answer(records):
+    """Test that a large TXT answer arrives intact over TCP"""
+    transport = DNSTransport("tcp", port=records.port)
+    answer, = resolve_many(transport, records.host, ["big.example.test"], "TXT")
+    assert len(answer) == 20
+
+def test_tcp_negative_answers(records):
+    """Test that NXDOMAIN, NoAnswer and SERVFAIL raise dnspython's exceptions"""
+    records.servfail.add("broken.example.test.")
+    transport = DNSTransport("tcp", port=records.port)
+    nxdomain, noanswer, servfail = resolve_many(
+        transport, records.host, ["missing.example.test", "www.example.test", "broken.example.test"], "MX")
+    assert isinstance(nxdomain, dns.resolver.NXDOMAIN)
+    assert isinstance(noanswer, dns.resolver.NoAnswer)
+    assert isinstance(servfail, dns.resolver.NoNameservers)
+
+def test_tcp_idle_timeout(records):
+    """Test that an idle connection is closed and reopened by the next query"""
+    transport = DNSTransport("tcp", port=records.port, idle_timeout=0.1)
+    async def run():
+        await transport.resolve(records.host, "www.example.test", "A")
+        await asyncio.sleep(0.3)
+        assert not transport.connection(records.host).is_open
+        await transport.resolve(records.host, "www.example.test", "A")
+    asyncio.run(run())
+    assert transport.connection(records.host).connects == 2
+
+def test_tcp_reconnects_after_server_close(records):
+    """Test that a connection closed by the server is replaced transparently"""
+    records.tcp_max_queries = 2
+    transport = DNSTransport("tcp", port=records.port)
+    async def run():
+        for _ in range(5):
+            answer = await transport.resolve(records.host, "www.example.test", "A")
+            assert len(answer) == 2
+            await asyncio.sleep(0.05)
+    asyncio.run(run())
+    assert transport.connection(records.host).connects == 3
+
+def test_tcp_connection_refused():
+    """Test that an unreachable server raises NoNameservers"""
+    transport = DNSTransport("tcp", port=1)
+    result, = resolve_many(transport, "127.0.0.1", ["www.example.test"])
+    assert isinstance(result, dns.resolver.NoNameservers)
+
+def test_tls_transport(dns_tls_server, tls_certificate):
+    """Test DNS-over-TLS with certificate verification"""
+    dns_tls_server.add("www.example.test", "A", ["192.0.2.10"])
+    context = ssl.create_default_context(cafile=str(tls_certificate[0]))
+    transport = DNSTransport("tls", port=dns_tls_server.tls_port, ssl_context=context, server_hostname="dns.test")
+    answers = resolve_many(transport, dns_tls_server.host, ["www.example.test"] * 10)
+    assert all([str(r) for r in answer] == ["192.0.2.10"] for answer in answers)
+    assert transport.connection(dns_tls_server.host).connects == 1
+
+def test_tls_rejects_untrusted_certificate(dns_tls_server):
+    """Test that a certificate not signed by a trusted CA fails the query"""
+    transport = DNSTransport("tls", port=dns_tls_server.tls_port, server_hostname="dns.test")
+    result, = resolve_many(transport, dns_tls_server.host, ["www.example.test"])
+    assert isinstance(result, dns.resolver.NoNameservers)
+
+def test_dnslookup_tcp_transport_matches_udp(local_resolver, monkeypatch):
+    """Test that dnslookup's result format does not depend on the transport"""
+    local_resolver.add("www.example.test", "A", ["192.0.2.10"])
+    udp = asyncio.run(dnslookup_async("www.example.test", "A"))
+    missing_udp = asyncio.run(dnslookup_async("missing.example.test", "A"))
+    resolver_module.flush_cache()
+    monkeypatch.setenv("DNS_TRANSPORT", "tcp")
+    monkeypatch.setattr(resolver_module, "_nameserver_pool", None)
+    assert asyncio.run(dnslookup_async("www.example.test", "A")) == udp
+    assert asyncio.run(dnslookup_async("missing.example.test", "A")) == missing_udp
+    assert local_resolver.tcp_connections == 2
+    assert resolver_module.get_nameserver_stats()["transport"]["transport"] == "tcp"
+
+def test_create_transport():
+    """Test transport selection"""
+    assert create_transport("udp") is None
+    assert create_transport("TCP", tcp_port=5353).port == 5353
+    assert create_transport("tls").port == 853
+    with pytest.raises(ValueError):
+        create_transport("doh")
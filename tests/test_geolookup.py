@@ -1,5 +1,25 @@
 import pytest
-from irtoolshed_mcp_server.geolookup import geolookup, has_geoip_database
+import geoip2.database
+import geoip2.errors
+import geoip2.models
+import gc
+import hashlib
+import io
+import json
+import maxminddb
+import tarfile
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from irtoolshed_mcp_server import geolookup as geolookup_module
+from irtoolshed_mcp_server.prefixcache import PrefixCache
+from irtoolshed_mcp_server.geolookup import (
+    geolookup, geolookup_bulk, has_geoip_database, download_database, GeoIPReaderManager,
+    GeoIPDatabaseRefresher,
+    GEOLOOKUP_BULK_MAX_IPS
+)
+from tests.mmdbwriter import write_mmdb
 import os
 
 def has_geoip_database():
@@ -123,4 +143,483 @@ def test_geolookup_invalid_license():
     result = geolookup("8.8.8.8", license_key="invalid_key")
     assert result["status"] == "error"
     assert "Invalid license key" in result["error"]
-    assert result["query"]["ip"] == "8.8.8.8" 
\ No newline at end of file
+    assert result["query"]["ip"] == "8.8.8.8"
+
+class FakeReader:
+    """Stand-in for geoip2.database.Reader that serves one fixed City record"""
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.closed = False
+        self.lookups = 0
+
+    def city(self, ip_addr):
+        self.lookups += 1
+        if ip_addr == "5.5.5.5":
+            raise geoip2.errors.AddressNotFoundError("not found")
+        return geoip2.models.City(
+            ["en"],
+            country={"iso_code": "US", "names": {"en": "United States"}},
+            city={"names": {"en": "Mountain View"}},
+            location={"latitude": 37.4, "longitude": -122.1, "time_zone": "America/Los_Angeles"},
+            traits={"ip_address": ip_addr, "prefix_len": 24, "autonomous_system_number": 15169},
+        )
+
+    def close(self):
+        self.closed = True
+
+def make_fake_manager(**kwargs):
+    """Helper returning a GeoIPReaderManager that opens FakeReaders, and the list of readers it opened"""
+    opened = []
+    def opener(path, mode):
+        opened.append(FakeReader(path, mode))
+        return opened[-1]
+    return GeoIPReaderManager(opener=opener, **kwargs), opened
+
+def install_fake_manager(tmp_path, monkeypatch):
+    """Helper to point geolookup at a fake database with an empty result cache"""
+    db = tmp_path / "GeoLite2-City.mmdb"
+    db.write_text("v1")
+    manager, opened = make_fake_manager()
+    with manager.reader(str(db)):
+        pass
+    monkeypatch.setattr(geolookup_module, "_reader_manager", manager)
+    monkeypatch.setattr(geolookup_module, "_result_cache", PrefixCache(16))
+    return opened
+
+def replace_file(path, content):
+    """Helper to atomically replace a file the way a database update would"""
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+def test_reader_manager_opens_database_once(tmp_path):
+    """Test that repeated lookups share one reader"""
+    db = tmp_path / "GeoLite2-City.mmdb"
+    db.write_text("v1")
+    manager, opened = make_fake_manager(check_interval=0)
+    for _ in range(5):
+        with manager.reader(str(db)) as reader:
+            reader.city("8.8.8.8")
+    assert len(opened) == 1
+    assert opened[0].lookups == 5
+    assert manager.path == str(db)
+
+def test_reader_manager_swaps_changed_database(tmp_path):
+    """Test that a replaced database file is swapped in and the old reader closed after in-flight lookups"""
+    db = tmp_path / "GeoLite2-City.mmdb"
+    db.write_text("v1")
+    manager, opened = make_fake_manager(check_interval=0)
+    with manager.reader(str(db)) as old_reader:
+        replace_file(db, "version 2")
+        with manager.reader(str(db)) as new_reader:
+            assert new_reader is not old_reader
+        # The old reader is still in use by the outer block
+        assert not old_reader.closed
+    assert old_reader.closed
+    assert not new_reader.closed
+    assert manager.reloads == 2
+
+def test_reader_manager_check_interval(tmp_path):
+    """Test that the file is not re-checked until the check interval has passed"""
+    db = tmp_path / "GeoLite2-City.mmdb"
+    db.write_text("v1")
+    manager, opened = make_fake_manager(check_interval=3600)
+    with manager.reader(str(db)):
+        pass
+    replace_file(db, "version 2")
+    with manager.reader(str(db)):
+        pass
+    assert len(opened) == 1
+    manager.reload()
+    with manager.reader(str(db)):
+        pass
+    assert len(opened) == 2
+    assert opened[0].closed
+
+def test_reader_manager_keeps_reader_on_corrupt_database(tmp_path):
+    """Test that a replaced database which cannot be opened leaves the current reader in use"""
+    db = tmp_path / "GeoLite2-City.mmdb"
+    db.write_text("v1")
+    opened = []
+    def opener(path, mode):
+        with open(path) as f:
+            if f.read() == "corrupt":
+                raise maxminddb.InvalidDatabaseError("corrupt db")
+        opened.append(FakeReader(path, mode))
+        return opened[-1]
+    manager = GeoIPReaderManager(opener=opener, check_interval=3600)
+    with manager.reader(str(db)) as reader:
+        assert reader.city("8.8.8.8").city.name == "Mountain View"
+    replace_file(db, "corrupt")
+    manager.reload()
+    for _ in range(3):
+        with manager.reader(str(db)) as reader:
+            assert reader is opened[0]
+            assert reader.city("8.8.8.8").city.name == "Mountain View"
+    assert not opened[0].closed
+    assert manager.reloads == 1
+
+    # A good file is picked up at the next check
+    replace_file(db, "version 2")
+    manager.reload()
+    with manager.reader(str(db)) as reader:
+        assert reader is opened[1]
+    assert opened[0].closed
+
+def test_reader_manager_corrupt_database_without_reader(tmp_path):
+    """Test that a corrupt database raises when there is no reader to fall back to"""
+    db = tmp_path / "GeoLite2-City.mmdb"
+    db.write_text("corrupt")
+    def opener(path, mode):
+        raise maxminddb.InvalidDatabaseError("corrupt db")
+    with pytest.raises(maxminddb.InvalidDatabaseError):
+        with GeoIPReaderManager(opener=opener).reader(str(db)):
+            pass
+
+def test_reader_manager_missing_database(tmp_path):
+    """Test that a missing database raises FileNotFoundError"""
+    manager, _ = make_fake_manager()
+    with pytest.raises(FileNotFoundError):
+        with manager.reader(str(tmp_path / "missing.mmdb")):
+            pass
+
+def test_reader_manager_mode(monkeypatch):
+    """Test reader mode selection from argument and environment"""
+    monkeypatch.setenv("GEOIP_READER_MODE", "memory")
+    assert GeoIPReaderManager().mode == "memory"
+    assert GeoIPReaderManager(mode="mmap").mode == "mmap"
+    with pytest.raises(ValueError):
+        GeoIPReaderManager(mode="bogus")
+
+def test_geolookup_uses_shared_reader(tmp_path, monkeypatch):
+    """Test that geolookup answers from the shared reader without reopening the database"""
+    opened = install_fake_manager(tmp_path, monkeypatch)
+
+    result = geolookup("8.8.8.8")
+    assert result["status"] == "success"
+    assert result["country"] == "United States"
+    assert result["city"] == "Mountain View"
+    assert result["asn"] == 15169
+    assert result["raw_output"]["traits"]["network"] == "8.8.8.0/24"
+
+    result = geolookup("5.5.5.5")
+    assert result["status"] == "error"
+    assert "IP address not found in the database" in result["error"]
+    assert len(opened) == 1
+
+def test_geolookup_bulk(tmp_path, monkeypatch):
+    """Test bulk geolocation with duplicates, private, invalid and unknown addresses"""
+    opened = install_fake_manager(tmp_path, monkeypatch)
+
+    result = geolookup_bulk(["8.8.8.8", " 8.8.8.8", "8.8.8.9", "10.0.0.1", "fd00::1",
+                             "not-an-ip", "5.5.5.5"])
+    assert result["status"] == "success"
+    results = result["results"]
+    assert results["8.8.8.8"]["country"] == "US"
+    assert results["8.8.8.8"]["network"] == "8.8.8.0/24"
+    assert "raw_output" not in results["8.8.8.8"]
+    # Addresses in the same network share one record
+    assert results["8.8.8.8"] is results["8.8.8.9"]
+    assert results["10.0.0.1"]["status"] == "skipped"
+    assert results["fd00::1"]["status"] == "skipped"
+    assert results["not-an-ip"]["error"] == "Invalid IP address format"
+    assert results["5.5.5.5"]["error"] == "IP address not found in the database"
+    assert result["summary"] == {
+        "total": 7,
+        "unique": 6,
+        "resolved": 2,
+        "not_found": 1,
+        "skipped": 2,
+        "invalid": 1,
+        "networks": 1,
+        "countries": {"US": 2}
+    }
+    # Private addresses never reach the database, and 8.8.8.9 is answered from the network cache
+    assert opened[0].lookups == 2
+
+def test_geolookup_bulk_string_input(monkeypatch):
+    """Test bulk geolocation with a comma/whitespace separated string of private addresses"""
+    result = geolookup_bulk("10.0.0.1, 192.168.1.1\n172.16.0.1")
+    assert result["status"] == "success"
+    assert result["summary"]["skipped"] == 3
+
+def test_geolookup_bulk_too_many():
+    """Test bulk geolocation rejects oversized batches"""
+    result = geolookup_bulk(["8.8.8.8"] * (GEOLOOKUP_BULK_MAX_IPS + 1))
+    assert result["status"] == "error"
+    assert "Too many IP addresses" in result["error"]
+    assert result["query"]["count"] == GEOLOOKUP_BULK_MAX_IPS + 1
+
+def test_geolookup_network_cache(tmp_path, monkeypatch):
+    """Test that addresses in an already seen network are answered from the cache"""
+    opened = install_fake_manager(tmp_path, monkeypatch)
+
+    first = geolookup("8.8.8.8")
+    second = geolookup("8.8.8.200")
+    assert opened[0].lookups == 1
+    assert second["ip_addr"] == "8.8.8.200"
+    assert second["raw_output"]["traits"]["ip_address"] == "8.8.8.200"
+    assert first["raw_output"]["traits"]["ip_address"] == "8.8.8.8"
+    assert second["country"] == first["country"]
+
+    # A different network goes to the database
+    geolookup("8.8.4.4")
+    assert opened[0].lookups == 2
+    stats = geolookup_module.get_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["size"] == 2
+
+def test_geolookup_bulk_dedupes_address_spellings(tmp_path, monkeypatch):
+    """Test that different spellings of one address are looked up and counted once"""
+    install_fake_manager(tmp_path, monkeypatch)
+    result = geolookup_bulk(["2001:4860::1", "2001:4860:0::1".upper(), "2001:4860:0:0:0:0:0:1", "fd00::1", "FD00::1"])
+    results = result["results"]
+    assert results["2001:4860::1"]["country"] == "US"
+    assert results["2001:4860:0::1".upper()] is results["2001:4860::1"]
+    assert results["2001:4860:0:0:0:0:0:1"] is results["2001:4860::1"]
+    assert results["FD00::1"]["status"] == "skipped"
+    assert result["summary"]["unique"] == 2
+    assert result["summary"]["resolved"] == 1
+    assert result["summary"]["skipped"] == 1
+
+def test_geolookup_network_cache_ignores_replaced_database(tmp_path, monkeypatch):
+    """Test that cached results from a replaced database are not served"""
+    opened = install_fake_manager(tmp_path, monkeypatch)
+    geolookup("8.8.8.8")
+    manager = geolookup_module._reader_manager
+    replace_file(manager.path, "version 2")
+    manager.reload()
+    geolookup("8.8.8.9")
+    assert len(opened) == 2
+    assert opened[1].lookups == 1
+
+def test_geolookup_network_cache_releases_replaced_reader(tmp_path, monkeypatch):
+    """Test that cached results do not keep a replaced reader alive"""
+    opened = install_fake_manager(tmp_path, monkeypatch)
+    geolookup("8.8.8.8")
+    geolookup("5.5.5.5")
+    old_reader = weakref.ref(opened[0])
+    manager = geolookup_module._reader_manager
+    replace_file(manager.path, "version 2")
+    manager.reload()
+    geolookup("1.1.1.1")
+    del opened[0]
+    gc.collect()
+    assert old_reader() is None
+
+TEST_CITY_RECORD = {
+    "country": {"iso_code": "US", "names": {"en": "United States"}},
+    "city": {"names": {"en": "Mountain View"}},
+    "location": {"latitude": 37.4, "longitude": -122.1, "time_zone": "America/Los_Angeles"}
+}
+
+def make_archive(tmp_path, include_db=True):
+    """Helper building a GeoLite2-City style tar.gz around a small test database"""
+    db = tmp_path / "source.mmdb"
+    write_mmdb(str(db), {"8.8.8.0/24": TEST_CITY_RECORD})
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        license_info = tarfile.TarInfo("GeoLite2-City_20250101/LICENSE.txt")
+        license_info.size = 7
+        tar.addfile(license_info, io.BytesIO(b"license"))
+        if include_db:
+            tar.add(str(db), arcname="GeoLite2-City_20250101/GeoLite2-City.mmdb")
+    return buf.getvalue()
+
+class FakeMaxMindHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the MaxMind download endpoint"""
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        suffix = query.get("suffix", [""])[0]
+        server.requests.append((suffix, dict(self.headers)))
+        if query.get("license_key") != ["good_key"]:
+            self.send_response(401)
+            self.end_headers()
+            return
+        if suffix == "tar.gz.sha256":
+            digest = server.sha256 or hashlib.sha256(server.archive).hexdigest()
+            body = f"{digest}  GeoLite2-City_20250101.tar.gz\n".encode()
+            self.send_response(200)
+        elif self.headers.get("If-None-Match") == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        else:
+            body = server.archive
+            self.send_response(200)
+            self.send_header("ETag", server.etag)
+            self.send_header("Last-Modified", "Wed, 01 Jan 2025 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def maxmind_server(tmp_path):
+    """Run a local MaxMind download stand-in for the duration of a test"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMaxMindHandler)
+    server.archive = make_archive(tmp_path)
+    server.sha256 = None
+    server.etag = '"edition-1"'
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_port}/app/geoip_download"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_download_database(tmp_path, maxmind_server):
+    """Test streaming download, checksum verification and installation"""
+    db_dir = tmp_path / "GeoIP"
+    db_path = download_database("good_key", db_dir=str(db_dir), download_url=maxmind_server.url)
+    assert db_path == str(db_dir / "GeoLite2-City.mmdb")
+    with geoip2.database.Reader(db_path) as reader:
+        assert reader.city("8.8.8.8").country.iso_code == "US"
+    # Only the database and its download state are left behind
+    assert sorted(os.listdir(db_dir)) == ["GeoLite2-City.mmdb", "GeoLite2-City.mmdb.state.json"]
+
+def test_download_database_not_modified(tmp_path, maxmind_server):
+    """Test that an unchanged database is not downloaded again"""
+    db_dir = str(tmp_path / "GeoIP")
+    db_path = download_database("good_key", db_dir=db_dir, download_url=maxmind_server.url)
+    mtime = os.stat(db_path).st_mtime_ns
+    maxmind_server.requests.clear()
+
+    assert download_database("good_key", db_dir=db_dir, download_url=maxmind_server.url) == db_path
+    assert [suffix for suffix, _ in maxmind_server.requests] == ["tar.gz"]
+    headers = maxmind_server.requests[0][1]
+    assert headers["If-None-Match"] == '"edition-1"'
+    assert headers["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert os.stat(db_path).st_mtime_ns == mtime
+
+def test_download_database_checksum_mismatch(tmp_path, maxmind_server):
+    """Test that a corrupted archive is rejected and the installed database kept"""
+    db_dir = tmp_path / "GeoIP"
+    db_dir.mkdir()
+    (db_dir / "GeoLite2-City.mmdb").write_bytes(b"existing")
+    maxmind_server.sha256 = "0" * 64
+    assert download_database("good_key", db_dir=str(db_dir), download_url=maxmind_server.url) is None
+    assert (db_dir / "GeoLite2-City.mmdb").read_bytes() == b"existing"
+    assert os.listdir(db_dir) == ["GeoLite2-City.mmdb"]
+
+def test_download_database_missing_member(tmp_path, maxmind_server):
+    """Test that an archive without the .mmdb member is rejected"""
+    db_dir = tmp_path / "GeoIP"
+    maxmind_server.archive = make_archive(tmp_path, include_db=False)
+    assert download_database("good_key", db_dir=str(db_dir), download_url=maxmind_server.url) is None
+    assert os.listdir(db_dir) == []
+
+def test_download_database_invalid_license(tmp_path, maxmind_server):
+    """Test that a rejected license key returns None"""
+    db_dir = tmp_path / "GeoIP"
+    assert download_database("bad_key", db_dir=str(db_dir), download_url=maxmind_server.url) is None
+    assert os.listdir(db_dir) == []
+
+@pytest.fixture
+def no_standard_database(monkeypatch):
+    """Hide any database in the standard locations and use a fresh reader manager and cache"""
+    monkeypatch.setattr(geolookup_module, "GEOIP_DB_PATHS", [])
+    monkeypatch.setattr(geolookup_module, "_reader_manager", GeoIPReaderManager())
+    monkeypatch.setattr(geolookup_module, "_result_cache", PrefixCache(16))
+    monkeypatch.setattr(geolookup_module, "_refresher", None)
+
+def test_refresher_warming_does_not_block(tmp_path, no_standard_database, monkeypatch):
+    """Test that lookups fail fast with a warming status while the first download runs"""
+    release = threading.Event()
+    started = threading.Event()
+    def slow_download(license_key, db_dir):
+        started.set()
+        release.wait(10)
+        return None
+    refresher = GeoIPDatabaseRefresher(license_key="good_key", db_dir=str(tmp_path), download=slow_download)
+    monkeypatch.setattr(geolookup_module, "_refresher", refresher)
+    refresher.start()
+    try:
+        assert started.wait(5)
+        assert refresher.status()["state"] == "downloading"
+        result = geolookup("8.8.8.8")
+        assert result["status"] == "warming"
+        assert result["query"]["ip"] == "8.8.8.8"
+        assert geolookup_bulk(["8.8.8.8"])["status"] == "warming"
+    finally:
+        release.set()
+        refresher.stop(5)
+
+def test_refresher_installs_database(tmp_path, maxmind_server, no_standard_database):
+    """Test that the refresher downloads a missing database and hands it to lookups"""
+    db_dir = str(tmp_path / "GeoIP")
+    refresher = GeoIPDatabaseRefresher(
+        license_key="good_key", db_dir=db_dir,
+        download=lambda key, d: download_database(key, db_dir=d, download_url=maxmind_server.url))
+    refresher.check()
+    assert refresher.state == "ready"
+    assert refresher.status()["database"] == os.path.join(db_dir, "GeoLite2-City.mmdb")
+
+    result = geolookup("8.8.8.8")
+    assert result["status"] == "success"
+    assert result["country"] == "United States"
+
+def test_refresher_checks_age(tmp_path, no_standard_database):
+    """Test that only a stale database triggers a download"""
+    calls = []
+    def download(license_key, db_dir):
+        calls.append(license_key)
+        return None
+    db = tmp_path / "GeoLite2-City.mmdb"
+    db.write_text("v1")
+    refresher = GeoIPDatabaseRefresher(license_key="good_key", db_dir=str(tmp_path), max_age=3600,
+                                       download=download)
+    refresher.check()
+    assert calls == []
+    assert refresher.state == "ready"
+
+    old = os.path.getmtime(db) - 7200
+    os.utime(db, (old, old))
+    refresher.check()
+    assert calls == ["good_key"]
+    # A failed refresh keeps serving the existing database
+    assert refresher.state == "ready"
+    assert refresher.last_error == "Database download failed"
+
+def test_refresher_not_modified_resets_age(tmp_path, maxmind_server, no_standard_database):
+    """Test that a 304 Not Modified counts as a fresh check, so the next check does not ask again"""
+    db_dir = str(tmp_path / "GeoIP")
+    refresher = GeoIPDatabaseRefresher(
+        license_key="good_key", db_dir=db_dir, max_age=3600,
+        download=lambda key, d: download_database(key, db_dir=d, download_url=maxmind_server.url))
+    refresher.check()
+    db = refresher.db_path
+    old = os.path.getmtime(db) - 7200
+    with open(db + ".state.json") as f:
+        state = json.load(f)
+    with open(db + ".state.json", "w") as f:
+        json.dump(dict(state, checked=old), f)
+    os.utime(db, (old, old))
+    maxmind_server.requests.clear()
+
+    refresher.check()
+    assert [suffix for suffix, _ in maxmind_server.requests] == ["tar.gz"]
+    assert os.path.getmtime(db) == old
+    refresher.check()
+    assert len(maxmind_server.requests) == 1
+    assert refresher.state == "ready"
+
+def test_refresher_without_license_key(tmp_path, no_standard_database, monkeypatch):
+    """Test that lookups report the missing key instead of warming forever"""
+    monkeypatch.delenv("MAXMIND_LICENSE_KEY", raising=False)
+    refresher = GeoIPDatabaseRefresher(db_dir=str(tmp_path), download=lambda key, d: None)
+    monkeypatch.setattr(geolookup_module, "_refresher", refresher)
+    refresher.start()
+    try:
+        result = geolookup("8.8.8.8")
+        assert result["status"] == "error"
+        assert "GeoIP2 database not found" in result["error"]
+    finally:
+        refresher.stop(5)
@@ -0,0 +1,127 @@
+import asyncio
+import time
+import dns.asyncresolver
+import dns.resolver
+import pytest
+from irtoolshed_mcp_server import resolver as resolver_module
+from irtoolshed_mcp_server.nameserverpool import NameserverPool
+
+@pytest.fixture
+def pair(dns_server_pair):
+    """Two stand-in nameservers serving the same records, and a resolver using both"""
+    for zone in dns_server_pair:
+        zone.add("www.example.test", "A", ["192.0.2.10"])
+    resolver = dns.asyncresolver.Resolver(configure=False)
+    resolver.nameservers = [zone.host for zone in dns_server_pair]
+    resolver.port = dns_server_pair[0].port
+    resolver.cache = resolver_module.AnswerCache()
+    return dns_server_pair, resolver
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_pool_prefers_fastest(pair):
+    """Test that queries settle on the nameserver with the lowest RTT"""
+    (slow, fast), resolver = pair
+    resolver.cache = None
+    pool = NameserverPool(resolver, hedge_delay=False)
+    slow.delays["www.example.test."] = 0.05
+    for _ in range(10):
+        run(pool.resolve("www.example.test", "A"))
+    assert pool.ranked() == [fast.host, slow.host]
+    assert slow.count("www.example.test") <= 2
+    assert fast.count("www.example.test") >= 8
+
+def test_pool_hedges_slow_primary(pair):
+    """Test that a slow primary is hedged and the first answer wins"""
+    (first, second), resolver = pair
+    pool = NameserverPool(resolver, hedge_delay=0.05)
+    primary = pool.ranked()[0]
+    slow = first if primary == first.host else second
+    slow.delays["www.example.test."] = 1.0
+    start = time.perf_counter()
+    answer = run(pool.resolve("www.example.test", "A"))
+    elapsed = time.perf_counter() - start
+    assert [str(rdata) for rdata in answer] == ["192.0.2.10"]
+    assert elapsed < 0.5
+    stats = pool.stats()
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+    assert first.count("www.example.test") == second.count("www.example.test") == 1
+
+def test_pool_p95_hedge_delay(pair):
+    """Test that the automatic hedge delay follows the server's p95 RTT"""
+    _, resolver = pair
+    pool = NameserverPool(resolver, min_hedge_delay=0.01, max_hedge_delay=1.0)
+    address = pool.ranked()[0]
+    assert pool.delay_for(address) == 1.0
+    for rtt in [0.02] * 18 + [0.2, 0.3]:
+        pool._servers[address].record(rtt)
+    assert pool.delay_for(address) == 0.3
+    for rtt in [0.001] * 100:
+        pool._servers[address].record(rtt)
+    assert pool.delay_for(address) == 0.01
+
+def test_pool_fails_over_and_tracks_health(pair):
+    """Test that a failing server is skipped, counted and marked unhealthy"""
+    (first, second), resolver = pair
+    resolver.cache = None
+    pool = NameserverPool(resolver, hedge_delay=False)
+    first.servfail.add("www.example.test.")
+    for _ in range(5):
+        answer = run(pool.resolve("www.example.test", "A"))
+        assert [str(rdata) for rdata in answer] == ["192.0.2.10"]
+    servers = {s["address"]: s for s in pool.stats()["nameservers"]}
+    # Three failures mark it unhealthy; later queries go straight to the other server
+    assert servers[first.host]["failures"] == 3
+    assert servers[first.host]["healthy"] is False
+    assert servers[second.host]["healthy"] is True
+    assert pool.ranked()[0] == second.host
+
+def test_pool_negative_answers(pair):
+    """Test that NXDOMAIN from a nameserver is final and cached"""
+    (first, second), resolver = pair
+    pool = NameserverPool(resolver, hedge_delay=False)
+    for _ in range(2):
+        with pytest.raises(dns.resolver.NXDOMAIN):
+            run(pool.resolve("missing.example.test", "A"))
+    assert first.count("missing.example.test") + second.count("missing.example.test") == 1
+    assert all(s["failures"] == 0 for s in pool.stats()["nameservers"])
+
+def test_pool_counts_one_cache_lookup(pair):
+    """Test that a pool query counts one cache miss, and a repeat one hit"""
+    _, resolver = pair
+    pool = NameserverPool(resolver, hedge_delay=False)
+    run(pool.resolve("www.example.test", "A"))
+    assert (resolver.cache.statistics.hits, resolver.cache.statistics.misses) == (0, 1)
+    run(pool.resolve("www.example.test", "A"))
+    assert (resolver.cache.statistics.hits, resolver.cache.statistics.misses) == (1, 1)
+
+def test_pool_all_servers_fail(pair):
+    """Test that NoNameservers is raised once every server has failed"""
+    (first, second), resolver = pair
+    for zone in (first, second):
+        zone.servfail.add("www.example.test.")
+    pool = NameserverPool(resolver, hedge_delay=False)
+    with pytest.raises(dns.resolver.NoNameservers):
+        run(pool.resolve("www.example.test", "A"))
+
+@pytest.mark.parametrize("hedge_delay", [False, 0.1])
+def test_pool_lifetime_covers_every_attempt(pair, hedge_delay):
+    """Test that failovers and hedges share one lifetime instead of getting one each"""
+    (first, second), resolver = pair
+    for zone in (first, second):
+        zone.drop.add("www.example.test.")
+    pool = NameserverPool(resolver, hedge_delay=hedge_delay)
+    start = time.perf_counter()
+    with pytest.raises(dns.resolver.LifetimeTimeout):
+        run(pool.resolve("www.example.test", "A", lifetime=0.5))
+    assert time.perf_counter() - start < 0.8
+    assert first.count("www.example.test") + second.count("www.example.test") >= 1
+
+def test_shared_pool_follows_resolver(local_resolver):
+    """Test that the shared pool is built over the shared asyncio resolver"""
+    pool = resolver_module.get_nameserver_pool()
+    assert pool.resolver is resolver_module.get_async_resolver()
+    stats = resolver_module.get_nameserver_stats()
+    assert [s["address"] for s in stats["nameservers"]] == [local_resolver.host]
@@ -0,0 +1,105 @@
+import asyncio
+import time
+import pytest
+from irtoolshed_mcp_server import passivedns
+from irtoolshed_mcp_server.passivedns import PassiveDNSStore, passivedns_domain, passivedns_ip
+from irtoolshed_mcp_server.dnslookup import dnslookup, dnslookup_async
+
+@pytest.fixture
+def store(tmp_path):
+    store = PassiveDNSStore(str(tmp_path / "pdns.sqlite3"), batch_delay=0.05)
+    yield store
+    store.close()
+
+def test_store_domain_history_and_pivot(store):
+    """Test domain -> history and rdata -> domains pivots"""
+    t = time.time() - 3600
+    store.observe("Evil.Example.Test.", "A", ["192.0.2.1"], seen=t)
+    store.observe("evil.example.test", "A", ["192.0.2.1", "192.0.2.2"], seen=t + 20)
+    store.observe("other.example.test", "A", ["192.0.2.1"], seen=t + 10)
+    store.observe("evil.example.test", "NS", ["NS1.Example.Test."], seen=t + 10)
+    assert store.flush()
+    assert store.domain_history("evil.example.test", "A") == [
+        {"record_type": "A", "rdata": "192.0.2.1", "first_seen": t, "last_seen": t + 20, "count": 2},
+        {"record_type": "A", "rdata": "192.0.2.2", "first_seen": t + 20, "last_seen": t + 20, "count": 1}
+    ]
+    assert len(store.domain_history("evil.example.test")) == 3
+    assert [r["domain"] for r in store.rdata_domains("192.0.2.1")] == ["evil.example.test", "other.example.test"]
+    assert [r["domain"] for r in store.rdata_domains("ns1.example.test.")] == ["evil.example.test"]
+
+def test_store_batches_writes(store):
+    """Test that observations are written in batched transactions"""
+    for i in range(1200):
+        store.observe(f"host{i}.example.test", "A", ["192.0.2.1"])
+    assert store.flush()
+    stats = store.stats()
+    assert stats["rows"] == 1200
+    assert stats["written"] == 1200
+    assert stats["batches"] <= 5
+
+def test_store_observe_does_not_block(store):
+    """Test that observing is cheap on the request path"""
+    start = time.perf_counter()
+    for i in range(5000):
+        store.observe(f"host{i}.example.test", "A", ["192.0.2.1"])
+    assert time.perf_counter() - start < 1.0
+
+def test_store_pivot_is_fast(store):
+    """Test that pivots stay in the millisecond range on a larger store"""
+    for i in range(20000):
+        store.observe(f"host{i}.example.test", "A", [f"10.{i // 65536}.{i // 256 % 256}.{i % 256}"])
+    assert store.flush(30)
+    start = time.perf_counter()
+    for i in range(100):
+        assert len(store.rdata_domains(f"10.0.0.{i}")) == 1
+        assert len(store.domain_history(f"host{i}.example.test")) == 1
+    assert (time.perf_counter() - start) / 200 < 0.005
+
+def test_store_retention(store):
+    """Test that rows are pruned by age and by count"""
+    now = time.time()
+    store.retention_days = store.max_rows = 0
+    store.observe("old.example.test", "A", ["192.0.2.1"], seen=now - 100 * 86400)
+    for i in range(5):
+        store.observe(f"new{i}.example.test", "A", ["192.0.2.2"], seen=now - i)
+    store.flush()
+    store.retention_days = 90
+    store.max_rows = 3
+    assert store.prune(now) == 3
+    assert sorted(r["domain"] for r in store.rdata_domains("192.0.2.2")) == [
+        "new0.example.test", "new1.example.test", "new2.example.test"]
+
+def test_dnslookup_records_resolutions(local_resolver):
+    """Test that successful lookups land in the store and failures do not"""
+    local_resolver.add("www.example.test", "A", ["192.0.2.10"])
+    local_resolver.add("v6.example.test", "AAAA", ["2001:db8:0::1"])
+    dnslookup("www.example.test", "A")
+    asyncio.run(dnslookup_async("v6.example.test", "AAAA"))
+    dnslookup("missing.example.test", "A")
+    result = passivedns_domain("WWW.example.test")
+    assert result["status"] == "success"
+    assert [r["rdata"] for r in result["records"]] == ["192.0.2.10"]
+    assert passivedns_ip("192.0.2.10")["domains"][0]["domain"] == "www.example.test"
+    assert passivedns_ip("2001:DB8::1")["domains"][0]["domain"] == "v6.example.test"
+    assert passivedns_domain("missing.example.test")["records"] == []
+
+def test_passivedns_tools_validation(monkeypatch):
+    """Test input validation and the disabled store"""
+    assert passivedns_ip("not-an-ip")["error"] == "Invalid IP address format"
+    assert passivedns_domain("")["error"] == "No domain provided"
+    monkeypatch.setenv("PASSIVE_DNS_DB", "off")
+    assert passivedns_ip("192.0.2.1")["error"] == "Passive DNS store is disabled"
+
+def test_passivedns_tools_are_async():
+    """Test that the MCP passive-DNS tools are registered as coroutines"""
+    from irtoolshed_mcp_server.mcp_server import mcp
+    assert mcp._tool_manager.get_tool("passivedns_domain").is_async
+    assert mcp._tool_manager.get_tool("passivedns_ip").is_async
+
+def test_main_opens_store(monkeypatch):
+    """Test that the server opens the passive-DNS store at startup, before any lookup"""
+    from irtoolshed_mcp_server import geolookup, mcp_server, passivedns
+    monkeypatch.setattr(geolookup, "start_refresher", lambda: None)
+    monkeypatch.setattr(mcp_server.mcp, "run", lambda: None)
+    mcp_server.main()
+    assert passivedns._store is not None
@@ -0,0 +1,86 @@
+import pytest
+from irtoolshed_mcp_server import prefixcache
+from irtoolshed_mcp_server.prefixcache import PrefixCache, PrefixIndex
+
+def test_prefixcache_longest_match():
+    """Test that the most specific cached network wins"""
+    cache = PrefixCache()
+    cache.put("10.0.0.0/8", "wide")
+    cache.put("10.1.0.0/16", "narrow")
+    cache.put("10.1.2.3/32", "host")
+    assert cache.get("10.1.2.3") == "host"
+    assert cache.get("10.1.2.4") == "narrow"
+    assert cache.get("10.2.0.1") == "wide"
+    assert cache.get("11.0.0.1") is None
+    assert cache.get("11.0.0.1", "default") == "default"
+
+def test_prefixcache_ipv6():
+    """Test IPv6 networks are kept apart from IPv4"""
+    cache = PrefixCache()
+    cache.put("2001:4860::/32", "google")
+    cache.put("0.0.0.0/0", "any-v4")
+    assert cache.get("2001:4860:4860::8888") == "google"
+    assert cache.get("2001:db8::1") is None
+    assert cache.get("8.8.8.8") == "any-v4"
+
+def test_prefixcache_host_bits_ignored():
+    """Test that networks with host bits set are normalized"""
+    cache = PrefixCache()
+    cache.put("192.0.2.77/24", "net")
+    assert cache.get("192.0.2.1") == "net"
+
+def test_prefixcache_lru_eviction():
+    """Test that the least recently used network is evicted"""
+    cache = PrefixCache(maxsize=2)
+    cache.put("10.0.0.0/24", "a")
+    cache.put("10.0.1.0/24", "b")
+    assert cache.get("10.0.0.1") == "a"  # a is now most recently used
+    cache.put("10.0.2.0/24", "c")
+    assert cache.get("10.0.1.1") is None
+    assert cache.get("10.0.0.1") == "a"
+    assert cache.get("10.0.2.1") == "c"
+    assert len(cache) == 2
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1, "evictions": 1, "expired": 0}
+
+def test_prefixcache_ttl(monkeypatch):
+    """Test that expired entries are dropped and shorter prefixes still match"""
+    now = [1000.0]
+    monkeypatch.setattr(prefixcache.time, "monotonic", lambda: now[0])
+    cache = PrefixCache()
+    cache.put("10.0.0.0/8", "wide", ttl=60)
+    cache.put("10.1.0.0/16", "narrow", ttl=10)
+    cache.put("192.0.2.0/24", "forever")
+    assert cache.get("10.1.2.3") == "narrow"
+    now[0] += 30
+    assert cache.get("10.1.2.3") == "wide"
+    assert cache.get("192.0.2.1") == "forever"
+    now[0] += 60
+    assert cache.get("10.1.2.3") is None
+    assert cache.get("192.0.2.1") == "forever"
+    assert len(cache) == 1
+    assert cache.stats()["expired"] == 2
+
+def test_prefixcache_clear():
+    """Test clearing the cache"""
+    cache = PrefixCache()
+    cache.put("10.0.0.0/8", "a")
+    cache.clear()
+    assert cache.get("10.0.0.1") is None
+    assert len(cache) == 0
+
+def test_prefixcache_invalid_size():
+    """Test that a zero size is rejected"""
+    with pytest.raises(ValueError):
+        PrefixCache(maxsize=0)
+
+def test_prefixindex_insert_remove():
+    """Test the static index used for offline datasets"""
+    index = PrefixIndex()
+    key = index.insert("10.0.0.0/8", "wide")
+    index.insert("10.1.0.0/16", "narrow")
+    index.insert("10.1.0.0/16", "replaced")
+    assert len(index) == 2
+    assert index.get("10.1.2.3") == "replaced"
+    index.remove(key)
+    assert index.get("10.2.0.1") is None
+    assert len(index) == 1
@@ -0,0 +1,79 @@
+import asyncio
+import time
+import types
+import pytest
+from irtoolshed_mcp_server.ptrsweep import ptrsweep, iter_addresses, RateLimiter, PTR_SWEEP_MAX_ADDRESSES
+import ipaddress
+
+@pytest.fixture
+def reverse_zone(local_resolver):
+    """The local DNS stand-in serving a few PTR records"""
+    local_resolver.add("10.2.0.192.in-addr.arpa", "PTR", ["mail.example.test."])
+    local_resolver.add("11.2.0.192.in-addr.arpa", "PTR", ["www.example.test.", "web.example.test."])
+    local_resolver.add("1.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.8.b.d.0.1.0.0.2.ip6.arpa",
+                       "PTR", ["v6.example.test."])
+    return local_resolver
+
+def test_ptrsweep_ipv4(reverse_zone):
+    """Test that only addresses with PTR records are returned, in address order"""
+    result = asyncio.run(ptrsweep("192.0.2.0/24"))
+    assert result == {
+        "status": "success",
+        "network": "192.0.2.0/24",
+        "results": [
+            {"ip_addr": "192.0.2.10", "records": ["mail.example.test."]},
+            {"ip_addr": "192.0.2.11", "records": ["web.example.test.", "www.example.test."]}
+        ],
+        "summary": {"addresses": 256, "with_ptr": 2, "timed_out": 0, "errors": 0}
+    }
+    assert reverse_zone.count(rdtype="PTR") == 256
+
+def test_ptrsweep_ipv6(reverse_zone):
+    """Test an IPv6 sweep, ignoring host bits"""
+    result = asyncio.run(ptrsweep("2001:db8::5/124"))
+    assert result["network"] == "2001:db8::/124"
+    assert result["results"] == [{"ip_addr": "2001:db8::1", "records": ["v6.example.test."]}]
+
+def test_ptrsweep_timeouts(reverse_zone):
+    """Test that unanswered queries are counted without failing the sweep"""
+    reverse_zone.drop.add("3.2.0.192.in-addr.arpa.")
+    result = asyncio.run(ptrsweep("192.0.2.0/28", lifetime=0.3))
+    assert result["summary"]["timed_out"] == 1
+    assert result["summary"]["with_ptr"] == 2
+
+def test_ptrsweep_rate_limit(reverse_zone):
+    """Test that the rate cap paces queries"""
+    start = time.perf_counter()
+    result = asyncio.run(ptrsweep("192.0.2.0/28", rate=40))
+    elapsed = time.perf_counter() - start
+    assert result["summary"]["addresses"] == 16
+    # 16 queries at 40 per second
+    assert elapsed >= 0.35
+
+def test_ptrsweep_invalid_input():
+    """Test CIDR validation and the range size cap"""
+    assert asyncio.run(ptrsweep("192.0.2.0/33"))["error"] == "Invalid CIDR format"
+    assert asyncio.run(ptrsweep("not-a-network"))["error"] == "Invalid CIDR format"
+    result = asyncio.run(ptrsweep("10.0.0.0/8"))
+    assert result["error"] == f"Range too large. Maximum is {PTR_SWEEP_MAX_ADDRESSES} addresses"
+    assert "Invalid concurrency" in asyncio.run(ptrsweep("192.0.2.0/30", concurrency=0))["error"]
+    for kwargs in ({"timeout": 0}, {"timeout": 31}, {"lifetime": -1}, {"lifetime": 3600}):
+        result = asyncio.run(ptrsweep("192.0.2.0/30", **kwargs))
+        assert result["error"].endswith("Must be greater than 0 and at most 30 seconds")
+
+def test_iter_addresses_is_lazy():
+    """Test that addresses are generated one at a time"""
+    addresses = iter_addresses(ipaddress.ip_network("2001:db8::/64"))
+    assert isinstance(addresses, types.GeneratorType)
+    assert str(next(addresses)) == "2001:db8::"
+    assert str(next(addresses)) == "2001:db8::1"
+
+def test_rate_limiter_disabled():
+    """Test that a zero rate never waits"""
+    async def acquire_many():
+        limiter = RateLimiter(0)
+        for _ in range(1000):
+            await limiter.acquire()
+    start = time.perf_counter()
+    asyncio.run(acquire_many())
+    assert time.perf_counter() - start < 0.5
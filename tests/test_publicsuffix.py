@@ -0,0 +1,45 @@
+import pytest
+from irtoolshed_mcp_server.publicsuffix import PublicSuffixList, get_public_suffix_list, registrable_domain
+
+@pytest.fixture
+def psl(tmp_path):
+    path = tmp_path / "psl.dat"
+    path.write_text("// ===BEGIN ICANN DOMAINS===\n"
+                    "com\nuk\nco.uk\n// comment\n*.ck\n!www.ck\nрф\n"
+                    "// ===END ICANN DOMAINS===\n"
+                    "// ===BEGIN PRIVATE DOMAINS===\n"
+                    "blogspot.com\n"
+                    "// ===END PRIVATE DOMAINS===\n", encoding="utf-8")
+    return str(path)
+
+def test_registrable_domain_rules(psl):
+    """Test normal, wildcard and exception rules and the default rule"""
+    rules = PublicSuffixList(psl)
+    assert rules.registrable_domain("a.evil.com") == "evil.com"
+    assert rules.registrable_domain("B.Evil.Com.") == "evil.com"
+    assert rules.registrable_domain("www.example.co.uk") == "example.co.uk"
+    assert rules.registrable_domain("example.uk") == "example.uk"
+    assert rules.registrable_domain("a.b.example.ck") == "b.example.ck"
+    assert rules.registrable_domain("a.www.ck") == "www.ck"
+    assert rules.registrable_domain("host.example.test") == "example.test"
+    assert rules.registrable_domain("xn--e1afmkfd.xn--p1ai") == "xn--e1afmkfd.xn--p1ai"
+
+def test_public_suffixes_are_not_registrable(psl):
+    """Test that a public suffix has no registrable domain"""
+    rules = PublicSuffixList(psl)
+    assert rules.registrable_domain("co.uk") is None
+    assert rules.registrable_domain("example.ck") is None
+    assert rules.registrable_domain("com") is None
+    assert rules.registrable_domain("") is None
+
+def test_private_section(psl):
+    """Test that private suffixes are only used when asked for"""
+    assert PublicSuffixList(psl).registrable_domain("me.blogspot.com") == "blogspot.com"
+    assert PublicSuffixList(psl, include_private=True).registrable_domain("me.blogspot.com") == "me.blogspot.com"
+
+def test_bundled_list():
+    """Test the bundled Public Suffix List"""
+    assert len(get_public_suffix_list()) > 5000
+    assert registrable_domain("www.bbc.co.uk") == "bbc.co.uk"
+    assert registrable_domain("a.b.github.io") == "github.io"
+    assert registrable_domain("example.com.au") == "example.com.au"
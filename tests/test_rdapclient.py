@@ -0,0 +1,185 @@
+import json
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from irtoolshed_mcp_server import whoisscheduler
+from irtoolshed_mcp_server.rdapclient import RDAPBootstrap, RDAPClient, get_rdap_client, parse_domain, pooled_session
+from irtoolshed_mcp_server.whoislookup import get_whois_backends, whoislookup, whois
+
+def _vcard(**props):
+    return ["vcard", [["version", {}, "text", "4.0"]] + [[k, {}, "text", v] for k, v in props.items()]]
+
+def _domain(name, registrar_url=None, registrant=None):
+    data = {
+        "objectClassName": "domain",
+        "ldhName": name.upper(),
+        "entities": [{"objectClassName": "entity", "roles": ["registrar"],
+                      "vcardArray": _vcard(fn="Example Registrar, Inc.")}],
+        "events": [{"eventAction": "registration", "eventDate": "1997-09-15T04:00:00Z"},
+                   {"eventAction": "expiration", "eventDate": "2028-09-14T04:00:00.000+00:00"},
+                   {"eventAction": "last update of RDAP database", "eventDate": "2025-01-01T00:00:00Z"}],
+        "nameservers": [{"objectClassName": "nameserver", "ldhName": "NS1.EVIL.TEST"},
+                        {"objectClassName": "nameserver", "ldhName": "NS2.EVIL.TEST."}]
+    }
+    if registrar_url:
+        data["links"] = [{"rel": "related", "type": "application/rdap+json", "href": registrar_url}]
+    if registrant:
+        data["entities"].append({"objectClassName": "entity", "roles": ["registrant", "administrative"],
+                                 "vcardArray": _vcard(fn="J. Doe", org=registrant)})
+    return data
+
+@pytest.fixture
+def rdap(rdap_server, monkeypatch):
+    """The local RDAP stand-in with a thin registry record, a complete one and a registrar record"""
+    rdap_server.domains["/rdap/domain/evil.test"] = _domain(
+        "evil.test", f"{rdap_server.url}/registrar/domain/evil.test")
+    rdap_server.domains["/registrar/domain/evil.test"] = _domain("evil.test", registrant="Evil Corp")
+    rdap_server.domains["/rdap/domain/complete.test"] = _domain(
+        "complete.test", f"{rdap_server.url}/registrar/domain/complete.test", registrant="Complete Ltd")
+    monkeypatch.setenv("RDAP_BOOTSTRAP_URL", f"{rdap_server.url}/dns.json")
+    monkeypatch.setenv("WHOIS_RATE", "0")
+    return rdap_server
+
+def _client(server, path=None, **kwargs):
+    return RDAPClient(RDAPBootstrap(f"{server.url}/dns.json", path, **kwargs))
+
+def test_parse_domain():
+    """Test mapping of an RDAP domain object to whoislookup's fields"""
+    data = _domain("evil.test", "https://rdap.example.net/domain/evil.test", registrant="Evil Corp")
+    record = parse_domain(data, json.dumps(data))
+    assert record.domain_name == "EVIL.TEST"
+    assert record.registrar == "Example Registrar, Inc."
+    assert record.registrant == "Evil Corp"
+    assert record.creation_date == datetime(1997, 9, 15, 4, 0, 0)
+    assert record.expiration_date == datetime(2028, 9, 14, 4, 0, 0)
+    assert record.name_servers == ["NS1.EVIL.TEST", "NS2.EVIL.TEST"]
+    assert record.related == "https://rdap.example.net/domain/evil.test"
+    assert json.loads(record.text) == data
+
+def test_lookup_follows_registrar_for_missing_fields(rdap):
+    """Test that the registrar's RDAP record is only fetched when the registry lacks a field"""
+    client = _client(rdap)
+    record = client.lookup("evil.test")
+    assert record.registrant == "Evil Corp"
+    assert "related" not in record
+    assert rdap.requests == ["/dns.json", "/rdap/domain/evil.test", "/registrar/domain/evil.test"]
+    assert client.lookup("complete.test").registrant == "Complete Ltd"
+    assert rdap.requests[-1] == "/rdap/domain/complete.test"
+    assert client.stats() == {"requests": 3, "not_found": 0, "referrals": 1, "bootstrap_downloads": 1}
+
+def test_lookup_not_found_and_unknown_tld(rdap):
+    """Test a 404 answer and a TLD without RDAP service"""
+    client = _client(rdap)
+    record = client.lookup("missing.test")
+    assert record.domain_name is None
+    assert json.loads(record.text)["errorCode"] == 404
+    with pytest.raises(LookupError, match="No RDAP server is known for .other"):
+        client.lookup("evil.other")
+
+def test_session_keeps_connections_alive(rdap):
+    """Test that repeated lookups reuse one pooled connection"""
+    session = pooled_session()
+    client = RDAPClient(RDAPBootstrap(f"{rdap.url}/dns.json", session=session), session)
+    for _ in range(10):
+        client.lookup("complete.test")
+    assert len(rdap.requests) == 11
+    assert rdap.connections == 1
+
+def test_default_bootstrap_shares_client_session():
+    """Test that the default bootstrap downloads over the client's pooled session"""
+    client = RDAPClient()
+    assert client.bootstrap.session is client.session
+
+def test_bootstrap_refresh_does_not_block_lookups(rdap):
+    """Test that a stale registry keeps being served while one thread downloads a new one"""
+    bootstrap = RDAPBootstrap(f"{rdap.url}/dns.json")
+    urls = bootstrap.base_urls("test")
+    bootstrap.max_age = 0
+    started, release = threading.Event(), threading.Event()
+    get = bootstrap.session.get
+    def slow_get(url, **kwargs):
+        started.set()
+        release.wait(5)
+        return get(url, **kwargs)
+    bootstrap.session.get = slow_get
+    refresh = threading.Thread(target=bootstrap.base_urls, args=("test",))
+    refresh.start()
+    try:
+        assert started.wait(5)
+        assert bootstrap.base_urls("test") == urls
+    finally:
+        release.set()
+        refresh.join(5)
+    assert bootstrap.downloads == 2
+
+def test_bootstrap_cached_on_disk(rdap, tmp_path):
+    """Test that the bootstrap registry is downloaded once, across restarts, until it is stale"""
+    path = str(tmp_path / "dns.json")
+    _client(rdap, path).lookup("complete.test")
+    _client(rdap, path).lookup("complete.test")
+    assert rdap.requests.count("/dns.json") == 1
+    _client(rdap, path, max_age=0).lookup("complete.test")
+    assert rdap.requests.count("/dns.json") == 2
+
+    # A stale copy is used while the registry cannot be downloaded
+    stale = RDAPClient(RDAPBootstrap("http://127.0.0.1:1/dns.json", path, max_age=0, timeout=1))
+    assert stale.lookup("complete.test").registrant == "Complete Ltd"
+
+def test_whoislookup_prefers_rdap(rdap, monkeypatch):
+    """Test that whoislookup maps RDAP results to its usual format"""
+    monkeypatch.setattr(whois, "whois", lambda domain, **kwargs: pytest.fail("WHOIS should not be queried"))
+    result = whoislookup("www.evil.test")
+    assert result["status"] == "success"
+    assert result["source"] == "rdap"
+    assert result["domain"] == "www.evil.test"
+    assert result["registrar"] == "Example Registrar, Inc."
+    assert result["registrant"] == "Evil Corp"
+    assert result["creation_date"] == "1997-09-15 04:00:00"
+    assert result["expiration_date"] == "2028-09-14 04:00:00"
+    assert result["name_servers"] == ["ns1.evil.test", "ns2.evil.test"]
+    assert json.loads(result["raw_output"].split("\n")[0])["ldhName"] == "EVIL.TEST"
+    assert get_rdap_client().stats()["requests"] == 2
+
+def test_whoislookup_falls_back_to_whois(rdap, monkeypatch):
+    """Test that WHOIS answers when RDAP cannot, and confirms RDAP's "not found\""""
+    queries = []
+
+    def fake(domain, **kwargs):
+        queries.append(domain)
+        if domain.startswith("missing."):
+            return SimpleNamespace(text=f'No match for "{domain.upper()}".', domain_name=None)
+        return SimpleNamespace(text=f"Domain Name: {domain.upper()}", domain_name=domain.upper(),
+                               registrar="Other Registrar", creation_date=None, expiration_date=None,
+                               name_servers=None)
+
+    monkeypatch.setattr(whois, "whois", fake)
+    monkeypatch.setattr(whoisscheduler.NICClient, "choose_server", lambda self, domain: "whois.example.net")
+
+    result = whoislookup("evil.other")
+    assert (result["status"], result["source"], result["registrar"]) == ("success", "whois", "Other Registrar")
+
+    result = whoislookup("missing.test")
+    assert (result["error"], result["source"]) == ("Domain not found", "whois")
+    assert result["raw_output"] == 'No match for "MISSING.TEST".'
+    assert queries == ["evil.other", "missing.test"]
+
+    # RDAP's answer stands when WHOIS fails
+    monkeypatch.setattr(whois, "whois", lambda domain, **kwargs: (_ for _ in ()).throw(OSError("refused")))
+    result = whoislookup("missing2.test")
+    assert (result["error"], result["source"]) == ("Domain not found", "rdap")
+
+def test_whoislookup_backend_order(rdap, monkeypatch):
+    """Test that the preference order is configurable"""
+    monkeypatch.setenv("WHOIS_BACKENDS", "rdap")
+    assert whoislookup("evil.other")["error"] == "No RDAP server is known for .other"
+    monkeypatch.setenv("WHOIS_BACKENDS", "bogus")
+    assert whoislookup("evil.test")["error"].startswith("Invalid WHOIS backends")
+
+def test_get_whois_backends():
+    """Test parsing of the backend preference order"""
+    assert get_whois_backends() == ["rdap", "whois"]
+    assert get_whois_backends(" WHOIS, rdap ") == ["whois", "rdap"]
+    assert get_whois_backends(["rdap"]) == ["rdap"]
+    with pytest.raises(ValueError):
+        get_whois_backends("rdap,ftp")
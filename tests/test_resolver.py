@@ -0,0 +1,92 @@
+import asyncio
+import time
+import pytest
+import dns.name
+import dns.rdataclass
+import dns.rdatatype
+import dns.resolver
+from irtoolshed_mcp_server import resolver as resolver_module
+from irtoolshed_mcp_server.resolver import AnswerCache
+
+class FakeAnswer:
+    """Stand-in for dns.resolver.Answer with only an expiration time"""
+    def __init__(self, expiration, rrset="rrset"):
+        self.expiration = expiration
+        self.rrset = rrset
+
+def key(name):
+    return (dns.name.from_text(name), dns.rdatatype.A, dns.rdataclass.IN)
+
+def test_answer_cache_counters():
+    """Test hit, miss and eviction counters"""
+    cache = AnswerCache(max_size=2)
+    cache.put(key("a.test"), FakeAnswer(2 ** 40))
+    cache.put(key("b.test"), FakeAnswer(2 ** 40))
+    assert cache.get(key("a.test")) is not None
+    cache.put(key("c.test"), FakeAnswer(2 ** 40))
+    assert cache.get(key("b.test")) is None
+    assert cache.get(key("a.test")) is not None
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 1, "evictions": 1, "failures": 0}
+
+def test_answer_cache_replace_is_not_eviction():
+    """Test that re-caching a key does not count as an eviction"""
+    cache = AnswerCache(max_size=1)
+    cache.put(key("a.test"), FakeAnswer(2 ** 40))
+    cache.put(key("a.test"), FakeAnswer(2 ** 40))
+    assert cache.stats()["evictions"] == 0
+
+def test_answer_cache_expired():
+    """Test that expired answers are misses"""
+    cache = AnswerCache()
+    cache.put(key("a.test"), FakeAnswer(0))
+    assert cache.get(key("a.test")) is None
+    assert cache.stats()["size"] == 0
+
+def test_answer_cache_negative_cap():
+    """Test that negative answers are kept no longer than the cap"""
+    cache = AnswerCache(negative_ttl_cap=60)
+    now = time.time()
+    cache.put(key("a.test"), FakeAnswer(now + 3600, rrset=None))
+    cache.put(key("b.test"), FakeAnswer(now + 3600))
+    assert cache.get(key("a.test")).expiration <= now + 61
+    assert cache.get(key("b.test")).expiration == now + 3600
+
+def test_answer_cache_failures(monkeypatch):
+    """Test remembering server failures"""
+    now = [1000.0]
+    monkeypatch.setattr(resolver_module.time, "time", lambda: now[0])
+    cache = AnswerCache()
+    assert not cache.has_failure("broken.test", "A")
+    cache.put_failure("Broken.test.", "a")
+    assert cache.has_failure("broken.test", "A")
+    assert not cache.has_failure("broken.test", "MX")
+    assert cache.stats()["failures"] == 1
+    now[0] += resolver_module.DNS_SERVFAIL_CACHE_TTL + 1
+    assert not cache.has_failure("broken.test", "A")
+    cache.put_failure("broken.test", "A")
+    cache.flush()
+    assert cache.stats()["failures"] == 0
+
+def test_get_resolver_shared(monkeypatch):
+    """Test that the shared resolver is configured once, with the shared cache and DNS_NAMESERVERS"""
+    monkeypatch.setattr(resolver_module, "_resolver", None)
+    monkeypatch.setenv("DNS_NAMESERVERS", "192.0.2.53, 192.0.2.54")
+    resolver = resolver_module.get_resolver()
+    assert resolver is resolver_module.get_resolver()
+    assert resolver.cache is resolver_module._cache
+    assert resolver.nameservers == ["192.0.2.53", "192.0.2.54"]
+
+def test_resolve_counts_one_lookup(local_resolver):
+    """Test that each lookup through the sync and asyncio paths counts exactly one hit or miss"""
+    local_resolver.add("www.example.test", "A", ["192.0.2.10"])
+    for resolve in (resolver_module.resolve,
+                    lambda *args: asyncio.run(resolver_module.resolve_async(*args))):
+        resolver_module.flush_cache()
+        before = resolver_module.get_cache_stats()
+        resolve("www.example.test", "A")
+        resolve("www.example.test", "A")
+        for _ in range(2):
+            with pytest.raises(dns.resolver.NXDOMAIN):
+                resolve("missing.example.test", "A")
+        stats = resolver_module.get_cache_stats()
+        assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"]) == (2, 2)
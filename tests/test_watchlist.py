@@ -0,0 +1,146 @@
+import time
+import dns.resolver
+import pytest
+from irtoolshed_mcp_server import dnstransport
+from irtoolshed_mcp_server.watchlist import Watchlist
+
+class FakeAnswer(list):
+    """Stands in for a dnspython Answer: iterable records plus an expiration time"""
+    def __init__(self, records, ttl):
+        super().__init__(records)
+        self.expiration = time.time() + ttl
+
+class FakeDNS:
+    """Answers watchlist lookups from a dict and counts them"""
+    def __init__(self):
+        self.answers = {}
+        self.queries = []
+
+    def __call__(self, domain, record_type):
+        self.queries.append((domain, record_type))
+        answer = self.answers.get((domain, record_type))
+        if answer is None:
+            raise dns.resolver.NXDOMAIN()
+        records, ttl = answer
+        return FakeAnswer(records, ttl)
+
+@pytest.fixture
+def clock():
+    now = [1000000.0]
+    clock = lambda: now[0]
+    clock.advance = lambda seconds: now.__setitem__(0, now[0] + seconds)
+    return clock
+
+@pytest.fixture
+def fake_dns():
+    return FakeDNS()
+
+def test_watchlist_add_resolves_baseline(fake_dns, clock):
+    """Test that added entries are resolved at once and are not reported as changes"""
+    fake_dns.answers[("evil.example.test", "A")] = (["192.0.2.2", "192.0.2.1"], 300)
+    watchlist = Watchlist(resolver=fake_dns, clock=clock)
+    entries = watchlist.add([" Evil.Example.Test. "], ["a"])
+    assert len(entries) == 1
+    assert entries[0]["records"] == ["192.0.2.1", "192.0.2.2"]
+    assert entries[0]["status"] == "success"
+    assert entries[0]["ttl"] == 300
+    assert watchlist.changed_since() == []
+
+def test_watchlist_requeries_only_expired(fake_dns, clock):
+    """Test that only entries whose TTL has expired are re-resolved"""
+    fake_dns.answers[("short.example.test", "A")] = (["192.0.2.1"], 60)
+    fake_dns.answers[("long.example.test", "A")] = (["192.0.2.2"], 3600)
+    watchlist = Watchlist(resolver=fake_dns, clock=clock)
+    watchlist.add(["short.example.test", "long.example.test"])
+    assert len(fake_dns.queries) == 2
+    clock.advance(30)
+    assert watchlist.refresh_due() == 0
+    clock.advance(40)
+    assert watchlist.refresh_due() == 1
+    assert fake_dns.queries[-1] == ("short.example.test", "A")
+    assert 0 < watchlist.next_due() <= 60
+
+def test_watchlist_min_interval(fake_dns, clock):
+    """Test that tiny TTLs are re-checked no more often than min_interval"""
+    fake_dns.answers[("fastflux.example.test", "A")] = (["192.0.2.1"], 1)
+    watchlist = Watchlist(resolver=fake_dns, clock=clock, min_interval=30)
+    watchlist.add(["fastflux.example.test"])
+    clock.advance(10)
+    assert watchlist.refresh_due() == 0
+
+def test_watchlist_reports_changes_since(fake_dns, clock):
+    """Test that changed entries are reported with their previous records"""
+    fake_dns.answers[("moving.example.test", "A")] = (["192.0.2.1"], 60)
+    fake_dns.answers[("stable.example.test", "A")] = (["192.0.2.9"], 60)
+    watchlist = Watchlist(resolver=fake_dns, clock=clock)
+    watchlist.add(["moving.example.test", "stable.example.test"])
+    clock.advance(61)
+    since = clock()
+    fake_dns.answers[("moving.example.test", "A")] = (["203.0.113.5"], 60)
+    clock.advance(1)
+    watchlist.refresh_due()
+    changes = watchlist.changed_since(since)
+    assert [c["domain"] for c in changes] == ["moving.example.test"]
+    assert changes[0]["records"] == ["203.0.113.5"]
+    assert changes[0]["previous"] == {"status": "success", "records": ["192.0.2.1"]}
+    assert changes[0]["changed_at"] == clock()
+    assert watchlist.changed_since(clock()) == []
+    assert watchlist.stats()["changes"] == 1
+
+def test_watchlist_domain_disappears(fake_dns, clock):
+    """Test that a domain going away counts as a change and is re-checked later"""
+    fake_dns.answers[("gone.example.test", "A")] = (["192.0.2.1"], 60)
+    watchlist = Watchlist(resolver=fake_dns, clock=clock, negative_interval=300)
+    watchlist.add(["gone.example.test"])
+    del fake_dns.answers[("gone.example.test", "A")]
+    clock.advance(61)
+    watchlist.refresh_due()
+    change, = watchlist.changed_since()
+    assert change["status"] == "error"
+    assert change["error"] == "Domain gone.example.test does not exist"
+    assert change["ttl"] == 300
+
+def test_watchlist_remove_and_validation(fake_dns, clock):
+    """Test removing entries and rejecting invalid record types"""
+    watchlist = Watchlist(resolver=fake_dns, clock=clock)
+    watchlist.add(["a.example.test"], ["A", "MX"])
+    assert watchlist.remove(["A.example.test."], ["MX"]) == 1
+    assert [(e["domain"], e["record_type"]) for e in watchlist.entries()] == [("a.example.test", "A")]
+    with pytest.raises(ValueError):
+        watchlist.add(["a.example.test"], ["BOGUS"])
+
+def test_watchlist_scheduler(local_resolver):
+    """Test that the background scheduler re-resolves expired entries"""
+    local_resolver.add("www.example.test", "A", ["192.0.2.1"], ttl=1)
+    watchlist = Watchlist(min_interval=0.2)
+    watchlist.start()
+    try:
+        watchlist.add(["www.example.test"])
+        local_resolver.add("www.example.test", "A", ["192.0.2.2"], ttl=1)
+        deadline = time.time() + 5
+        while not watchlist.changed_since() and time.time() < deadline:
+            time.sleep(0.05)
+        change, = watchlist.changed_since()
+        assert change["records"] == ["192.0.2.2"]
+        assert change["previous"]["records"] == ["192.0.2.1"]
+    finally:
+        watchlist.stop(1)
+
+def test_watchlist_uses_configured_transport(dns_tls_server, local_resolver, tls_certificate, monkeypatch):
+    """Test that watchlist lookups honour DNS_TRANSPORT instead of falling back to plain UDP"""
+    monkeypatch.setenv("DNS_TRANSPORT", "tls")
+    monkeypatch.setenv("DNS_TLS_SERVER_NAME", "dns.test")
+    monkeypatch.setenv("SSL_CERT_FILE", str(tls_certificate[0]))
+    monkeypatch.setattr(dnstransport, "DNS_TLS_PORT", dns_tls_server.tls_port)
+    dns_tls_server.add("evil.example.test", "A", ["192.0.2.1"])
+    dns_tls_server.add("other.example.test", "A", ["192.0.2.2"])
+    watchlist = Watchlist()
+    try:
+        entries = watchlist.add(["evil.example.test", "other.example.test"])
+    finally:
+        watchlist.stop(1)
+    assert [entry["records"] for entry in entries] == [["192.0.2.1"], ["192.0.2.2"]]
+    assert all(entry["next_check"] is not None for entry in entries)
+    # Both queries went over one TLS connection; none were sent over UDP
+    assert dns_tls_server.count() == 2
+    assert dns_tls_server.tcp_connections == 1
@@ -0,0 +1,104 @@
+import time
+from types import SimpleNamespace
+import pytest
+from irtoolshed_mcp_server import whoiscache, whoisscheduler
+from irtoolshed_mcp_server.whoiscache import WhoisCache, get_whois_cache
+from irtoolshed_mcp_server.whoislookup import whoislookup, whois
+
+@pytest.fixture
+def fake_whois(monkeypatch):
+    """Replace python-whois with a counting stand-in"""
+    queries = []
+
+    def fake(domain, **kwargs):
+        queries.append(domain)
+        if domain == "missing.com":
+            return SimpleNamespace(text="No match for MISSING.COM", domain_name=None)
+        if domain == "broken.com":
+            raise OSError("Connection refused")
+        if domain == "throttled.com":
+            return SimpleNamespace(text="Query rate limit exceeded. Try again later.", domain_name=None)
+        return SimpleNamespace(text=f"Domain Name: {domain.upper()}\r\nRegistrar: Example Registrar",
+                               domain_name=domain.upper(), registrar="Example Registrar", registrant=None,
+                               org="Example Org", creation_date=["2001-02-03 04:05:06"],
+                               expiration_date="2031-02-03 04:05:06", name_servers=["NS1.EXAMPLE.NET"])
+
+    monkeypatch.setattr(whois, "whois", fake)
+    monkeypatch.setenv("WHOIS_BACKENDS", "whois")
+    monkeypatch.setattr(whoisscheduler.NICClient, "choose_server", lambda self, domain: "whois.example.net")
+    return queries
+
+def test_cache_hit_returns_same_result(fake_whois):
+    """Test that a repeated lookup is answered from the cache, raw_output included"""
+    first = whoislookup("evil.com")
+    second = whoislookup("evil.com")
+    assert first["status"] == "success"
+    assert second == first
+    assert second["raw_output"] == "Domain Name: EVIL.COM\r\nRegistrar: Example Registrar"
+    assert fake_whois == ["evil.com"]
+    assert get_whois_cache().stats()["hits"] == 1
+
+def test_cache_keyed_on_registrable_domain(fake_whois):
+    """Test that subdomains of one registration share a single query"""
+    a = whoislookup("a.evil.com")
+    b = whoislookup("B.evil.com")
+    assert fake_whois == ["evil.com"]
+    assert a["domain"] == "a.evil.com"
+    assert b["domain"] == "B.evil.com"
+    assert {k: v for k, v in a.items() if k != "domain"} == {k: v for k, v in b.items() if k != "domain"}
+    whoislookup("a.evil.co.uk")
+    whoislookup("b.evil.co.uk")
+    assert fake_whois == ["evil.com", "evil.co.uk"]
+
+def test_cache_negative_results(fake_whois):
+    """Test that "Domain not found" is cached but other errors are not"""
+    assert whoislookup("missing.com")["error"] == "Domain not found"
+    assert whoislookup("www.missing.com")["query"] == "www.missing.com"
+    assert whoislookup("broken.com")["error"] == "Connection refused"
+    assert whoislookup("broken.com")["error"] == "Connection refused"
+    assert fake_whois == ["missing.com", "broken.com", "broken.com"]
+
+def test_cache_survives_restart(fake_whois, monkeypatch):
+    """Test that results are read back from disk by a new cache"""
+    first = whoislookup("evil.com")
+    monkeypatch.setattr(whoiscache, "_cache", None)
+    assert whoislookup("evil.com") == first
+    assert fake_whois == ["evil.com"]
+
+def test_cache_disabled(fake_whois, monkeypatch):
+    """Test that WHOIS_CACHE_DB=off disables caching"""
+    monkeypatch.setenv("WHOIS_CACHE_DB", "off")
+    whoislookup("evil.com")
+    whoislookup("evil.com")
+    assert fake_whois == ["evil.com", "evil.com"]
+    assert whoiscache.get_cache_stats() == {"status": "disabled"}
+
+def test_cache_ttls(tmp_path):
+    """Test positive and negative expiry and purging"""
+    cache = WhoisCache(str(tmp_path / "cache.sqlite3"), ttl=100, negative_ttl=10)
+    now = time.time()
+    cache.put("evil.com", {"status": "success", "domain": "evil.com"}, now=now)
+    cache.put("missing.com", {"status": "error", "query": "missing.com"}, negative=True, now=now)
+    assert cache.get("evil.com", now=now + 50) == {"status": "success", "domain": "evil.com"}
+    assert cache.get("missing.com", now=now + 5) == {"status": "error", "query": "missing.com"}
+    assert cache.get("missing.com", now=now + 11) is None
+    assert cache.get("evil.com", now=now + 101) is None
+    assert cache.purge(now=now + 50) == 1
+    assert cache.stats()["entries"] == 1
+
+def test_cache_ttl_from_environment(monkeypatch):
+    """Test that the TTLs are configurable"""
+    monkeypatch.setenv("WHOIS_CACHE_TTL", "60")
+    monkeypatch.setenv("WHOIS_NEGATIVE_CACHE_TTL", "0")
+    cache = get_whois_cache()
+    assert (cache.ttl, cache.negative_ttl) == (60, 0)
+    cache.put("missing.com", {"status": "error"}, negative=True)
+    assert cache.get("missing.com") is None
+
+def test_cache_skips_unrecognized_empty_response(fake_whois):
+    """Test that an empty parse without a not-found marker is an error that is not cached"""
+    result = whoislookup("throttled.com")
+    assert result["error"] == "No registration data in WHOIS response"
+    assert result["raw_output"] == "Query rate limit exceeded. Try again later."
+    whoislookup("throttled.com")
+    assert fake_whois == ["throttled.com", "throttled.com"]
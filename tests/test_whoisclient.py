@@ -0,0 +1,186 @@
+from datetime import datetime
+import pytest
+from irtoolshed_mcp_server import whoisclient
+from irtoolshed_mcp_server.whoisclient import (WhoisClient, WhoisServerMap, get_whois_client_name, parse_date,
+                                               parse_response)
+from irtoolshed_mcp_server.whoiscache import get_whois_cache
+from irtoolshed_mcp_server.whoisscheduler import WhoisScheduler
+from irtoolshed_mcp_server.whoislookup import whoislookup
+
+REGISTRY_RESPONSE = """   Domain Name: EVIL.TEST
+   Registry Domain ID: 2138514_DOMAIN_COM-VRSN
+   Registrar WHOIS Server: {registrar}
+   Registrar: Example Registrar, Inc.
+   Creation Date: 1997-09-15T04:00:00Z
+   Registry Expiry Date: 2028-09-14T04:00:00Z
+   Name Server: NS1.EVIL.TEST
+   Name Server: NS2.EVIL.TEST
+>>> Last update of whois database: 2025-01-01T00:00:00Z <<<
+"""
+
+REGISTRAR_RESPONSE = """Domain Name: evil.test
+Registrar: Example Registrar, Inc.
+Registrant Organization: Evil Corp
+Creation Date: 1997-09-15T07:00:00+0300
+"""
+
+NOMINET_RESPONSE = """
+    Domain name:
+        bbc.co.uk
+
+    Registrant:
+        British Broadcasting Corporation
+
+    Registrar:
+        British Broadcasting Corporation [Tag = BBC]
+        URL: http://www.bbc.co.uk
+
+    Relevant dates:
+        Registered on: before Aug-1996
+        Expiry date:  15-Aug-2027
+
+    Name servers:
+        ddns0.bbc.co.uk
+        ddns1.bbc.com 192.0.2.1
+"""
+
+@pytest.fixture
+def registry(whois_servers):
+    """Fake IANA, registry and registrar WHOIS servers for the .test TLD"""
+    registrar = whois_servers({"evil.test": REGISTRAR_RESPONSE})
+    registry = whois_servers({
+        "evil.test": REGISTRY_RESPONSE.format(registrar=f"{registrar.host}:{registrar.port}"),
+        "complete.test": REGISTRY_RESPONSE.format(registrar=f"{registrar.host}:{registrar.port}")
+        .replace("EVIL.TEST", "COMPLETE.TEST") + "Registrant Organization: Complete Ltd\n"
+    })
+    iana = whois_servers({"test": f"domain:       TEST\nwhois:        {registry.host}:{registry.port}\n"})
+    return iana, registry, registrar
+
+def _client(iana, server_map=None, **kwargs):
+    return WhoisClient(server_map, iana_server=f"{iana.host}:{iana.port}", **kwargs)
+
+def test_parse_response_key_value():
+    """Test parsing of the ICANN "Key: value" layout"""
+    record = parse_response(REGISTRY_RESPONSE.format(registrar="whois.example.net"))
+    assert record.domain_name == "EVIL.TEST"
+    assert record.registrar == "Example Registrar, Inc."
+    assert record.whois_server == "whois.example.net"
+    assert record.creation_date == datetime(1997, 9, 15, 4, 0, 0)
+    assert record.expiration_date == datetime(2028, 9, 14, 4, 0, 0)
+    assert record.name_servers == ["NS1.EVIL.TEST", "NS2.EVIL.TEST"]
+    assert record.registrant is None
+
+def test_parse_response_indented():
+    """Test parsing of the layout with values on the lines below their key"""
+    record = parse_response(NOMINET_RESPONSE)
+    assert record.domain_name == "bbc.co.uk"
+    assert record.registrant == "British Broadcasting Corporation"
+    assert record.registrar == "British Broadcasting Corporation [Tag = BBC]"
+    assert record.creation_date == "before Aug-1996"
+    assert record.expiration_date == datetime(2027, 8, 15)
+    assert record.name_servers == ["ddns0.bbc.co.uk", "ddns1.bbc.com"]
+
+def test_parse_date_formats():
+    """Test that common WHOIS date formats become UTC datetimes"""
+    assert parse_date("2024-01-02T03:04:05.123Z") == datetime(2024, 1, 2, 3, 4, 5, 123000)
+    assert parse_date("2024-01-02T03:04:05+0100") == datetime(2024, 1, 2, 2, 4, 5)
+    assert parse_date("02-Jan-2024") == datetime(2024, 1, 2)
+    assert parse_date("2024.01.02") == datetime(2024, 1, 2)
+    assert parse_date("someday") == "someday"
+
+def test_server_map_persists_and_refreshes(registry, tmp_path):
+    """Test that IANA is asked once per TLD, across restarts, until the entry is stale"""
+    iana, server, _ = registry
+    path = str(tmp_path / "servers.json")
+    client = _client(iana, WhoisServerMap(path))
+    assert client.server_for("a.evil.test") == f"{server.host}:{server.port}"
+    assert client.server_for("other.test") == f"{server.host}:{server.port}"
+    assert len(iana.queries) == 1
+    assert _client(iana, WhoisServerMap(path)).server_for("evil.test") == f"{server.host}:{server.port}"
+    assert len(iana.queries) == 1
+    _client(iana, WhoisServerMap(path, max_age=0)).server_for("evil.test")
+    assert len(iana.queries) == 2
+
+def test_server_map_keeps_stale_entry_when_iana_fails(registry, tmp_path):
+    """Test that a stale entry is used when IANA cannot be reached"""
+    iana, server, _ = registry
+    path = str(tmp_path / "servers.json")
+    _client(iana, WhoisServerMap(path)).server_for("evil.test")
+    client = WhoisClient(WhoisServerMap(path, max_age=0), iana_server="127.0.0.1:1", connect_timeout=1)
+    assert client.server_for("evil.test") == f"{server.host}:{server.port}"
+    with pytest.raises(OSError):
+        client.server_for("example.other")
+
+def test_lookup_follows_referral_for_missing_fields(registry):
+    """Test that the registrar is only asked when the registry lacks a field"""
+    iana, server, registrar = registry
+    client = _client(iana)
+    record = client.lookup("evil.test")
+    assert record.registrant == "Evil Corp"
+    assert record.registrar == "Example Registrar, Inc."
+    assert record.creation_date == datetime(1997, 9, 15, 4, 0, 0)  # the registry's value wins
+    assert "Registrant Organization: Evil Corp" in record.text
+    assert "Registry Domain ID" in record.text
+    assert len(registrar.queries) == 1
+
+    record = client.lookup("complete.test")
+    assert record.registrant == "Complete Ltd"
+    assert len(registrar.queries) == 1
+    assert client.stats() == {"queries": 4, "iana_queries": 1, "referrals": 1, "known_tlds": 1}
+
+def test_lookup_not_found(registry):
+    """Test that an unregistered domain has no domain_name"""
+    iana, _, registrar = registry
+    record = _client(iana).lookup("missing.test")
+    assert record.domain_name is None
+    assert record.text.startswith('No match for "MISSING.TEST"')
+    assert registrar.queries == []
+
+def test_lookup_timeouts(whois_servers):
+    """Test that a slow WHOIS server fails within the read timeout"""
+    slow = whois_servers({"evil.test": "Domain Name: EVIL.TEST\n"}, delay=2)
+    server_map = WhoisServerMap()
+    server_map.set("test", f"{slow.host}:{slow.port}")
+    with pytest.raises(TimeoutError, match="timed out"):
+        WhoisClient(server_map, read_timeout=0.2).lookup("evil.test")
+
+def test_lookup_uses_scheduler(registry):
+    """Test that queries wait for their server's turn"""
+    iana, server, _ = registry
+    scheduler = WhoisScheduler(rate=0)
+    _client(iana, scheduler=scheduler).lookup("evil.test")
+    servers = {queue["server"]: queue["admitted"] for queue in scheduler.stats()["servers"]}
+    assert servers[f"{iana.host}:{iana.port}"] == 1
+    assert servers[f"{server.host}:{server.port}"] == 1
+
+def test_whoislookup_native_client(registry, monkeypatch):
+    """Test that whoislookup maps native client results like python-whois results"""
+    iana, registry, _ = registry
+    monkeypatch.setenv("WHOIS_CLIENT", "native")
+    monkeypatch.setenv("WHOIS_BACKENDS", "whois")
+    monkeypatch.setattr(whoisclient, "_client", _client(iana))
+    result = whoislookup("www.evil.test")
+    assert result["status"] == "success"
+    assert result["domain"] == "www.evil.test"
+    assert result["registrar"] == "Example Registrar, Inc."
+    assert result["registrant"] == "Evil Corp"
+    assert result["creation_date"] == "1997-09-15 04:00:00"
+    assert result["expiration_date"] == "2028-09-14 04:00:00"
+    assert result["name_servers"] == ["ns1.evil.test", "ns2.evil.test"]
+    assert "Registry Domain ID" in result["raw_output"]
+
+    result = whoislookup("missing.test")
+    assert result["error"] == "Domain not found"
+    assert result["raw_output"].startswith('No match for "MISSING.TEST"')
+
+    registry.records["throttled.test"] = "Connection refused by policy; too many queries\r\n"
+    result = whoislookup("throttled.test")
+    assert result["error"] == "No registration data in WHOIS response"
+    assert get_whois_cache().get("throttled.test") is None
+
+def test_whois_client_name():
+    """Test choosing the WHOIS client"""
+    assert get_whois_client_name() == "python-whois"
+    assert get_whois_client_name(" Native ") == "native"
+    with pytest.raises(ValueError):
+        get_whois_client_name("bogus")
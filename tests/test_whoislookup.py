@@ -1,5 +1,9 @@
+import threading
+import time
+from types import SimpleNamespace
 import pytest
-from irtoolshed_mcp_server.whoislookup import whoislookup
+from irtoolshed_mcp_server import whoisscheduler
+from irtoolshed_mcp_server.whoislookup import whoislookup, whoislookup_bulk, whois
 from datetime import datetime
 
 def test_whoislookup_google():
@@ -62,4 +66,82 @@ def test_whoislookup_new_tld():
     assert result["status"] == "success"
     assert result["domain"] == "something.dev"
     assert result["raw_output"]  # Should have raw output
-    # Don't make assumptions about other fields for new TLDs 
\ No newline at end of file
+    # Don't make assumptions about other fields for new TLDs 
+
+@pytest.fixture
+def fake_whois(monkeypatch):
+    """Replace python-whois with a stand-in that takes `delays[domain]` seconds per query"""
+    fake = SimpleNamespace(queries=[], delays={}, active=0, max_active=0, lock=threading.Lock())
+
+    def lookup(domain, **kwargs):
+        with fake.lock:
+            fake.queries.append(domain)
+            fake.active += 1
+            fake.max_active = max(fake.max_active, fake.active)
+        try:
+            time.sleep(fake.delays.get(domain, 0.01))
+        finally:
+            with fake.lock:
+                fake.active -= 1
+        if domain.startswith("missing."):
+            return SimpleNamespace(text="No match", domain_name=None)
+        return SimpleNamespace(text=f"Domain Name: {domain.upper()}", domain_name=domain.upper(),
+                               registrar="Example Registrar", creation_date=None, expiration_date=None,
+                               name_servers=None)
+
+    monkeypatch.setattr(whois, "whois", lookup)
+    monkeypatch.setenv("WHOIS_BACKENDS", "whois")
+    monkeypatch.setattr(whoisscheduler.NICClient, "choose_server", lambda self, domain: "whois.example.net")
+    monkeypatch.setenv("WHOIS_RATE", "0")
+    monkeypatch.setenv("WHOIS_MAX_CONCURRENCY", "100")
+    return fake
+
+def test_whoislookup_bulk_collapses_to_registrable_domains(fake_whois):
+    """Test that input is normalized, deduplicated and collapsed before lookup"""
+    result = whoislookup_bulk(["a.evil.com", "B.EVIL.com.", " evil.com ", "www.example.co.uk", "missing.org",
+                               "not-a-domain", ""])
+    assert result["status"] == "success"
+    assert [r.get("domain", r.get("query")) for r in result["results"]] == [
+        "evil.com", "example.co.uk", "missing.org", "not-a-domain"]
+    assert sorted(fake_whois.queries) == ["evil.com", "example.co.uk", "missing.org"]
+    assert result["collapsed"] == {"a.evil.com": "evil.com", "b.evil.com": "evil.com",
+                                   "www.example.co.uk": "example.co.uk"}
+    assert result["summary"] == {"total": 6, "unique": 4, "succeeded": 2, "failed": 2, "timed_out": 0,
+                                 "pending": 0}
+
+def test_whoislookup_bulk_worker_pool(fake_whois):
+    """Test that lookups run concurrently but never beyond the concurrency limit"""
+    domains = [f"host{i}.example" for i in range(20)]
+    for domain in domains:
+        fake_whois.delays[domain] = 0.05
+    start = time.monotonic()
+    result = whoislookup_bulk(domains, concurrency=5)
+    assert result["summary"]["succeeded"] == 20
+    assert fake_whois.max_active == 5
+    assert time.monotonic() - start < 0.6
+
+def test_whoislookup_bulk_deadline(fake_whois):
+    """Test that stragglers are reported instead of failing the batch"""
+    fake_whois.delays.update({"slow1.com": 2, "slow2.com": 2})
+    seen = []
+    start = time.monotonic()
+    result = whoislookup_bulk(["fast.com", "slow1.com", "slow2.com", "queued.com"], concurrency=2, deadline=0.3,
+                              on_result=lambda r: seen.append(r["domain"]))
+    assert time.monotonic() - start < 1.0
+    statuses = {r.get("domain", r.get("query")): r["status"] for r in result["results"]}
+    assert statuses["fast.com"] == "success"
+    assert "timed_out" in statuses.values()
+    assert result["summary"]["succeeded"] + result["summary"]["timed_out"] + result["summary"]["pending"] == 4
+    assert "fast.com" in seen
+
+def test_whoislookup_bulk_interleaves_tlds(fake_whois):
+    """Test that one worker alternates between registries instead of draining one first"""
+    whoislookup_bulk(["a.com", "b.com", "c.com", "a.net", "b.net"], concurrency=1)
+    assert fake_whois.queries == ["a.com", "a.net", "b.com", "b.net", "c.com"]
+
+def test_whoislookup_bulk_invalid_input():
+    """Test that bad arguments fail the whole call"""
+    assert whoislookup_bulk([])["error"] == "No domains provided"
+    assert whoislookup_bulk("a.com b.com", concurrency=0)["error"].startswith("Invalid concurrency")
+    assert whoislookup_bulk(["a.com"], deadline=0)["error"] == "Invalid deadline. Must be greater than 0"
+
@@ -0,0 +1,213 @@
+import socket
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from irtoolshed_mcp_server import whoisscheduler
+from irtoolshed_mcp_server.whoisscheduler import WhoisScheduler, get_whois_scheduler, whois_server
+from irtoolshed_mcp_server.whoislookup import whoislookup, whois
+
+def _query(server, domain):
+    """Send one WHOIS query to a fake server and return the response"""
+    with socket.create_connection((server.host, server.port), timeout=5) as sock:
+        sock.sendall(domain.encode() + b"\r\n")
+        chunks = []
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                return b"".join(chunks).decode()
+            chunks.append(data)
+
+def _run_all(scheduler, server, domains, stagger=0.0):
+    """Query every domain from its own thread through the scheduler; return the errors"""
+    errors = []
+
+    def run(domain):
+        try:
+            with scheduler.slot(f"{server.host}:{server.port}"):
+                _query(server, domain)
+        except Exception as e:
+            errors.append(e)
+
+    threads = []
+    for domain in domains:
+        thread = threading.Thread(target=run, args=(domain,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(stagger)
+    for thread in threads:
+        thread.join(10)
+    return errors
+
+def test_scheduler_limits_concurrency(whois_servers):
+    """Test that no more than max_concurrency queries reach one server at once"""
+    server = whois_servers(delay=0.1)
+    scheduler = WhoisScheduler(rate=0, max_concurrency=2)
+    assert _run_all(scheduler, server, [f"host{i}.test" for i in range(8)]) == []
+    assert len(server.queries) == 8
+    assert server.max_active == 2
+
+def test_scheduler_rate_limit(whois_servers):
+    """Test that queries beyond the burst are spaced out at the configured rate"""
+    server = whois_servers()
+    scheduler = WhoisScheduler(rate=10, burst=2, max_concurrency=10)
+    assert _run_all(scheduler, server, [f"host{i}.test" for i in range(6)]) == []
+    times = sorted(t for _, t in server.queries)
+    assert times[1] - times[0] < 0.05
+    assert times[-1] - times[0] >= 0.35
+
+def test_scheduler_first_come_first_served(whois_servers):
+    """Test that queued queries reach the server in arrival order"""
+    server = whois_servers(delay=0.05)
+    scheduler = WhoisScheduler(rate=0, max_concurrency=1)
+    domains = [f"host{i}.test" for i in range(6)]
+    assert _run_all(scheduler, server, domains, stagger=0.01) == []
+    assert [query for query, _ in server.queries] == domains
+
+def test_scheduler_isolates_servers(whois_servers):
+    """Test that a backlog at one server does not hold up another"""
+    slow = whois_servers(delay=0.3)
+    fast = whois_servers()
+    scheduler = WhoisScheduler(rate=0, max_concurrency=1)
+    backlog = threading.Thread(target=_run_all, args=(scheduler, slow, [f"host{i}.test" for i in range(5)]))
+    backlog.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    assert _run_all(scheduler, fast, ["other.test"]) == []
+    assert time.monotonic() - start < 0.2
+    backlog.join(10)
+
+def test_scheduler_queue_timeout_and_metrics(whois_servers):
+    """Test that a query gives up after the queue timeout and that waits are reported"""
+    server = whois_servers(delay=0.3)
+    scheduler = WhoisScheduler(rate=0, max_concurrency=1, queue_timeout=0.1)
+    errors = _run_all(scheduler, server, ["a.test", "b.test"], stagger=0.02)
+    assert len(errors) == 1
+    assert isinstance(errors[0], TimeoutError)
+    assert "Timed out waiting for WHOIS server" in str(errors[0])
+    stats = scheduler.stats()
+    assert stats["max_concurrency"] == 1
+    [queue] = stats["servers"]
+    assert queue["server"] == f"{server.host}:{server.port}"
+    assert queue["admitted"] == 1
+    assert queue["timed_out"] == 1
+    assert queue["max_queue_depth"] == 1
+    assert queue["queue_depth"] == 0
+    assert queue["in_flight"] == 0
+    assert queue["wait_p50_ms"] is not None
+
+def test_scheduler_wait_times(whois_servers):
+    """Test that queued queries report how long they waited"""
+    server = whois_servers(delay=0.1)
+    scheduler = WhoisScheduler(rate=0, max_concurrency=1)
+    assert _run_all(scheduler, server, [f"host{i}.test" for i in range(4)]) == []
+    [queue] = scheduler.stats()["servers"]
+    assert queue["admitted"] == 4
+    assert queue["wait_max_ms"] >= 250
+
+def test_whois_server_remembered_per_tld(monkeypatch):
+    """Test that the WHOIS server is worked out once per TLD"""
+    calls = []
+
+    def choose_server(self, domain):
+        calls.append(domain)
+        if domain.endswith(".broken"):
+            raise OSError("IANA unreachable")
+        return "whois.nic." + domain.rsplit(".", 1)[-1]
+
+    monkeypatch.setattr(whoisscheduler.NICClient, "choose_server", choose_server)
+    assert whois_server("a.example") == "whois.nic.example"
+    assert whois_server("B.Example") == "whois.nic.example"
+    assert whois_server("x.broken") == "broken"
+    assert whois_server("y.broken") == "broken"
+    assert calls == ["a.example", "x.broken", "y.broken"]
+
+def test_whoislookup_is_scheduled(whois_servers, monkeypatch):
+    """Test that whoislookup queues queries per WHOIS server"""
+    server = whois_servers({f"host{i}.com": f"Domain Name: HOST{i}.COM\r\n" for i in range(4)}, delay=0.05)
+    monkeypatch.setenv("WHOIS_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("WHOIS_RATE", "0")
+    lookups = []
+    monkeypatch.setattr(whoisscheduler.NICClient, "choose_server",
+                        lambda self, domain: lookups.append(domain) or "whois.example.net")
+
+    def fake(domain, **kwargs):
+        text = _query(server, domain)
+        return SimpleNamespace(text=text, domain_name=domain.upper() if "Domain Name" in text else None,
+                               registrar=None, creation_date=None, expiration_date=None, name_servers=None)
+
+    monkeypatch.setattr(whois, "whois", fake)
+    monkeypatch.setenv("WHOIS_BACKENDS", "whois")
+    results = []
+    threads = [threading.Thread(target=lambda d=f"host{i}.com": results.append(whoislookup(d))) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert [result["status"] for result in results] == ["success"] * 4
+    assert server.max_active == 1
+    queues = {queue["server"]: queue for queue in get_whois_scheduler().stats()["servers"]}
+    assert queues["whois.example.net"]["admitted"] == 4
+    assert len(lookups) == 1  # the .com server was looked up once
+
+def test_whoislookup_socket_errors_are_not_cached(monkeypatch):
+    """Test that connection failures reported by python-whois are errors, not "Domain not found\""""
+    calls = []
+
+    def fake(domain, **kwargs):
+        calls.append(domain)
+        return SimpleNamespace(text="Socket not responding: timed out", domain_name=None)
+
+    monkeypatch.setattr(whois, "whois", fake)
+    monkeypatch.setenv("WHOIS_BACKENDS", "whois")
+    monkeypatch.setattr(whoisscheduler.NICClient, "choose_server", lambda self, domain: "whois.example.net")
+    result = whoislookup("example.com")
+    assert result["status"] == "error"
+    assert result["error"] == "Socket not responding: timed out"
+    whoislookup("example.com")
+    assert calls == ["example.com", "example.com"]
+
+def test_whois_server_follows_name_rules(monkeypatch):
+    """Test that names python-whois routes by their ending do not fix the server for their TLD"""
+    calls = []
+
+    def choose_server(self, domain):
+        calls.append(domain)
+        return "whois.pp.ua" if domain.endswith(".pp.ua") else "whois.ua"
+
+    monkeypatch.setattr(whoisscheduler.NICClient, "choose_server", choose_server)
+    assert whois_server("a.pp.ua") == "whois.pp.ua"
+    assert whois_server("b.ua") == "whois.ua"
+    assert whois_server("c.pp.ua") == "whois.pp.ua"
+    assert whois_server("d.ua") == "whois.ua"
+    assert calls == ["a.pp.ua", "b.ua", "c.pp.ua"]
+
+def test_whoislookup_referral_is_scheduled(monkeypatch):
+    """Test that the registrar referral is followed through the registrar's own queue"""
+    registry = ("Domain Name: EXAMPLE.COM\r\nRegistrar WHOIS Server: whois.registrar.test\r\n"
+                "Registrar: Example Registrar\r\n")
+    registrar = "Domain Name: EXAMPLE.COM\r\nRegistrant Organization: Evil Corp\r\n"
+    flags, hops = [], []
+
+    def fake(domain, **kwargs):
+        flags.append(kwargs.get("flags"))
+        return SimpleNamespace(text=registry, domain_name="EXAMPLE.COM", registrar="Example Registrar",
+                               creation_date=None, expiration_date=None, name_servers=None)
+
+    def nic_whois(self, query, hostname, flags, many_results=False, quiet=False, timeout=10):
+        hops.append((query, hostname, flags))
+        return registrar
+
+    monkeypatch.setattr(whois, "whois", fake)
+    monkeypatch.setattr(whoisscheduler.NICClient, "whois", nic_whois)
+    monkeypatch.setattr(whoisscheduler.NICClient, "choose_server", lambda self, domain: "whois.example.net")
+    monkeypatch.setenv("WHOIS_BACKENDS", "whois")
+    result = whoislookup("www.example.com")
+    assert result["status"] == "success"
+    assert result["registrar"] == "Example Registrar"
+    assert result["registrant"] == "Evil Corp"
+    assert result["raw_output"] == registry + registrar
+    assert flags == [whoisscheduler.NICClient.WHOIS_QUICK]
+    assert hops == [("example.com", "whois.registrar.test", 0)]
+    queues = {queue["server"]: queue["admitted"] for queue in get_whois_scheduler().stats()["servers"]}
+    assert queues == {"whois.iana.org": 1, "whois.example.net": 1, "whois.registrar.test": 1}